@@ -1,15 +1,54 @@
-import sys, os, shutil, datetime
+import sys, os, datetime, threading, time
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QListWidget, QListWidgetItem, QFileDialog,
-    QMessageBox, QStackedWidget, QTableWidget, QTableWidgetItem,
+    QMessageBox, QStackedWidget, QTableWidget, QTableWidgetItem, QTableView,
     QLineEdit, QFormLayout, QDialog, QDialogButtonBox, QHeaderView,
     QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QComboBox, QCalendarWidget,
     QFrame
 )
-from PySide6.QtGui import QFont, QPixmap, QImage, QTextCharFormat, QColor
-from PySide6.QtCore import Qt, QDate
-from database import insert_user, insert_feedback, insert_detection, get_connection
+from PySide6.QtGui import QFont, QPixmap, QImage, QImageReader, QIcon, QTextCharFormat, QColor
+from PySide6.QtCore import Qt, QDate, QTimer, QSize
+from database import (
+    insert_user, insert_feedback, insert_detection, get_connection, get_camera_status_counts,
+    get_detection_totals, get_detection_series, read_users_csv, import_users
+)
+from retention import read_snapshot
+from log_export import job_for_path
+from export_progress import ExportProgressDialog
+from event_bus import bus, DetectionEvent
+import metrics
+import reports
+import snapshot_index
+from user_table import UserTableModel, UserFilterProxy, UserActionDelegate, ACTION_COLUMN
+
+THUMB_SIZE = QSize(160, 96)
+THUMBS_PER_TICK = 6  # thumbnails decoded per timer tick, so paging never blocks the UI
+SNAPSHOT_FOLDERS = [
+    ("Admin snapshots", "admin_snapshots"),
+    ("Guard snapshots", "guard_snapshots"),
+    ("Person with ID", "person_with_id"),
+    ("Person without ID", "person_without_id"),
+]
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+SNAPSHOT_PERIODS = [("Any time", None), ("Today", 0), ("Last 7 days", 7), ("Last 30 days", 30)]
+SEARCH_DEBOUNCE_MS = 150  # user search runs once typing pauses this long
+
+
+def load_snapshot_image(path, size=None):
+    """QImage of a snapshot, scaled while decoding when `size` is given. Falls back to the day archive."""
+    if os.path.exists(path):
+        reader = QImageReader(path)
+        if size is not None:
+            reader.setScaledSize(reader.size().scaled(size, Qt.KeepAspectRatio))
+        return reader.read()
+    img = QImage()
+    data = read_snapshot(path)
+    if data:
+        img.loadFromData(data)
+        if size is not None and not img.isNull():
+            img = img.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return img
 
 
 # ---------------- Dialogs ----------------
@@ -48,17 +87,114 @@ class UserDialog(QDialog):
         )
 
 
+class UserImportJob:
+    """Runs database.import_users on a worker thread, exposing what ExportProgressDialog polls."""
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows
+        self.total = 0
+        self.rows_written = 0
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.elapsed = 0.0
+        self.done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="user-import", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def progress(self):
+        return self.rows_written / self.total if self.total else None
+
+    def _on_progress(self, done, total):
+        self.rows_written, self.total = done, total
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self.result = import_users(self.rows, self._on_progress, lambda: self.cancelled)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.done.set()
+
+
+class SnapshotReindexJob:
+    """Runs snapshot_index.rebuild on a worker thread, exposing what ExportProgressDialog polls."""
+    def __init__(self):
+        self.total = 0  # unknown up front: the dialog shows a busy bar with the running count
+        self.rows_written = 0
+        self.added = 0
+        self.error = None
+        self.cancelled = False
+        self.elapsed = 0.0
+        self.done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="snapshot-reindex", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def progress(self):
+        return None
+
+    def _on_progress(self, scanned, added):
+        self.rows_written, self.added = scanned, added
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self.added = snapshot_index.rebuild(progress=self._on_progress, cancelled=lambda: self.cancelled)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.done.set()
+
+
+class SnapshotReindexDialog(ExportProgressDialog):
+    UNIT = "files scanned"
+
+    def __init__(self, job, parent, on_finished):
+        self.on_finished = on_finished
+        super().__init__(job, "Reindexing Snapshots", parent, "Scanning snapshot folders…")
+
+    def finished_message(self, job):
+        self.on_finished(job)
+
+
+class UserImportProgressDialog(ExportProgressDialog):
+    UNIT = "users"
+
+    def __init__(self, job, parent, on_finished):
+        self.on_finished = on_finished
+        super().__init__(job, "Importing Users", parent, "Checking for existing usernames…")
+
+    def finished_message(self, job):
+        self.on_finished(job)
+
+
 class CameraDialog(QDialog):
-    def __init__(self, location="", status="online"):
+    def __init__(self, location="", status="online", stream_url=""):
         super().__init__()
         self.setWindowTitle("Camera Settings")
-        self.setFixedSize(360, 180)
+        self.setFixedSize(420, 210)
         layout = QVBoxLayout()
         form = QFormLayout()
         self.location_input = QLineEdit(location)
         self.status_input = QLineEdit(status)
+        self.stream_url_input = QLineEdit(stream_url)
+        self.stream_url_input.setPlaceholderText("rtsp://...  (leave empty to keep off the detector nodes)")
         form.addRow("Location:", self.location_input)
         form.addRow("Status:", self.status_input)
+        form.addRow("Stream URL:", self.stream_url_input)
         layout.addLayout(form)
 
         buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
@@ -68,7 +204,8 @@ class CameraDialog(QDialog):
         self.setLayout(layout)
 
     def get_data(self):
-        return self.location_input.text().strip(), self.status_input.text().strip()
+        return (self.location_input.text().strip(), self.status_input.text().strip(),
+                self.stream_url_input.text().strip() or None)
 
 
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
@@ -95,7 +232,7 @@ class SnapshotViewer(QDialog):
         view = QGraphicsView()
         scene = QGraphicsScene()
 
-        img = QImage(image_path)
+        img = load_snapshot_image(image_path)
         pixmap = QPixmap.fromImage(img)
 
         # Scale pixmap to fit window while keeping aspect ratio
@@ -115,7 +252,7 @@ class ExportLogsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Export Logs")
-        self.setFixedSize(420, 400)
+        self.setFixedSize(420, 460)
         layout = QVBoxLayout(self)
 
         layout.addWidget(QLabel("Select export type:"))
@@ -136,6 +273,13 @@ class ExportLogsDialog(QDialog):
         layout.addWidget(self.month_combo)
         self.month_combo.hide()
 
+        layout.addWidget(QLabel("Format:"))
+        self.format_combo = QComboBox()
+        self.format_combo.addItem("CSV", ".csv")
+        self.format_combo.addItem("CSV, compressed (.csv.gz)", ".csv.gz")
+        self.format_combo.addItem("Parquet, with feedback (analytics)", ".parquet")
+        layout.addWidget(self.format_combo)
+
         btn_layout = QHBoxLayout()
         self.btn_ok = QPushButton("OK")
         self.btn_cancel = QPushButton("Cancel")
@@ -202,13 +346,13 @@ class AdminDashboardWindow(QMainWindow):
         super().__init__()
         self.user = user
 
-        # FIXED SNAPSHOT FOLDER
-        self.snapshots_folder = os.path.join(
-            "C:\\Users\\evann\\OneDrive\\Documents\\AI_ID_DETECTOR\\desktop_app\\output",
-            "admin_snapshots"
-        )
-        if not os.path.exists(self.snapshots_folder):
-            os.makedirs(self.snapshots_folder)
+        self.snapshots_folder = os.path.join(snapshot_index.OUTPUT_FOLDER, "admin_snapshots")
+        os.makedirs(self.snapshots_folder, exist_ok=True)
+        self._snapshot_cursors = [None]  # keyset cursor of each page visited; last entry is the current page
+        self._next_cursor = None
+        self._thumb_queue = []
+        self._thumb_timer = QTimer(self)
+        self._thumb_timer.timeout.connect(self._load_thumbnails)
 
         self.setWindowTitle(f"Admin Dashboard - {self.user['name']}")
         self.init_ui()
@@ -291,17 +435,165 @@ class AdminDashboardWindow(QMainWindow):
             QLabel { color: #333333; font-family: 'Segoe UI'; font-size: 14px; }
         """)
         stats_layout = QVBoxLayout(self.stats_frame)
-        self.stats = QLabel(
-            "People Detected: 0\n"
-            "Wearing ID: 0\n"
-            "Not Wearing ID: 0\n"
-            "Cameras Online: 0"
-        )
+        self.stats_values = {"people": 0, "with_id": 0, "no_id": 0, "cameras_online": 0, "cameras_total": 0,
+                             "trend": ""}
+        self.stats = QLabel()
+        self.render_stats()
         stats_layout.addWidget(self.stats)
         layout.addWidget(self.stats_frame)
-        layout.addStretch()
+
+        # Pipeline latency per camera/stage, read from the detector's metrics endpoint
+        perf_lbl = QLabel("⏱ Pipeline Performance")
+        perf_lbl.setFont(QFont("Segoe UI", 13, QFont.Bold))
+        layout.addWidget(perf_lbl)
+        self.perf_status = QLabel("Waiting for detector metrics…")
+        layout.addWidget(self.perf_status)
+        self.perf_table = QTableWidget(0, 6)
+        self.perf_table.verticalHeader().setVisible(False)
+        self.perf_table.setHorizontalHeaderLabels(["Camera", "Stage", "Count", "Mean ms", "p50 ms", "p95 ms"])
+        self.perf_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.perf_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.perf_table, stretch=1)
+
+        profile_row = QHBoxLayout()
+        profile_row.addStretch()
+        self.profile_duration = QComboBox()
+        self.profile_duration.addItems(["10 s", "30 s", "60 s", "120 s"])
+        self.profile_duration.setCurrentIndex(1)
+        profile_row.addWidget(self.profile_duration)
+        self.btn_profile = QPushButton("🔍 Capture Profile")
+        self.btn_profile.setStyleSheet("padding:6px; border-radius:6px; background-color:#FFFFFF;")
+        self.btn_profile.clicked.connect(self.capture_profile)
+        profile_row.addWidget(self.btn_profile)
+        layout.addLayout(profile_row)
+        self._profile_requesting = False
+        self._profile_result = None  # (reply,) from the request, not yet shown
+        self.profile_timer = QTimer(self)
+        self.profile_timer.timeout.connect(self.show_profile_reply)
+
+        self._perf_fetching = False
+        self._perf_result = None  # (data,) from the last fetch, not yet shown
+        self.perf_timer = QTimer(self)
+        self.perf_timer.timeout.connect(self.refresh_performance)
+        self.perf_timer.start(2000)
+
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_dashboard_stats)
+        self.stats_timer.start(5000)
+        self.refresh_dashboard_stats()
+        # Detections made in this process show up within one UI tick; the timer reconciles the rest
+        self.detection_subscription = bus.subscribe(DetectionEvent, self.on_detection_events)
         return page
 
+    def render_stats(self):
+        v = self.stats_values
+        self.stats.setText(
+            f"People Detected Today: {v['people']}\n"
+            f"Wearing ID: {v['with_id']}\n"
+            f"Not Wearing ID: {v['no_id']}\n"
+            f"Cameras Online: {v['cameras_online']} / {v['cameras_total']}\n"
+            f"Last 24 h (hourly): {v['trend']}"
+        )
+
+    def refresh_dashboard_stats(self):
+        # Camera status is kept current by each feed's stream health monitor
+        counts = get_camera_status_counts()
+        self.stats_values["cameras_online"] = counts.get("online", 0)
+        self.stats_values["cameras_total"] = sum(counts.values())
+
+        # Totals and trend come from the rollup tables, so this costs the same at any table size
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        totals = get_detection_totals(start=today)
+        self.stats_values["with_id"] = totals.get("person_with_id", 0)
+        self.stats_values["no_id"] = totals.get("person_without_id", 0)
+        self.stats_values["people"] = sum(totals.values())
+
+        now = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+        start = now - datetime.timedelta(hours=23)
+        hourly = [0] * 24
+        for bucket, _, count in get_detection_series("hour", start, now + datetime.timedelta(hours=1)):
+            if isinstance(bucket, str):
+                bucket = datetime.datetime.strptime(bucket, "%Y-%m-%d %H:%M:%S")
+            hourly[int((bucket - start).total_seconds() // 3600)] += count
+        peak = max(hourly) or 1
+        self.stats_values["trend"] = "".join(SPARK_BARS[count * (len(SPARK_BARS) - 1) // peak] for count in hourly)
+        self.render_stats()
+
+    def on_detection_events(self, events):
+        today = datetime.date.today().isoformat()
+        for e in events:
+            if e.detection_id and str(e.timestamp).startswith(today):
+                key = "with_id" if e.ai_result == "person_with_id" else "no_id"
+                self.stats_values[key] += 1
+                self.stats_values["people"] += 1
+        self.render_stats()
+
+    def capture_profile(self):
+        if self._profile_requesting:
+            return
+        # Same as refresh_performance: the request runs on a worker thread and a timer picks up the reply
+        seconds = int(self.profile_duration.currentText().split()[0])
+        self._profile_requesting = True
+        self._profile_result = None
+        self.btn_profile.setEnabled(False)
+        threading.Thread(target=self._request_profile, args=(seconds,), name="profile-request", daemon=True).start()
+        self.profile_timer.start(100)
+
+    def _request_profile(self, seconds):
+        try:
+            self._profile_result = (metrics.request_profile(seconds),)
+        finally:
+            self._profile_requesting = False
+
+    def show_profile_reply(self):
+        if self._profile_requesting:
+            return
+        self.profile_timer.stop()
+        self.btn_profile.setEnabled(True)
+        reply = self._profile_result[0] if self._profile_result else None  # no result: the worker raised
+        self._profile_result = None
+        if reply is None:
+            QMessageBox.warning(self, "Profile", "Detector process not reachable on the metrics endpoint.")
+        elif not reply.get("started"):
+            QMessageBox.warning(self, "Profile", reply.get("error", "Profile could not be started."))
+        else:
+            QMessageBox.information(
+                self, "Profile",
+                f"Profiling for {reply['seconds']:g} s.\n\nFlamegraph stacks: {reply['folded']}\n"
+                f"Top-N summary: {reply['summary']}"
+            )
+
+    def refresh_performance(self):
+        if self.stacked_widget.currentIndex() != 0:
+            return
+        # The HTTP read runs on a worker thread so a dead endpoint cannot stall the UI;
+        # each tick shows what the previous fetch brought back
+        if not self._perf_fetching:
+            self._perf_fetching = True
+            threading.Thread(target=self._fetch_performance, name="metrics-fetch", daemon=True).start()
+        result, self._perf_result = self._perf_result, None
+        if result is not None:
+            self.render_performance(result[0])
+
+    def _fetch_performance(self):
+        try:
+            self._perf_result = (metrics.fetch(),)
+        finally:
+            self._perf_fetching = False
+
+    def render_performance(self, data):
+        if not data:
+            self.perf_status.setText("Detector metrics endpoint not reachable.")
+            return
+        counters = ", ".join(f"cam{c['camera']} {c['name']}={c['value']}" for c in data["counters"])
+        self.perf_status.setText(counters or "No frames processed yet.")
+        self.perf_table.setRowCount(len(data["stages"]))
+        for row, st in enumerate(data["stages"]):
+            values = [st["camera"], st["stage"], st["count"],
+                      f"{st['mean_ms']:.1f}", f"{st['p50_ms']:g}", f"{st['p95_ms']:g}"]
+            for col, value in enumerate(values):
+                self.perf_table.setItem(row, col, QTableWidgetItem(str(value)))
+
     # ---------------- Snapshots Page ----------------
     def create_snapshots_page(self):
         page = QWidget()
@@ -310,12 +602,49 @@ class AdminDashboardWindow(QMainWindow):
         lbl.setFont(QFont("Segoe UI", 14, QFont.Bold))
         layout.addWidget(lbl)
 
+        filters = QHBoxLayout()
+        self.snapshot_folder_combo = QComboBox()
+        for text, folder in SNAPSHOT_FOLDERS:
+            self.snapshot_folder_combo.addItem(text, folder)
+        self.snapshot_camera_combo = QComboBox()
+        self.snapshot_label_combo = QComboBox()
+        self.snapshot_label_combo.addItem("All labels", None)
+        self.snapshot_label_combo.addItem("Person with ID", "person_with_id")
+        self.snapshot_label_combo.addItem("Person without ID", "person_without_id")
+        self.snapshot_period_combo = QComboBox()
+        for text, days in SNAPSHOT_PERIODS:
+            self.snapshot_period_combo.addItem(text, days)
+        for combo in (self.snapshot_folder_combo, self.snapshot_camera_combo,
+                      self.snapshot_label_combo, self.snapshot_period_combo):
+            filters.addWidget(combo)
+        self.snapshot_folder_combo.currentIndexChanged.connect(lambda _: self.load_snapshots(reload_cameras=True))
+        for combo in (self.snapshot_camera_combo, self.snapshot_label_combo, self.snapshot_period_combo):
+            combo.currentIndexChanged.connect(lambda _: self.load_snapshots())
+        self.btn_reindex = QPushButton("↻ Reindex")
+        self.btn_reindex.setToolTip("Index snapshots written before the index existed")
+        self.btn_reindex.clicked.connect(self.reindex_snapshots)
+        filters.addStretch()
+        filters.addWidget(self.btn_reindex)
+        layout.addLayout(filters)
+
         self.snapshot_list = QListWidget()
-        self.snapshot_list.setAlternatingRowColors(True)
+        self.snapshot_list.setViewMode(QListWidget.IconMode)
+        self.snapshot_list.setIconSize(THUMB_SIZE)
+        self.snapshot_list.setResizeMode(QListWidget.Adjust)
+        self.snapshot_list.setMovement(QListWidget.Static)
+        self.snapshot_list.setUniformItemSizes(True)
         layout.addWidget(self.snapshot_list)
         self.snapshot_list.itemDoubleClicked.connect(self.preview_snapshot_from_item)
 
         btn_layout = QHBoxLayout()
+        self.btn_snapshots_prev = QPushButton("◀ Newer")
+        self.btn_snapshots_next = QPushButton("Older ▶")
+        self.btn_snapshots_prev.clicked.connect(self.prev_snapshot_page)
+        self.btn_snapshots_next.clicked.connect(self.next_snapshot_page)
+        self.snapshot_page_label = QLabel()
+        btn_layout.addWidget(self.btn_snapshots_prev)
+        btn_layout.addWidget(self.snapshot_page_label)
+        btn_layout.addWidget(self.btn_snapshots_next)
         for text, slot in [("🗑️ Delete", self.delete_snapshot), ("💾 Export", self.export_snapshot)]:
             b = QPushButton(text)
             b.clicked.connect(slot)
@@ -325,11 +654,9 @@ class AdminDashboardWindow(QMainWindow):
         return page
 
     def preview_snapshot_from_item(self, item):
-        if not self.snapshots_folder or not item:
+        if not item:
             return
-        path = os.path.join(self.snapshots_folder, item.text())
-        if os.path.exists(path):
-            SnapshotViewer(path).exec()
+        SnapshotViewer(item.data(Qt.UserRole)).exec()
 
     # ---------------- Snapshot Auto-Save ----------------
     def save_snapshot(self, image: QImage, filename: str = None):
@@ -337,23 +664,100 @@ class AdminDashboardWindow(QMainWindow):
             filename = f"snapshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
         path = os.path.join(self.snapshots_folder, filename)
         image.save(path)
-        self.add_snapshot_to_list(filename)
-
-    def add_snapshot_to_list(self, filename):
-        for i in range(self.snapshot_list.count()):
-            if self.snapshot_list.item(i).text() == filename:
-                return
-        self.snapshot_list.addItem(QListWidgetItem(filename))
+        snapshot_index.add(path, "admin_snapshots")
+        if len(self._snapshot_cursors) == 1:
+            self.load_snapshots()
 
     # ---------------- Load Snapshots ----------------
-    def load_snapshots(self):
-        self.snapshot_list.clear()
-        if not os.path.exists(self.snapshots_folder):
-            os.makedirs(self.snapshots_folder)
-        for f in os.listdir(self.snapshots_folder):
-            if f.lower().endswith((".jpg", ".jpeg", ".png")):
-                self.snapshot_list.addItem(QListWidgetItem(f))
+    def snapshot_filters(self):
+        days = self.snapshot_period_combo.currentData()
+        start = None
+        if days is not None:
+            midnight = datetime.datetime.combine(datetime.date.today(), datetime.time())
+            start = (midnight - datetime.timedelta(days=days)).timestamp()
+        return {
+            "folder": self.snapshot_folder_combo.currentData(),
+            "camera_id": self.snapshot_camera_combo.currentData(),
+            "label": self.snapshot_label_combo.currentData(),
+            "start": start,
+        }
+
+    def load_snapshots(self, reload_cameras=False):
+        """Show the newest page for the current filters."""
+        if reload_cameras or self.snapshot_camera_combo.count() == 0:
+            self.snapshot_camera_combo.blockSignals(True)
+            self.snapshot_camera_combo.clear()
+            self.snapshot_camera_combo.addItem("All cameras", None)
+            for camera_id in snapshot_index.cameras(self.snapshot_folder_combo.currentData()):
+                self.snapshot_camera_combo.addItem(f"Camera {camera_id}", camera_id)
+            self.snapshot_camera_combo.blockSignals(False)
+        self._snapshot_cursors = [None]
+        self.show_snapshot_page()
+
+    def show_snapshot_page(self):
+        # One extra row tells us whether an older page exists without a COUNT(*)
+        rows = snapshot_index.query_page(after=self._snapshot_cursors[-1], limit=snapshot_index.PAGE_SIZE + 1,
+                                         **self.snapshot_filters())
+        has_next = len(rows) > snapshot_index.PAGE_SIZE
+        rows = rows[:snapshot_index.PAGE_SIZE]
+        self._next_cursor = (rows[-1]["created_at"], rows[-1]["id"]) if has_next else None
 
+        self.snapshot_list.clear()
+        self._thumb_queue = []
+        placeholder = QPixmap(THUMB_SIZE)
+        placeholder.fill(QColor("#E0E0E0"))
+        placeholder = QIcon(placeholder)
+        for row in rows:
+            when = datetime.datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            text = f"Cam {row['camera_id']} · {when}" if row["camera_id"] is not None else when
+            item = QListWidgetItem(placeholder, text)
+            item.setData(Qt.UserRole, row["path"])
+            item.setToolTip(os.path.basename(row["path"]))
+            self.snapshot_list.addItem(item)
+            self._thumb_queue.append(item)
+        self._thumb_queue.reverse()  # pop() from the end loads top-left first
+
+        page = len(self._snapshot_cursors)
+        self.snapshot_page_label.setText(f"Page {page}" if rows else "No snapshots")
+        self.btn_snapshots_prev.setEnabled(page > 1)
+        self.btn_snapshots_next.setEnabled(has_next)
+        if self._thumb_queue:
+            self._thumb_timer.start(0)
+
+    def next_snapshot_page(self):
+        if self._next_cursor is not None:
+            self._snapshot_cursors.append(self._next_cursor)
+            self.show_snapshot_page()
+
+    def prev_snapshot_page(self):
+        if len(self._snapshot_cursors) > 1:
+            self._snapshot_cursors.pop()
+            self.show_snapshot_page()
+
+    def _load_thumbnails(self):
+        for _ in range(THUMBS_PER_TICK):
+            if not self._thumb_queue:
+                self._thumb_timer.stop()
+                return
+            item = self._thumb_queue.pop()
+            img = load_snapshot_image(item.data(Qt.UserRole), THUMB_SIZE)
+            if not img.isNull():
+                item.setIcon(QIcon(QPixmap.fromImage(img)))
+
+    def reindex_snapshots(self):
+        # A full walk of the snapshot folders: run it on a worker thread like the exports
+        self.btn_reindex.setEnabled(False)
+        job = SnapshotReindexJob().start()
+        self.reindex_progress = SnapshotReindexDialog(job, self, self.reindex_finished)
+
+    def reindex_finished(self, job):
+        self.btn_reindex.setEnabled(True)
+        if job.error:
+            QMessageBox.critical(self, "Reindex Failed", job.error)
+            return
+        self.load_snapshots(reload_cameras=True)
+        stopped = " (cancelled)" if job.cancelled else ""
+        QMessageBox.information(self, "Reindex", f"Indexed {job.added} new snapshot(s) in {job.elapsed:.1f}s{stopped}.")
 
     # ---------------- Users Page ----------------
     def create_users_page(self):
@@ -364,16 +768,25 @@ class AdminDashboardWindow(QMainWindow):
         # Extra space at top for cleaner look
         layout.addSpacing(80)
 
-        # Top row with search box on the right
+        # Top row with import on the left, search box on the right
         top_row = QHBoxLayout()
+        self.btn_import_users = QPushButton("📥 Import CSV")
+        self.btn_import_users.setFixedHeight(44)
+        self.btn_import_users.setToolTip("CSV columns: name, role, username, password")
+        self.btn_import_users.clicked.connect(self.import_users_csv)
+        top_row.addWidget(self.btn_import_users)
         top_row.addStretch()
         self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Search by Name")
+        self.search_edit.setPlaceholderText("Search name, username or role")
         self.search_edit.setFixedWidth(280)   # wider
         self.search_edit.setFixedHeight(44)   # taller
         self.search_edit.setFont(QFont("Arial", 12))
         self.search_edit.setStyleSheet("padding-left:8px;")
-        self.search_edit.textChanged.connect(self.filter_users)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.filter_users)
+        self.search_edit.textChanged.connect(self.search_timer.start)
         top_row.addWidget(self.search_edit)
         layout.addLayout(top_row)
 
@@ -381,9 +794,17 @@ class AdminDashboardWindow(QMainWindow):
         lbl.setFont(QFont("Arial", 16, QFont.Bold))
         layout.addWidget(lbl)
 
-        self.user_table = QTableWidget(0, 5)
+        self.user_model = UserTableModel(self)
+        self.user_proxy = UserFilterProxy(self)
+        self.user_proxy.setSourceModel(self.user_model)
+        self.user_actions = UserActionDelegate(self)
+        self.user_actions.editClicked.connect(self.edit_user)
+        self.user_actions.deleteClicked.connect(self.delete_user)
+
+        self.user_table = QTableView()
+        self.user_table.setModel(self.user_proxy)
+        self.user_table.setItemDelegateForColumn(ACTION_COLUMN, self.user_actions)
         self.user_table.verticalHeader().setVisible(False)
-        self.user_table.setHorizontalHeaderLabels(["#", "Name", "Role", "Username", "Action"])
         self.user_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
         # Table appearance
@@ -398,12 +819,12 @@ class AdminDashboardWindow(QMainWindow):
         header.setDefaultAlignment(Qt.AlignLeft | Qt.AlignVCenter)
 
         self.user_table.setStyleSheet("""
-            QTableWidget::item {
+            QTableView::item {
                 padding-left: 6px;
             }
         """)
-        self.user_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.user_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.user_table.setSelectionBehavior(QTableView.SelectRows)
+        self.user_table.setSelectionMode(QTableView.SingleSelection)
 
         layout.addWidget(self.user_table)
         return page
@@ -411,52 +832,60 @@ class AdminDashboardWindow(QMainWindow):
     # ---------------- Users CRUD + Search ----------------
     def load_users_from_db(self):
         rows = self.db_query("SELECT user_id,name,role,username FROM user", fetch=True)
-        self.all_users = rows
-        self._populate_user_table(rows)
-
-    def _populate_user_table(self, rows):
-        self.user_table.setRowCount(0)
-        for r in rows:
-            row = self.user_table.rowCount()
-            self.user_table.insertRow(row)
-            for col, value in enumerate([r["user_id"], r["name"], r["role"], r["username"]]):
-                item = QTableWidgetItem(str(value))
-                item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-                self.user_table.setItem(row, col, item)
-
-            btn_widget = QWidget()
-            btn_layout = QHBoxLayout(btn_widget)
-            btn_layout.setContentsMargins(5, 0, 5, 0)
-            btn_layout.setSpacing(8)
-
-            btn_edit = QPushButton("✏️ Edit")
-            btn_edit.setStyleSheet("background-color: skyblue; border-radius: 5px; padding:4px;")
-            btn_edit.clicked.connect(lambda _, r=row: self.edit_user_by_row(r))
-
-            btn_delete = QPushButton("🗑️ Delete")
-            btn_delete.setStyleSheet("background-color: red; color:white; border-radius: 5px; padding:4px;")
-            btn_delete.clicked.connect(lambda _, r=row: self.delete_user_by_row(r))
-
-            btn_layout.addWidget(btn_edit)
-            btn_layout.addWidget(btn_delete)
-            btn_layout.addStretch()
-            self.user_table.setCellWidget(row, 4, btn_widget)
+        self.user_model.set_users(rows)  # the proxy rebuilds its search index on reset
 
     def filter_users(self):
-        text = self.search_edit.text().strip().lower()
-        if not text:
-            self._populate_user_table(self.all_users)
+        self.user_proxy.set_query(self.search_edit.text())
+
+    def import_users_csv(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Users", "", "CSV files (*.csv)")
+        if not path:
             return
-        filtered = [r for r in self.all_users if text in r["name"].lower()]
-        self._populate_user_table(filtered)
+        try:
+            rows, problems = read_users_csv(path)
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.critical(self, "Import Failed", f"Cannot read {os.path.basename(path)}: {e}")
+            return
+        if not rows:
+            QMessageBox.warning(self, "Import Users", "No importable users.\n\n" + "\n".join(problems[:10]))
+            return
+        if problems:
+            more = f"\n… and {len(problems) - 10} more" if len(problems) > 10 else ""
+            reply = self.centered_message_box(
+                "Import Users",
+                f"{len(problems)} row(s) will be skipped:\n" + "\n".join(problems[:10]) + more +
+                f"\n\nImport the other {len(rows)} user(s)?"
+            )
+            if reply != QMessageBox.Yes:
+                return
+        self.btn_import_users.setEnabled(False)
+        job = UserImportJob(path, rows).start()
+        self.import_progress = UserImportProgressDialog(job, self, self.user_import_finished)
 
-    def edit_user_by_row(self, row):
-        user_id = self.user_table.item(row, 0).text()
+    def user_import_finished(self, job):
+        self.btn_import_users.setEnabled(True)
+        self.load_users_from_db()
+        if job.error:
+            QMessageBox.critical(self, "Import Failed", job.error)
+            return
+        result = job.result
+        lines = [f"{result['inserted']:,} user(s) imported in {job.elapsed:.1f}s."]
+        if job.cancelled:
+            lines.append("Import cancelled; users imported before that were kept.")
+        if result["skipped"]:
+            names = ", ".join(result["skipped"][:10]) + (" …" if len(result["skipped"]) > 10 else "")
+            lines.append(f"{len(result['skipped'])} username(s) already existed: {names}")
+        lines.extend(result["errors"][:5])
+        box = QMessageBox.warning if result["errors"] else QMessageBox.information
+        box(self, "Import Users", "\n".join(lines))
+
+    def edit_user(self, user):
+        user_id = user["user_id"]
         dlg = UserDialog(
             self,
-            name=self.user_table.item(row, 1).text(),
-            role=self.user_table.item(row, 2).text(),
-            username=self.user_table.item(row, 3).text(),
+            name=user["name"],
+            role=user["role"],
+            username=user["username"],
             password=""
         )
         if dlg.exec():
@@ -484,8 +913,8 @@ class AdminDashboardWindow(QMainWindow):
                 conn.close()
             self.load_users_from_db()
 
-    def delete_user_by_row(self, row):
-        user_id = self.user_table.item(row, 0).text()
+    def delete_user(self, user):
+        user_id = user["user_id"]
         reply = self.centered_message_box("Confirm", "Delete this user?")
         if reply == QMessageBox.Yes:
             self.db_query("DELETE FROM user WHERE user_id=%s", (user_id,))
@@ -499,9 +928,9 @@ class AdminDashboardWindow(QMainWindow):
         lbl.setFont(QFont("Arial", 14, QFont.Bold))
         layout.addWidget(lbl)
 
-        self.camera_table = QTableWidget(0, 3)
+        self.camera_table = QTableWidget(0, 5)
         self.camera_table.verticalHeader().setVisible(False)
-        self.camera_table.setHorizontalHeaderLabels(["ID", "Location", "Status"])
+        self.camera_table.setHorizontalHeaderLabels(["ID", "Location", "Status", "Stream URL", "Node"])
         self.camera_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.camera_table)
 
@@ -516,22 +945,25 @@ class AdminDashboardWindow(QMainWindow):
 
     def load_cameras_from_db(self):
         self.camera_table.setRowCount(0)
-        rows = self.db_query("SELECT camera_id,location,status FROM camera", fetch=True)
+        rows = self.db_query("SELECT camera_id,location,status,stream_url,lease_owner FROM camera", fetch=True)
         for r in rows:
             row = self.camera_table.rowCount()
             self.camera_table.insertRow(row)
             self.camera_table.setItem(row, 0, QTableWidgetItem(str(r["camera_id"])))
             self.camera_table.setItem(row, 1, QTableWidgetItem(r["location"]))
             self.camera_table.setItem(row, 2, QTableWidgetItem(r["status"]))
+            self.camera_table.setItem(row, 3, QTableWidgetItem(r["stream_url"] or ""))
+            self.camera_table.setItem(row, 4, QTableWidgetItem(r["lease_owner"] or "-"))
 
     def add_camera(self):
         dlg = CameraDialog()
         if dlg.exec():
-            location, status = dlg.get_data()
+            location, status, stream_url = dlg.get_data()
             if not location or not status:
-                self.centered_message_box("Missing Data", "All fields required.")
+                self.centered_message_box("Missing Data", "Location and status are required.")
                 return
-            self.db_query("INSERT INTO camera (location,status) VALUES (%s,%s)", (location, status))
+            self.db_query("INSERT INTO camera (location,status,stream_url) VALUES (%s,%s,%s)",
+                          (location, status, stream_url))
             self.load_cameras_from_db()
 
     def edit_camera(self):
@@ -541,12 +973,13 @@ class AdminDashboardWindow(QMainWindow):
         camera_id = self.camera_table.item(row, 0).text()
         dlg = CameraDialog(
             location=self.camera_table.item(row, 1).text(),
-            status=self.camera_table.item(row, 2).text()
+            status=self.camera_table.item(row, 2).text(),
+            stream_url=self.camera_table.item(row, 3).text()
         )
         if dlg.exec():
-            location, status = dlg.get_data()
-            self.db_query("UPDATE camera SET location=%s, status=%s WHERE camera_id=%s",
-                          (location, status, camera_id))
+            location, status, stream_url = dlg.get_data()
+            self.db_query("UPDATE camera SET location=%s, status=%s, stream_url=%s WHERE camera_id=%s",
+                          (location, status, stream_url, camera_id))
             self.load_cameras_from_db()
 
     def delete_camera(self):
@@ -562,26 +995,35 @@ class AdminDashboardWindow(QMainWindow):
     # ---------------- Snapshot Utilities ----------------
     def delete_snapshot(self):
         row = self.snapshot_list.currentRow()
-        if row < 0 or not self.snapshots_folder:
+        if row < 0:
             return
-        path = os.path.join(self.snapshots_folder, self.snapshot_list.item(row).text())
+        item = self.snapshot_list.item(row)
+        path = item.data(Qt.UserRole)
         reply = self.centered_message_box("Delete?", f"Delete {os.path.basename(path)}?")
         if reply == QMessageBox.Yes:
             try:
-                os.remove(path)
+                if os.path.exists(path):
+                    os.remove(path)
+                snapshot_index.remove([path])
+                if item in self._thumb_queue:
+                    self._thumb_queue.remove(item)
                 self.snapshot_list.takeItem(row)
             except Exception as e:
                 self.centered_message_box("Error", str(e))
 
     def export_snapshot(self):
         row = self.snapshot_list.currentRow()
-        if row < 0 or not self.snapshots_folder:
+        if row < 0:
             return
-        path = os.path.join(self.snapshots_folder, self.snapshot_list.item(row).text())
+        path = self.snapshot_list.item(row).data(Qt.UserRole)
         folder = QFileDialog.getExistingDirectory(self, "Select Export Folder")
         if folder:
             try:
-                shutil.copy(path, folder)
+                data = read_snapshot(path)
+                if data is None:
+                    raise FileNotFoundError(path)
+                with open(os.path.join(folder, os.path.basename(path)), "wb") as f:
+                    f.write(data)
                 self.centered_message_box("Exported", f"{os.path.basename(path)} exported to {folder}")
             except Exception as e:
                 self.centered_message_box("Error", str(e))
@@ -606,64 +1048,54 @@ class AdminDashboardWindow(QMainWindow):
     # ---------------- Export Logs ----------------
     def export_logs_dialog(self):
         dlg = ExportLogsDialog(self)
-        if dlg.exec():
-            period = dlg.period_combo.currentText()
-            conn = get_connection()
-            try:
-                cur = conn.cursor(dictionary=True)
-                now = datetime.datetime.now()
-                if period == "Daily" and dlg.daily_selected_day:
-                    start_date = datetime.datetime(
-                        dlg.daily_selected_day.year(),
-                        dlg.daily_selected_day.month(),
-                        dlg.daily_selected_day.day()
-                    )
-                    end_date = start_date + datetime.timedelta(days=1)
-                elif period == "Weekly" and dlg.weekly_start and dlg.weekly_end:
-                    start_date = datetime.datetime(
-                        dlg.weekly_start.year(),
-                        dlg.weekly_start.month(),
-                        dlg.weekly_start.day()
-                    )
-                    end_date = datetime.datetime(
-                        dlg.weekly_end.year(),
-                        dlg.weekly_end.month(),
-                        dlg.weekly_end.day(),
-                        23, 59, 59
-                    )
-                elif period == "Monthly":
-                    month = dlg.month_combo.currentIndex() + 1
-                    start_date = datetime.datetime(now.year, month, 1)
-                    next_month = month + 1 if month < 12 else 1
-                    year = now.year if month < 12 else now.year + 1
-                    end_date = datetime.datetime(year, next_month, 1)
-                else:
-                    return
+        if not dlg.exec():
+            return
+        period = dlg.period_combo.currentText()
+        now = datetime.datetime.now()
+        if period == "Daily" and dlg.daily_selected_day:
+            start_date = datetime.datetime(
+                dlg.daily_selected_day.year(),
+                dlg.daily_selected_day.month(),
+                dlg.daily_selected_day.day()
+            )
+            end_date = start_date + datetime.timedelta(days=1)
+        elif period == "Weekly" and dlg.weekly_start and dlg.weekly_end:
+            start_date = datetime.datetime(
+                dlg.weekly_start.year(),
+                dlg.weekly_start.month(),
+                dlg.weekly_start.day()
+            )
+            end_date = datetime.datetime(
+                dlg.weekly_end.year(),
+                dlg.weekly_end.month(),
+                dlg.weekly_end.day()
+            ) + datetime.timedelta(days=1)
+        elif period == "Monthly":
+            month = dlg.month_combo.currentIndex() + 1
+            start_date = datetime.datetime(now.year, month, 1)
+            next_month = month + 1 if month < 12 else 1
+            year = now.year if month < 12 else now.year + 1
+            end_date = datetime.datetime(year, next_month, 1)
+        else:
+            return
 
-                cur.execute("SELECT * FROM detection WHERE timestamp >= %s AND timestamp <= %s",
-                            (start_date, end_date))
-                logs = cur.fetchall()
-            finally:
-                conn.close()
+        folder = QFileDialog.getExistingDirectory(self, "Select Export Folder")
+        if not folder:
+            return
+        filename = f"{period.lower()}_logs{dlg.format_combo.currentData()}"
+        path = os.path.join(folder, filename)
 
-            folder = QFileDialog.getExistingDirectory(self, "Select Export Folder")
-            if folder:
-                filename = f"{period.lower()}_logs.csv"
-                path = os.path.join(folder, filename)
-                try:
-                    import csv
-                    with open(path, "w", newline="", encoding="utf-8") as f:
-                        if logs:
-                            writer = csv.DictWriter(f, fieldnames=logs[0].keys())
-                            writer.writeheader()
-                            for row in logs:
-                                writer.writerow(row)
-                        else:
-                            writer = csv.writer(f)
-                            writer.writerow(["No data"])
-                    self.centered_message_box("Exported", f"{filename} exported to {folder}")
-                except Exception as e:
-                    self.centered_message_box("Error", str(e))
+        # Closed periods are pre-built by the report scheduler: copy instead of querying
+        report = reports.find_report(start_date, end_date)
+        if report:
+            try:
+                if reports.copy_report(report, path):
+                    self.centered_message_box("Exported", f"{filename} exported to {folder} (built {report['built_at']})")
+                    return
+            except OSError as e:
+                print(f"[WARN] Could not copy pre-built report, exporting from the database: {e}")
+        job = job_for_path(path, start_date, end_date).start()
+        self.export_progress = ExportProgressDialog(job, f"Exporting {filename}", self)
 
     # ---------------- DB Helper ----------------
     def db_query(self, sql, params=None, fetch=False):
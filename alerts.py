@@ -0,0 +1,67 @@
+"""
+Alert coalescing for the guard bell.
+
+Repeated detections of the same label on the same camera within COALESCE_SECONDS collapse into
+one entry ("3× NO_ID at Cam 2 in 10 s"). Entries live in a fixed-size ring kept in
+last-update order, so the newest alerts are read straight off the end without sorting.
+"""
+import time
+from collections import deque
+from datetime import datetime
+
+COALESCE_SECONDS = 10.0
+HISTORY_SIZE = 50
+
+SHORT_LABELS = {"person_without_id": "NO_ID", "person_with_id": "WITH_ID"}
+
+
+class AlertEntry:
+    __slots__ = ("camera_id", "ai_result", "first_at", "last_at", "count", "detection_id")
+
+    def __init__(self, camera_id, ai_result, ts, detection_id=0):
+        self.camera_id = camera_id
+        self.ai_result = ai_result
+        self.first_at = ts
+        self.last_at = ts
+        self.count = 1
+        self.detection_id = detection_id
+
+    def text(self):
+        label = SHORT_LABELS.get(self.ai_result, self.ai_result.upper())
+        if self.count == 1:
+            return f"{label} at Cam {self.camera_id} ({datetime.fromtimestamp(self.first_at):%H:%M:%S})"
+        span = max(1, round(self.last_at - self.first_at))
+        return f"{self.count}× {label} at Cam {self.camera_id} in {span} s"
+
+
+class AlertCoalescer:
+    def __init__(self, window=COALESCE_SECONDS, size=HISTORY_SIZE):
+        self.window = window
+        self._entries = deque(maxlen=size)
+
+    def add(self, camera_id, ai_result, ts=None, detection_id=0):
+        """Record one alert. Returns True if it started a new entry, False if it was merged."""
+        ts = ts or time.time()
+        # Entries are in last-update order: scan from the end and stop at the first one too old to matter
+        for i in range(len(self._entries) - 1, -1, -1):
+            entry = self._entries[i]
+            if ts - entry.last_at > self.window:
+                break
+            if (entry.camera_id == camera_id and entry.ai_result == ai_result
+                    and ts - entry.first_at <= self.window):
+                entry.count += 1
+                entry.last_at = ts
+                entry.detection_id = detection_id or entry.detection_id
+                if i != len(self._entries) - 1:
+                    del self._entries[i]
+                    self._entries.append(entry)  # keep last-update order
+                return False
+        self._entries.append(AlertEntry(camera_id, ai_result, ts, detection_id))
+        return True
+
+    def recent(self, n=10):
+        """Up to `n` entries, newest first."""
+        return [self._entries[i] for i in range(len(self._entries) - 1, max(-1, len(self._entries) - 1 - n), -1)]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,325 @@
+"""
+Offline batch detection over recorded video files and image folders.
+
+    python batch_process.py footage/ extra_clip.mp4 --sink db --workers 4 --batch 8
+    python batch_process.py audit_images/ --sink file --results audit.jsonl --resume
+
+Frames are decoded by worker threads, run through the model in batches, post-processed with the
+same label mapping / cascade as the live feed, and written either to the database (snapshot +
+detection row, like CCTVFeed) or to a JSON-lines results file.
+
+The checkpoint is only saved every CHECKPOINT_EVERY batches, so after a crash --resume asks the
+sink which (source, frame) pairs it already holds and skips them instead of writing them twice.
+"""
+import argparse, hashlib, json, os, queue, re, threading, time
+import cv2
+from cctv_feed import (
+    registry, strict_label_mapping, extract_detections, write_detection, FRAME_SIZE, INFER_IMGSZ
+)
+from cascade import DetectionCascade
+from database import get_detection_image_paths
+
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_CHECKPOINT = "batch_checkpoint.json"
+CHECKPOINT_EVERY = 20  # batches between checkpoint writes
+
+_SOURCE_DONE = -1  # frame index used to mark the end of a source
+_FRAME_KEY = re.compile(r"_det([0-9a-f]{10})f(\d+)d\d+_conf")  # DbSink snapshot names
+
+
+def source_key(source):
+    """Short stable id of a source path, embedded in DbSink snapshot names."""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:10]
+
+
+def collect_sources(paths):
+    """Expand files and directories (recursively) into a sorted list of video/image files."""
+    sources = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                for f in files:
+                    if f.lower().endswith(VIDEO_EXTS + IMAGE_EXTS):
+                        sources.append(os.path.join(root, f))
+        elif p.lower().endswith(VIDEO_EXTS + IMAGE_EXTS):
+            sources.append(p)
+        else:
+            print(f"[WARN] Skipping unsupported input: {p}")
+    return sorted(set(os.path.abspath(s) for s in sources))
+
+
+class Checkpoint:
+    """Per-source progress (last processed frame index, or done) persisted as JSON."""
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.done = set()
+        self.progress = {}
+        if resume and path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.progress = data.get("progress", {})
+            print(f"[INFO] Resuming: {len(self.done)} sources done, {len(self.progress)} in progress")
+
+    def start_frame(self, source):
+        return self.progress.get(source, -1) + 1
+
+    def mark(self, source, frame_idx):
+        if frame_idx > self.progress.get(source, -1):
+            self.progress[source] = frame_idx
+
+    def finish(self, source):
+        self.done.add(source)
+        self.progress.pop(source, None)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "progress": self.progress}, f)
+        os.replace(tmp, self.path)
+
+
+class DbSink:
+    """Persist like the live feed: labelled snapshot + detection row."""
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.count = 0
+
+    def write(self, task, detections):
+        key = f"{source_key(task['source'])}f{task['index']}"
+        for n, (_, _, mapped_label, confidence) in enumerate(detections):
+            self.count += 1
+            write_detection(task["frame"], self.camera_id, f"{key}d{n}", confidence, mapped_label)
+
+    def written(self, sources):
+        """(source, frame) pairs of `sources` that already have detection rows, from the snapshot names."""
+        by_key = {source_key(s): s for s in sources}
+        pairs = set()
+        for path in get_detection_image_paths(self.camera_id, "%_det%f%d%_conf%"):
+            m = _FRAME_KEY.search(os.path.basename(path))
+            if m and m.group(1) in by_key:
+                pairs.add((by_key[m.group(1)], int(m.group(2))))
+        return pairs
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Append one JSON line per detection."""
+    def __init__(self, path):
+        self.path = path
+        _trim_partial_line(path)
+        self.f = open(path, "a", encoding="utf-8")
+        self.count = 0
+
+    def write(self, task, detections):
+        lines = []
+        for xyxy, raw_label, mapped_label, confidence in detections:
+            self.count += 1
+            lines.append(json.dumps({
+                "source": task["source"],
+                "frame": task["index"],
+                "source_time": round(task["source_time"], 3),
+                "ai_result": mapped_label,
+                "raw_label": raw_label,
+                "confidence": round(confidence, 4),
+                "xyxy": [round(v, 1) for v in xyxy],
+            }) + "\n")
+        self.f.write("".join(lines))  # one write per frame, so a crash cannot split a frame
+
+    def written(self, sources):
+        """(source, frame) pairs of `sources` already in the results file."""
+        self.f.flush()
+        pairs = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row.get("source") in sources:
+                    pairs.add((row["source"], row["frame"]))
+        return pairs
+
+    def close(self):
+        self.f.close()
+
+
+def _trim_partial_line(path):
+    """Cut a half-written last line left by a crash, so appending starts on a line boundary."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                if pos + newline + 1 < end:
+                    f.truncate(pos + newline + 1)
+                return
+        f.truncate(0)
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _task(source, index, full, source_time):
+    return {
+        "source": source,
+        "index": index,
+        "full": full,
+        "frame": cv2.resize(full, FRAME_SIZE),
+        "source_time": source_time,
+    }
+
+
+def decode_worker(sources, frames, checkpoint, stride, stop):
+    """Decode whole sources (in frame order) into the shared frame queue."""
+    while not stop.is_set():
+        try:
+            source = sources.get_nowait()
+        except queue.Empty:
+            break
+
+        if source.lower().endswith(IMAGE_EXTS):
+            img = cv2.imread(source)
+            if img is None:
+                print(f"[WARN] Could not read image: {source}")
+            elif not _put(frames, _task(source, 0, img, 0.0), stop):
+                break
+        else:
+            cap = cv2.VideoCapture(source)
+            if not cap.isOpened():
+                print(f"[WARN] Could not open video: {source}")
+            else:
+                fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+                index = checkpoint.start_frame(source)
+                if index > 0:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                while not stop.is_set():
+                    ret, img = cap.read()
+                    if not ret:
+                        break
+                    if index % stride == 0 and not _put(frames, _task(source, index, img, index / fps), stop):
+                        break
+                    index += 1
+                cap.release()
+        _put(frames, {"source": source, "index": _SOURCE_DONE}, stop)
+    _put(frames, None, stop)
+
+
+def run(inputs, sink, workers=4, batch_size=8, stride=1, checkpoint_path=DEFAULT_CHECKPOINT,
+        resume=False, use_cascade=True):
+    checkpoint = Checkpoint(checkpoint_path, resume)
+    pending = [s for s in collect_sources(inputs) if s not in checkpoint.done]
+    if not pending:
+        print("[INFO] Nothing to process.")
+        return
+    # Frames written after the last checkpoint save (crash, kill) are not written again
+    written = sink.written(set(pending)) if resume else set()
+    if written:
+        print(f"[INFO] Skipping {len(written)} frames already written by the interrupted run")
+
+    sources = queue.Queue()
+    for s in pending:
+        sources.put(s)
+    frames = queue.Queue(maxsize=batch_size * 2)
+    stop = threading.Event()
+    handle = registry.current()  # one model version for the whole run
+    cascade = DetectionCascade(handle.model, strict_label_mapping, enabled=use_cascade, lock=handle.lock)
+
+    workers = max(1, min(workers, len(pending)))
+    for _ in range(workers):
+        threading.Thread(target=decode_worker, args=(sources, frames, checkpoint, stride, stop), daemon=True).start()
+
+    batch, finished = [], []
+    frame_count = detection_count = flushes = 0
+    live_workers = workers
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal frame_count, detection_count, flushes
+        for task in [t for t in batch if (t["source"], t["index"]) in written]:
+            checkpoint.mark(task["source"], task["index"])
+            batch.remove(task)
+        if batch:
+            results = handle.predict([t["frame"] for t in batch], INFER_IMGSZ)
+            for task, r in zip(batch, results):
+                detections = extract_detections(r, cascade, task["full"], task["frame"].shape)
+                sink.write(task, detections)
+                checkpoint.mark(task["source"], task["index"])
+                detection_count += len(detections)
+            frame_count += len(batch)
+            batch.clear()
+        # A source is only done once every frame queued before its end marker has been flushed
+        for source in finished:
+            checkpoint.finish(source)
+        finished.clear()
+        flushes += 1
+        if flushes % CHECKPOINT_EVERY == 0:
+            checkpoint.save()
+
+    try:
+        while live_workers:
+            item = frames.get()
+            if item is None:
+                live_workers -= 1
+            elif item["index"] == _SOURCE_DONE:
+                finished.append(item["source"])
+            else:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted, saving checkpoint…")
+    finally:
+        stop.set()
+        checkpoint.save()
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    fps = frame_count / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {frame_count} frames from {len(pending)} sources in {elapsed:.1f}s "
+          f"({fps:.1f} frames/s), {detection_count} detections")
+    if use_cascade:
+        print(cascade.summary())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ID detector over video files and image folders.")
+    parser.add_argument("inputs", nargs="+", help="video files, images or directories")
+    parser.add_argument("--sink", choices=["db", "file"], default="file",
+                        help="write detections to the database or to a results file")
+    parser.add_argument("--results", default="batch_results.jsonl", help="results file for --sink file")
+    parser.add_argument("--camera-id", type=int, default=1, help="camera_id for rows written with --sink db")
+    parser.add_argument("--workers", type=int, default=4, help="decode worker threads")
+    parser.add_argument("--batch", type=int, default=8, help="frames per model.predict call")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth video frame")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file for --resume")
+    parser.add_argument("--resume", action="store_true", help="skip work recorded in the checkpoint")
+    parser.add_argument("--no-cascade", action="store_true", help="disable the full-res verify stage")
+    args = parser.parse_args(argv)
+
+    sink = DbSink(args.camera_id) if args.sink == "db" else FileSink(args.results)
+    run(args.inputs, sink, workers=args.workers, batch_size=max(1, args.batch), stride=max(1, args.stride),
+        checkpoint_path=args.checkpoint, resume=args.resume, use_cascade=not args.no_cascade)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Stage-level micro-benchmarks for the detection pipeline, run fully offline.
+
+    python benchmark.py --save bench_baseline.json
+    python benchmark.py --clip sample.mp4 --compare bench_baseline.json
+    python benchmark.py --only frame,encode,db --quick
+
+Groups: frame (resize/copy), predict (imgsz x batch), postprocess (label mapping + box
+extraction), encode (snapshot JPEG), db (insert_detection against a local SQLite stand-in),
+storage (insert and query throughput of the SQLite and MySQL backends side by side; MySQL runs
+in a scratch database and is skipped when no server is reachable), guard (populate_logs_table
+at 1k/10k/100k rows). Groups that need the model or Qt are skipped with a note when those are
+unavailable.
+"""
+import argparse, json, os, platform, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import storage
+
+GROUPS = ("frame", "predict", "postprocess", "encode", "db", "storage", "guard")
+SOURCE_SIZE = (1920, 1080)
+FRAME_SIZE = (640, 384)  # same as cctv_feed.FRAME_SIZE; kept here so model-free groups skip the model load
+PREDICT_IMGSZ = (320, 384, 640)
+PREDICT_BATCH = (1, 4)
+GUARD_ROWS = (1_000, 10_000, 100_000)
+STORAGE_ROWS = 20_000  # detections seeded before the storage query benchmarks
+STORAGE_BATCH = 500
+BENCH_MYSQL_DATABASE = "ai_id_detector_bench"  # scratch database, dropped afterwards
+DEFAULT_TOLERANCE = 0.15  # relative slowdown that counts as a regression
+
+
+def measure(fn, iterations=50, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "iterations": iterations,
+        "median_ms": median,
+        "mean_ms": statistics.fmean(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "ops_per_s": 1000.0 / median if median > 0 else 0.0,
+    }
+
+
+def load_frames(clip_path=None, count=32):
+    """Frames from a recorded clip if given, otherwise deterministic synthetic noise."""
+    frames = []
+    if clip_path:
+        cap = cv2.VideoCapture(clip_path)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            print(f"[WARN] Could not read frames from {clip_path}, using synthetic frames")
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (SOURCE_SIZE[1], SOURCE_SIZE[0], 3), dtype=np.uint8) for _ in range(4)]
+    return frames
+
+
+# -----------------------------
+# DB stand-in
+# -----------------------------
+def _seed(conn, rows, start=datetime(2024, 1, 1)):
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO detection (camera_id, confidence_score, ai_result, image_path, `timestamp`) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(1 + i % 4, 0.5 + (i % 50) / 100, "person_with_id" if i % 3 else "person_without_id", "",
+              start + timedelta(seconds=30 * i)) for i in range(rows)]
+        )
+    conn.commit()
+
+
+def make_stand_in(rows=0):
+    """Temp-file SQLite backend with `rows` detections; returns a get_connection() replacement."""
+    backend = storage.SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix="aiid_bench_"), "bench.db"))
+    conn = backend.connect()
+    _seed(conn, rows)
+    conn.close()
+    return backend.connect
+
+
+# -----------------------------
+# Groups
+# -----------------------------
+def bench_frame(frames, quick):
+    results = {}
+    src = frames[0]
+    dst = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    n = 50 if quick else 200
+    results["frame.resize_alloc"] = measure(lambda: cv2.resize(src, FRAME_SIZE), n)
+    results["frame.resize_into"] = measure(lambda: cv2.resize(src, FRAME_SIZE, dst=dst), n)
+    results["frame.copy"] = measure(lambda: dst.copy(), n)
+    rgb = np.empty_like(dst)
+    results["frame.bgr2rgb_into"] = measure(lambda: cv2.cvtColor(dst, cv2.COLOR_BGR2RGB, dst=rgb), n)
+    return results
+
+
+def bench_predict(frames, quick):
+    from cctv_feed import registry
+    model = registry.current().model
+    small = [cv2.resize(f, FRAME_SIZE) for f in frames]
+    results = {}
+    for imgsz in PREDICT_IMGSZ:
+        for batch in PREDICT_BATCH:
+            src = [small[i % len(small)] for i in range(batch)]
+            src = src[0] if batch == 1 else src
+            results[f"predict.imgsz{imgsz}.batch{batch}"] = measure(
+                lambda: model.predict(source=src, imgsz=imgsz, show=False, save=False, verbose=False),
+                5 if quick else 20, warmup=2
+            )
+    return results
+
+
+def _fake_result(names, boxes=8):
+    rng = np.random.default_rng(1)
+    fake = []
+    for i in range(boxes):
+        x, y = rng.uniform(0, 500), rng.uniform(0, 250)
+        fake.append(SimpleNamespace(
+            cls=np.array([i % len(names)]), conf=np.array([rng.uniform(0.2, 0.95)]),
+            xyxy=np.array([[x, y, x + 80, y + 120]]),
+        ))
+    return SimpleNamespace(boxes=fake, names=names)
+
+
+def bench_postprocess(frames, quick):
+    from labels import strict_label_mapping, LABEL_MAP
+    from cctv_feed import registry, extract_detections
+    from cascade import DetectionCascade
+    model = registry.current().model
+    labels = list(LABEL_MAP) + ["person", "unknown"]
+    results = {"postprocess.label_mapping_x1000": measure(
+        lambda: [strict_label_mapping(labels[i % len(labels)]) for i in range(1000)], 50 if quick else 200)}
+    result = _fake_result(model.names)
+    no_cascade = DetectionCascade(model, strict_label_mapping, enabled=False)
+    results["postprocess.extract_8_boxes"] = measure(
+        lambda: extract_detections(result, no_cascade, None, (384, 640, 3)), 200 if quick else 1000)
+    return results
+
+
+def bench_encode(frames, quick):
+    small = cv2.resize(frames[0], FRAME_SIZE)
+    path = os.path.join(tempfile.mkdtemp(prefix="aiid_bench_"), "snap.jpg")
+    n = 30 if quick else 100
+    return {
+        "encode.imencode_jpg": measure(lambda: cv2.imencode(".jpg", small), n),
+        "encode.imwrite_jpg": measure(lambda: cv2.imwrite(path, small), n),
+        "encode.imwrite_jpg_x3": measure(lambda: [cv2.imwrite(path, small) for _ in range(3)], n),
+    }
+
+
+def bench_db(frames, quick):
+    import database
+    original = database.get_connection
+    database.get_connection = make_stand_in()
+    try:
+        return {"db.insert_detection": measure(
+            lambda: database.insert_detection(1, 0.8, "person_without_id", "x.jpg", "2024-01-01 00:00:00"),
+            100 if quick else 500)}
+    finally:
+        database.get_connection = original
+
+
+def _mysql_bench_backend():
+    """A MySQL backend on a fresh scratch database with the migrated schema, or None without a server."""
+    import migrations
+    server = storage.MySQLBackend({k: v for k, v in storage.MYSQL_CONFIG.items() if k != "database"})
+    try:
+        conn = server.connect()
+    except (RuntimeError, *storage.Error) as e:
+        print(f"[WARN] MySQL not available for storage benchmarks: {e}")
+        return None, None
+    with conn.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS `{BENCH_MYSQL_DATABASE}`")
+        cur.execute(f"CREATE DATABASE `{BENCH_MYSQL_DATABASE}`")
+    conn.close()
+    backend = storage.MySQLBackend({**storage.MYSQL_CONFIG, "database": BENCH_MYSQL_DATABASE})
+    conn = backend.connect()
+    with conn.cursor() as cur:
+        for _, _, apply in migrations.MIGRATIONS:
+            apply(cur)
+    conn.commit()
+    conn.close()
+
+    def drop():
+        conn = server.connect()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS `{BENCH_MYSQL_DATABASE}`")
+        conn.close()
+    return backend, drop
+
+
+def bench_storage(frames, quick):
+    import database
+    n = 50 if quick else 300
+    rows = STORAGE_ROWS // 10 if quick else STORAGE_ROWS
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 1) + timedelta(seconds=30 * rows)
+    backends = [storage.SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix="aiid_bench_"), "bench.db"))]
+    mysql_backend, drop_mysql = _mysql_bench_backend()
+    if mysql_backend:
+        backends.append(mysql_backend)
+
+    results = {}
+    previous = storage.backend() if storage.DB_BACKEND in storage.BACKENDS else None
+    try:
+        for backend in backends:
+            storage.use_backend(backend)
+            prefix = f"storage.{backend.name}"
+            conn = backend.connect()
+            _seed(conn, rows)
+            conn.close()
+
+            results[f"{prefix}.insert_detection"] = measure(
+                lambda: database.insert_detection(2, 0.8, "person_without_id", "x.jpg", "2024-01-02 00:00:00"), n)
+
+            def insert_batch():
+                conn = database.get_connection()
+                _seed(conn, STORAGE_BATCH)
+                conn.close()
+            results[f"{prefix}.insert_batch_{STORAGE_BATCH}"] = measure(insert_batch, max(5, n // 20))
+
+            def query(sql, params=(), dictionary=False):
+                def run():
+                    conn = database.get_connection()
+                    try:
+                        with conn.cursor(dictionary=dictionary) as cur:
+                            cur.execute(sql, params)
+                            cur.fetchall()
+                    finally:
+                        conn.close()
+                return run
+            results[f"{prefix}.guard_log_page"] = measure(query(
+                "SELECT * FROM detection ORDER BY detection_id DESC LIMIT 100", dictionary=True), n)
+            results[f"{prefix}.camera_range_count"] = measure(query(
+                "SELECT COUNT(*) FROM detection WHERE camera_id=%s AND `timestamp` >= %s AND `timestamp` < %s",
+                (1, start, end)), n)
+            results[f"{prefix}.result_breakdown"] = measure(query(
+                "SELECT ai_result, COUNT(*) FROM detection WHERE `timestamp` >= %s AND `timestamp` < %s "
+                "GROUP BY ai_result", (start, end)), max(5, n // 10))
+            results[f"{prefix}.detection_totals"] = measure(
+                lambda: database.get_detection_totals(datetime(2024, 1, 2), datetime(2024, 1, 3)), n)
+    finally:
+        storage.use_backend(previous)
+        if drop_mysql:
+            drop_mysql()
+    return results
+
+
+def bench_guard(frames, quick):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    import guard_dashboard_ui as gd
+
+    class _NoFeed:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def start_feed(self):
+            pass
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    import database
+    original_feed, original_conn, original_db_conn = gd.CCTVFeed, gd.get_connection, database.get_connection
+    gd.CCTVFeed = _NoFeed
+    results = {}
+    try:
+        for rows in GUARD_ROWS[:1] if quick else GUARD_ROWS:
+            gd.get_connection = database.get_connection = make_stand_in(rows)
+
+            def run():
+                win = gd.GuardDashboardWindow(user_id=1, username="bench")
+                win.auto_refresh_timer.stop()
+                win.show_logs()
+                win.close()
+                win.deleteLater()
+                app.processEvents()
+
+            results[f"guard.populate_logs_table.{rows}"] = measure(run, iterations=1, warmup=0)
+    finally:
+        gd.CCTVFeed, gd.get_connection, database.get_connection = original_feed, original_conn, original_db_conn
+    return results
+
+
+BENCHES = {
+    "frame": bench_frame,
+    "predict": bench_predict,
+    "postprocess": bench_postprocess,
+    "encode": bench_encode,
+    "db": bench_db,
+    "storage": bench_storage,
+    "guard": bench_guard,
+}
+
+
+# -----------------------------
+# Baselines
+# -----------------------------
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Print a median-time comparison; returns the names that regressed beyond `tolerance`."""
+    regressions = []
+    print(f"{'benchmark':45s} {'baseline ms':>12s} {'current ms':>12s} {'change':>8s}")
+    for name, cur in sorted(current.items()):
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:45s} {'-':>12s} {cur['median_ms']:12.3f} {'new':>8s}")
+            continue
+        change = (cur["median_ms"] - base["median_ms"]) / base["median_ms"] if base["median_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:45s} {base['median_ms']:12.3f} {cur['median_ms']:12.3f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for the detection pipeline.")
+    parser.add_argument("--only", help=f"comma-separated groups ({','.join(GROUPS)})")
+    parser.add_argument("--clip", help="recorded video to take frames from instead of synthetic ones")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, smallest guard table only")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative median slowdown treated as a regression")
+    args = parser.parse_args(argv)
+
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    frames = load_frames(args.clip)
+    results = {}
+    for group in groups:
+        if group not in BENCHES:
+            parser.error(f"unknown group: {group}")
+        try:
+            results.update(BENCHES[group](frames, args.quick))
+        except Exception as e:
+            print(f"[WARN] Skipping '{group}' benchmarks: {e}")
+
+    for name, r in sorted(results.items()):
+        print(f"{name:45s} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  ({r['iterations']} runs)")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline["results"], results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Lease-based camera assignment across detector nodes.
+
+Every node heartbeats into `detector_node` and holds time-limited leases on rows of `camera`
+(lease_owner / lease_expires, migration 5). Each heartbeat a node:
+  1. renews the leases it holds and notices any it lost,
+  2. works out its fair share: total cameras weighted by its capacity over the live nodes,
+  3. releases cameras above that share (so a node that joins gets work), and
+  4. claims free or expired cameras up to the share.
+A node that dies stops renewing; its leases expire after LEASE_SECONDS, it drops out of the live
+set and the remaining nodes take its cameras on their next heartbeat. All times are the
+database's NOW(), so node clocks do not need to agree. Only cameras with a stream_url are leased.
+
+    python camera_leases.py                                # run a headless detector node
+    python camera_leases.py --simulate 3 --kill-after 60   # lease-only nodes as local processes
+"""
+import os, sys, math, time, socket
+from database import get_connection, Error
+
+LEASE_SECONDS = 40  # four heartbeats: one missed heartbeat is tolerated, see _expire_if_stale
+HEARTBEAT_SECONDS = 10
+NODE_ID = os.environ.get("AI_ID_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+NODE_CAPACITY = int(os.environ.get("AI_ID_NODE_CAPACITY", "4"))
+
+
+class LeaseManager:
+    """
+    Keeps this node's share of cameras leased. Call tick() every HEARTBEAT_SECONDS; it calls
+    `on_acquire(camera_id, stream_url)` for cameras gained and `on_release(camera_id)` for cameras
+    given up or lost, on the calling thread.
+    """
+    def __init__(self, on_acquire, on_release, node_id=NODE_ID, capacity=NODE_CAPACITY,
+                 lease_seconds=LEASE_SECONDS, heartbeat_seconds=HEARTBEAT_SECONDS):
+        self.node_id = node_id
+        self.capacity = capacity
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self.held = {}  # camera_id -> stream_url
+        self._renewed_at = time.monotonic()
+
+    def tick(self):
+        conn = get_connection()
+        if not conn:
+            self._expire_if_stale()
+            return
+        try:
+            with conn.cursor() as cur:
+                self._heartbeat(cur)
+                current = self._renew(cur)
+                conn.commit()
+                self._renewed_at = time.monotonic()
+                self._sync(current)
+
+                target = self._fair_share(cur)
+                if len(self.held) > target:
+                    excess = sorted(self.held)[target:]
+                    for camera_id in excess:
+                        self._drop(camera_id)  # stop the feed before another node can start it
+                    self._release(cur, excess)
+                    conn.commit()
+                    print(f"[INFO] Node {self.node_id} released cameras {excess} (share {target})")
+                elif len(self.held) < target:
+                    self._claim(cur, target - len(self.held))
+                    conn.commit()
+                    self._sync(self._renew(cur))
+        except Error as e:
+            print(f"[ERROR] Camera lease heartbeat failed: {e}")
+            self._expire_if_stale()
+        finally:
+            conn.close()
+
+    def stop(self):
+        """Stop every feed and hand the cameras back immediately instead of waiting for expiry."""
+        for camera_id in list(self.held):
+            self._drop(camera_id)
+        conn = get_connection()
+        if not conn:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE camera SET lease_owner=NULL, lease_expires=NULL WHERE lease_owner=%s",
+                            (self.node_id,))
+                cur.execute("DELETE FROM detector_node WHERE node_id=%s", (self.node_id,))
+                conn.commit()
+        except Error as e:
+            print(f"[ERROR] Failed to release camera leases: {e}")
+        finally:
+            conn.close()
+
+    def _heartbeat(self, cur):
+        cur.execute(
+            "INSERT INTO detector_node (node_id, capacity, last_seen) VALUES (%s, %s, NOW()) "
+            "ON DUPLICATE KEY UPDATE capacity=VALUES(capacity), last_seen=NOW()",
+            (self.node_id, self.capacity)
+        )
+        # Forget nodes that have been gone for a while; live-ness itself is last_seen
+        cur.execute("DELETE FROM detector_node WHERE last_seen < NOW() - INTERVAL %s SECOND",
+                    (self.lease_seconds * 10,))
+
+    def _renew(self, cur):
+        """Extend every lease this node still owns; returns {camera_id: stream_url} actually held."""
+        cur.execute("UPDATE camera SET lease_expires = NOW() + INTERVAL %s SECOND WHERE lease_owner=%s",
+                    (self.lease_seconds, self.node_id))
+        cur.execute("SELECT camera_id, stream_url FROM camera WHERE lease_owner=%s", (self.node_id,))
+        return dict(cur.fetchall())
+
+    def _fair_share(self, cur):
+        cur.execute("SELECT COUNT(*) FROM camera WHERE stream_url IS NOT NULL AND stream_url <> ''")
+        cameras = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(SUM(capacity), 0) FROM detector_node WHERE last_seen >= NOW() - INTERVAL %s SECOND",
+                    (self.lease_seconds,))
+        live_capacity = int(cur.fetchone()[0]) or self.capacity
+        return min(self.capacity, math.ceil(cameras * self.capacity / live_capacity))
+
+    def _claim(self, cur, count):
+        # Single-statement UPDATE: two nodes racing for the same row cannot both win it
+        cur.execute(
+            "UPDATE camera SET lease_owner=%s, lease_expires = NOW() + INTERVAL %s SECOND "
+            "WHERE stream_url IS NOT NULL AND stream_url <> '' "
+            "AND (lease_owner IS NULL OR lease_expires < NOW()) "
+            "ORDER BY camera_id LIMIT %s",
+            (self.node_id, self.lease_seconds, count)
+        )
+
+    def _release(self, cur, camera_ids):
+        placeholders = ", ".join(["%s"] * len(camera_ids))
+        cur.execute(
+            f"UPDATE camera SET lease_owner=NULL, lease_expires=NULL "
+            f"WHERE lease_owner=%s AND camera_id IN ({placeholders})",
+            (self.node_id, *camera_ids)
+        )
+
+    def _sync(self, current):
+        for camera_id in [c for c in self.held if c not in current]:
+            print(f"[WARN] Node {self.node_id} lost the lease on camera {camera_id}")
+            self._drop(camera_id)
+        for camera_id, stream_url in current.items():
+            if camera_id not in self.held:
+                self.held[camera_id] = stream_url
+                self.on_acquire(camera_id, stream_url)
+
+    def _drop(self, camera_id):
+        if camera_id in self.held:
+            del self.held[camera_id]
+            self.on_release(camera_id)
+
+    def _expire_if_stale(self):
+        # Without the database we cannot renew: stop before the leases run out and another node starts.
+        # Ticks are heartbeat_seconds apart, so the last tick that still lands before expiry is the
+        # one at lease - 2 heartbeats or later; stopping there leaves at least a heartbeat of margin.
+        if self.held and time.monotonic() - self._renewed_at >= self.lease_seconds - 2 * self.heartbeat_seconds:
+            print(f"[WARN] Node {self.node_id} cannot renew leases, stopping {len(self.held)} camera(s)")
+            for camera_id in list(self.held):
+                self._drop(camera_id)
+
+
+# -----------------------------
+# Runners
+# -----------------------------
+def run_node(node_id=NODE_ID, capacity=NODE_CAPACITY):
+    """Headless detector node: one CCTVFeed per leased camera, renewed on the Qt event loop."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QLabel
+    from PySide6.QtCore import QTimer
+    from cctv_feed import CCTVFeed
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    feeds = {}
+
+    def acquire(camera_id, stream_url):
+        print(f"[INFO] Node {node_id} starting camera {camera_id}")
+        feed = CCTVFeed(QLabel(), camera_id=camera_id, source=stream_url)
+        feed.start_feed()
+        feeds[camera_id] = feed
+
+    def release(camera_id):
+        print(f"[INFO] Node {node_id} stopping camera {camera_id}")
+        feeds.pop(camera_id).stop_feed()
+
+    manager = LeaseManager(acquire, release, node_id, capacity)
+    timer = QTimer()
+    timer.timeout.connect(manager.tick)
+    timer.start(HEARTBEAT_SECONDS * 1000)
+    QTimer.singleShot(0, manager.tick)
+    app.aboutToQuit.connect(manager.stop)
+    return app.exec()
+
+
+def _lease_only_node(node_id, capacity, lease_seconds, heartbeat):
+    manager = LeaseManager(
+        lambda camera_id, url: print(f"  {node_id} + camera {camera_id}", flush=True),
+        lambda camera_id: print(f"  {node_id} - camera {camera_id}", flush=True),
+        node_id, capacity, lease_seconds, heartbeat,
+    )
+    try:
+        while True:
+            manager.tick()
+            time.sleep(heartbeat)
+    except KeyboardInterrupt:
+        manager.stop()
+
+
+def print_assignments():
+    conn = get_connection()
+    if not conn:
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT lease_owner, COUNT(*) FROM camera "
+                        "WHERE stream_url IS NOT NULL AND stream_url <> '' GROUP BY lease_owner")
+            owners = ", ".join(f"{owner or 'unassigned'}={count}" for owner, count in cur.fetchall())
+        print(f"[{time.strftime('%H:%M:%S')}] {owners}", flush=True)
+    finally:
+        conn.close()
+
+
+def simulate(nodes, capacity, duration, kill_after=None, lease_seconds=6, heartbeat=2):
+    """
+    Run `nodes` lease-only processes against the configured database, one more joining halfway
+    through, and optionally kill the first one after `kill_after` seconds to exercise takeover.
+    Leases are short so the takeover shows up within the run.
+    """
+    import multiprocessing
+    procs = []
+
+    def spawn(i):
+        p = multiprocessing.Process(target=_lease_only_node, args=(f"sim-{i}", capacity, lease_seconds, heartbeat), daemon=True)
+        p.start()
+        procs.append(p)
+
+    for i in range(nodes):
+        spawn(i)
+    started = time.monotonic()
+    joined = killed = False
+    while time.monotonic() - started < duration:
+        time.sleep(heartbeat)
+        elapsed = time.monotonic() - started
+        if not joined and elapsed >= duration / 2:
+            print(f"[INFO] sim-{nodes} joining")
+            spawn(nodes)
+            joined = True
+        if kill_after is not None and not killed and elapsed >= kill_after:
+            print("[INFO] Killing sim-0 without releasing its leases")
+            procs[0].kill()
+            killed = True
+        print_assignments()
+    for p in procs:
+        p.terminate()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a detector node that leases its share of cameras.")
+    parser.add_argument("--node-id", default=NODE_ID)
+    parser.add_argument("--capacity", type=int, default=NODE_CAPACITY)
+    parser.add_argument("--simulate", type=int, metavar="N", help="run N lease-only nodes as local processes")
+    parser.add_argument("--duration", type=float, default=120, help="seconds to simulate")
+    parser.add_argument("--kill-after", type=float, help="kill one simulated node after this many seconds")
+    args = parser.parse_args()
+    if args.simulate:
+        simulate(args.simulate, args.capacity, args.duration, args.kill_after)
+    else:
+        sys.exit(run_node(args.node_id, args.capacity))
@@ -0,0 +1,132 @@
+import threading
+import time
+import numpy as np
+
+CASCADE_ENABLED = True
+UNCERTAIN_BAND = (0.25, 0.60)  # stage-one confidences in [low, high) get re-checked
+VERIFY_IMGSZ = 640
+CROP_MARGIN = 0.15  # fraction of box size added on each side of the full-res crop
+MIN_IOU = 0.3  # a stage-two box must overlap the projected stage-one box this much
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+class CascadeStats:
+    """Counters for how often (and how expensively) the high-res stage runs."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.boxes = 0
+        self.verified = 0
+        self.relabeled = 0
+        self.verify_seconds = 0.0
+
+    def record(self, verified=False, relabeled=False, seconds=0.0):
+        with self._lock:
+            self.boxes += 1
+            if verified:
+                self.verified += 1
+                self.verify_seconds += seconds
+            if relabeled:
+                self.relabeled += 1
+
+    def as_dict(self):
+        with self._lock:
+            rate = self.verified / self.boxes if self.boxes else 0.0
+            avg_ms = self.verify_seconds / self.verified * 1000 if self.verified else 0.0
+            return {
+                "boxes": self.boxes,
+                "verified": self.verified,
+                "relabeled": self.relabeled,
+                "stage_two_rate": rate,
+                "avg_verify_ms": avg_ms,
+            }
+
+    def summary(self):
+        d = self.as_dict()
+        return (f"cascade: {d['verified']}/{d['boxes']} boxes re-checked "
+                f"({d['stage_two_rate']:.1%}), {d['relabeled']} relabeled, "
+                f"{d['avg_verify_ms']:.1f} ms avg")
+
+
+class DetectionCascade:
+    """
+    Low-res detect / high-res verify.
+    Stage one is the normal downsampled predict; boxes whose confidence falls in the uncertain
+    band are re-run on a crop of the original full-resolution frame, which is where small ID
+    badges are still legible.
+    """
+    def __init__(self, model, label_fn, band=UNCERTAIN_BAND, imgsz=VERIFY_IMGSZ,
+                 margin=CROP_MARGIN, enabled=CASCADE_ENABLED, lock=None):
+        self.model = model
+        self.lock = lock or threading.Lock()  # pass the model's shared predict lock when cameras share it
+        self.label_fn = label_fn
+        self.band = band
+        self.imgsz = imgsz
+        self.margin = margin
+        self.enabled = enabled
+        self.stats = CascadeStats()
+
+    def use(self, model, lock):
+        """Point stage two at another model (after a hot swap). Call between frames."""
+        self.model = model
+        self.lock = lock
+
+    def needs_verify(self, confidence):
+        return self.enabled and self.band[0] <= confidence < self.band[1]
+
+    def refine(self, full_frame, low_shape, xyxy, raw_label, mapped_label, confidence):
+        """
+        Return (raw_label, mapped_label, confidence) for a stage-one box, re-checked at full
+        resolution when its confidence is uncertain. `low_shape` is the stage-one frame shape.
+        """
+        if full_frame is None or not self.needs_verify(confidence):
+            self.stats.record()
+            return raw_label, mapped_label, confidence
+
+        start = time.perf_counter()
+        result = self._verify(full_frame, low_shape, xyxy)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            self.stats.record(verified=True, seconds=elapsed)
+            return raw_label, mapped_label, confidence
+
+        new_raw, new_conf = result
+        new_mapped = self.label_fn(new_raw)
+        self.stats.record(verified=True, relabeled=new_mapped != mapped_label, seconds=elapsed)
+        return new_raw, new_mapped, new_conf
+
+    def _verify(self, full_frame, low_shape, xyxy):
+        fh, fw = full_frame.shape[:2]
+        sx, sy = fw / low_shape[1], fh / low_shape[0]
+        x1, y1, x2, y2 = xyxy[0] * sx, xyxy[1] * sy, xyxy[2] * sx, xyxy[3] * sy
+        mx, my = (x2 - x1) * self.margin, (y2 - y1) * self.margin
+        cx1, cy1 = max(0, int(x1 - mx)), max(0, int(y1 - my))
+        cx2, cy2 = min(fw, int(x2 + mx)), min(fh, int(y2 + my))
+        if cx2 <= cx1 or cy2 <= cy1:
+            return None
+
+        crop = np.ascontiguousarray(full_frame[cy1:cy2, cx1:cx2])
+        target = (x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1)
+        with self.lock:
+            results = self.model.predict(source=crop, imgsz=self.imgsz, show=False, save=False, verbose=False)
+
+        best = None
+        for r in results:
+            if not hasattr(r, "boxes") or r.boxes is None:
+                continue
+            for box in r.boxes:
+                if box_iou(box.xyxy[0].tolist(), target) < MIN_IOU:
+                    continue
+                conf = float(box.conf[0])
+                if best is None or conf > best[1]:
+                    best = (str(self.model.names[int(box.cls[0])]).lower().strip(), conf)
+        return best
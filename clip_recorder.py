@@ -0,0 +1,178 @@
+import os, time, threading, queue
+from collections import deque
+from datetime import datetime
+import cv2
+import numpy as np
+from database import update_detection_clip
+
+CLIP_FPS = 10
+PRE_EVENT_SECONDS = 5
+POST_EVENT_SECONDS = 5
+MAX_EXTEND_SECONDS = 10  # how far later events may stretch one clip before a new one starts
+MAX_RING_BYTES = 16 * 1024 * 1024  # per camera: the ring plus clips waiting to be encoded
+JPEG_QUALITY = 70
+MAX_PENDING_ENCODES = 8
+
+
+class _PendingClip:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.detection_ids = []
+
+
+class ClipRecorder:
+    """
+    Per-camera ring of recent JPEG-compressed frames, capped by bytes.
+    trigger() marks an event; once the post-event window has been captured the frames are
+    handed to a background encoder thread that writes the clip and links it to the detection rows.
+    Neither push() nor trigger() ever waits on encoding.
+
+    max_bytes covers the ring and the frames of queued clips together (shared frames are counted
+    twice, so it is an upper bound): a queued clip is trimmed to its newest frames if it does not
+    fit, and the ring gives up its oldest frames while clips wait for the encoder.
+    """
+    def __init__(self, camera_id, output_folder, fps=CLIP_FPS, pre_seconds=PRE_EVENT_SECONDS,
+                 post_seconds=POST_EVENT_SECONDS, max_extend_seconds=MAX_EXTEND_SECONDS,
+                 max_bytes=MAX_RING_BYTES, quality=JPEG_QUALITY):
+        self.camera_id = camera_id
+        self.output_folder = output_folder
+        self.fps = fps
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_clip_seconds = pre_seconds + post_seconds + max_extend_seconds
+        self.max_bytes = max_bytes
+        self.quality = quality
+
+        self._lock = threading.Lock()
+        self._ring = deque()  # (timestamp, jpeg bytes)
+        self._ring_bytes = 0
+        self._queued_bytes = 0  # frames held by clips waiting for (or in) the encoder
+        self._last_push = 0.0
+        self._pending = None
+        self._jobs = queue.Queue(maxsize=MAX_PENDING_ENCODES)
+        self.dropped_clips = 0
+
+        os.makedirs(self.output_folder, exist_ok=True)
+        threading.Thread(target=self._encode_loop, name=f"clip-encoder-cam{camera_id}", daemon=True).start()
+
+    @property
+    def ring_bytes(self):
+        return self._ring_bytes
+
+    @property
+    def queued_bytes(self):
+        return self._queued_bytes
+
+    def _evict(self, horizon):
+        """Drop the oldest ring frames until the ring and the queued clips fit max_bytes. Holds _lock."""
+        while self._ring and (self._ring_bytes + self._queued_bytes > self.max_bytes or self._ring[0][0] < horizon):
+            _, old = self._ring.popleft()
+            self._ring_bytes -= len(old)
+
+    def push(self, frame, ts=None):
+        """Compress and keep a frame (throttled to `fps`). Called from the capture thread."""
+        ts = ts or time.time()
+        if ts - self._last_push < 1.0 / self.fps:
+            return
+        self._last_push = ts
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        data = buf.tobytes()
+
+        ready = None
+        with self._lock:
+            self._ring.append((ts, data))
+            self._ring_bytes += len(data)
+            self._evict(ts - self.max_clip_seconds)
+            if self._pending and ts >= self._pending.end:
+                ready, self._pending = self._pending, None
+                frames = [f for f in self._ring if ready.start <= f[0] <= ready.end]
+        if ready:
+            self._submit(ready, frames)
+
+    def trigger(self, detection_id, ts=None):
+        """
+        Request a clip around `ts`; events inside an open clip window share that clip. Each event
+        extends the window, but never past max_clip_seconds, so continuous activity is cut into
+        consecutive clips that the ring still holds in full.
+        """
+        ts = ts or time.time()
+        ready = None
+        with self._lock:
+            if self._pending and ts <= self._pending.end:
+                limit = self._pending.start + self.max_clip_seconds
+                self._pending.end = min(max(self._pending.end, ts + self.post_seconds), limit)
+            else:
+                if self._pending:  # past the window before a push closed it: close it here
+                    ready = self._pending
+                    frames = [f for f in self._ring if ready.start <= f[0] <= ready.end]
+                self._pending = _PendingClip(ts - self.pre_seconds, ts + self.post_seconds)
+            self._pending.detection_ids.append(detection_id)
+        if ready:
+            self._submit(ready, frames)
+
+    def _submit(self, clip, frames):
+        with self._lock:
+            # Keep the newest frames (the event and what followed) that fit beside the other queued clips
+            room = self.max_bytes - self._queued_bytes
+            size = sum(len(data) for _, data in frames)
+            trimmed = 0
+            while trimmed < len(frames) and size > room:
+                size -= len(frames[trimmed][1])
+                trimmed += 1
+            frames = frames[trimmed:]
+            if not frames:
+                self.dropped_clips += 1
+                print(f"[WARN] Camera {self.camera_id}: clip memory cap reached, dropped clip for {clip.detection_ids}")
+                return
+            try:
+                self._jobs.put_nowait((clip, frames, size))
+            except queue.Full:
+                self.dropped_clips += 1
+                print(f"[WARN] Camera {self.camera_id}: clip encoder busy, dropped clip for {clip.detection_ids}")
+                return
+            if trimmed:
+                print(f"[WARN] Camera {self.camera_id}: clip for {clip.detection_ids} trimmed by {trimmed} frame(s) "
+                      f"to fit the memory cap")
+            self._queued_bytes += size
+            self._evict(0)
+
+    def _encode_loop(self):
+        while True:
+            clip, frames, size = self._jobs.get()
+            try:
+                path = self._write_clip(clip, frames)
+            except Exception as e:
+                print(f"[ERROR] Failed to write clip: {e}")
+                continue
+            finally:
+                frames = None  # release the JPEGs before giving their bytes back to the ring
+                with self._lock:
+                    self._queued_bytes -= size
+            if not path:
+                continue
+            for detection_id in clip.detection_ids:
+                if detection_id:
+                    update_detection_clip(detection_id, path)
+
+    def _write_clip(self, clip, frames):
+        stamp = datetime.fromtimestamp(clip.start).strftime("%Y%m%d_%H%M%S")
+        filename = f"cam{self.camera_id}_det{clip.detection_ids[0]}_{stamp}.mp4"
+        path = os.path.join(self.output_folder, filename)
+
+        writer = None
+        try:
+            for _, data in frames:
+                img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if img is None:
+                    continue
+                if writer is None:
+                    h, w = img.shape[:2]
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+                writer.write(img)
+        finally:
+            if writer is not None:
+                writer.release()
+        return path if writer is not None else None
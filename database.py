@@ -1,23 +1,31 @@
-import mysql.connector
-from mysql.connector import Error
+import csv
 import bcrypt
-from typing import Optional, Dict, List
+import storage
+from storage import Error
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple, Callable
+
+ROLLUP_GRANULARITIES = {
+    "minute": "%Y-%m-%d %H:%M:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+USER_ROLES = ("admin", "guard")
+USER_CSV_COLUMNS = ("name", "role", "username", "password")
+USER_FIELD_LENGTHS = {"name": 100, "username": 50}  # VARCHAR sizes in migrations.py
+IMPORT_BATCH = 500  # users hashed and inserted per transaction
 
 # -----------------------------
 # Database Connection
 # -----------------------------
 def get_connection():
-    """Create and return a MySQL connection."""
-    try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="09096558231pogi",  # Change if needed
-            database="ai_id_detector"
-        )
-        return conn
-    except Error as e:
-        print(f"[ERROR] Could not connect to MySQL: {e}")
+    """Create and return a connection to the configured backend (MySQL, or SQLite: see storage.py)."""
+    try:
+        return storage.connect()
+    except (RuntimeError, *Error) as e:
+        print(f"[ERROR] Could not connect to {storage.backend().name}: {e}")
         return None
 
 # -----------------------------
@@ -26,7 +34,7 @@ def get_connection():
 def insert_user(name: str, role: str, username: str, password: str) -> bool:
     """Insert a new user with hashed password."""
     try:
-        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        hashed = hash_password(password)
     except ValueError as e:
         print(f"[ERROR] Password hashing failed: {e}")
         return False
@@ -49,6 +57,18 @@ def insert_user(name: str, role: str, username: str, password: str) -> bool:
     finally:
         conn.close()
 
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+def hash_passwords(passwords: List[str], pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+    """bcrypt many passwords across CPU cores (bcrypt is deliberately slow: ~0.1-0.3 s each)."""
+    if len(passwords) < 2:
+        return [hash_password(p) for p in passwords]
+    if pool is not None:
+        return list(pool.map(hash_password, passwords, chunksize=8))
+    with ProcessPoolExecutor() as own_pool:
+        return list(own_pool.map(hash_password, passwords, chunksize=8))
+
 def hash_plain_passwords():
     """Hash all existing plain-text passwords in the user table."""
     conn = get_connection()
@@ -57,19 +77,121 @@ def hash_plain_passwords():
     try:
         with conn.cursor(dictionary=True) as cur:
             cur.execute("SELECT user_id, password FROM user")
-            users = cur.fetchall()
-            for u in users:
-                pwd = u["password"]
-                if not pwd.startswith("$2b$"):
-                    hashed = bcrypt.hashpw(pwd.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-                    cur.execute("UPDATE user SET password=%s WHERE user_id=%s", (hashed, u["user_id"]))
-                    print(f"[INFO] Hashed password for user_id {u['user_id']}")
+            plain = [u for u in cur.fetchall() if not u["password"].startswith("$2b$")]
+            hashed = hash_passwords([u["password"] for u in plain])
+            cur.executemany("UPDATE user SET password=%s WHERE user_id=%s",
+                            [(h, u["user_id"]) for h, u in zip(hashed, plain)])
         conn.commit()
+        print(f"[INFO] Hashed {len(plain)} plain-text password(s)")
     except Error as e:
         print(f"[ERROR] Failed to hash plain passwords: {e}")
     finally:
         conn.close()
 
+def read_users_csv(path: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse a user CSV with a header row of name, role, username, password.
+    Returns (valid rows, problems); a row with a problem is left out, never half-imported.
+    """
+    rows, problems, seen = [], [], set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in USER_CSV_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            return [], [f"Missing column(s): {', '.join(missing)}"]
+        for line, raw in enumerate(reader, start=2):
+            row = {c: (raw.get(c) or "").strip() for c in USER_CSV_COLUMNS}
+            row["role"] = row["role"].lower()
+            if not all(row.values()):
+                problems.append(f"Line {line}: empty field")
+            elif row["role"] not in USER_ROLES:
+                problems.append(f"Line {line}: unknown role '{row['role']}'")
+            elif any(len(row[c]) > n for c, n in USER_FIELD_LENGTHS.items()):
+                too_long = next(c for c, n in USER_FIELD_LENGTHS.items() if len(row[c]) > n)
+                problems.append(f"Line {line}: {too_long} longer than {USER_FIELD_LENGTHS[too_long]} characters")
+            elif row["username"].casefold() in seen:
+                problems.append(f"Line {line}: username '{row['username']}' repeated in file")
+            else:
+                seen.add(row["username"].casefold())
+                rows.append(row)
+    return rows, problems
+
+def existing_usernames(usernames: List[str]) -> set:
+    """
+    Which of `usernames` are already taken, case-folded (the column compares case-insensitively).
+    One query per IMPORT_BATCH names, to stay under the bound-parameter limit.
+    """
+    taken = set()
+    if not usernames:
+        return taken
+    conn = get_connection()
+    if not conn:
+        return taken
+    try:
+        with conn.cursor() as cur:
+            for i in range(0, len(usernames), IMPORT_BATCH):
+                chunk = usernames[i:i + IMPORT_BATCH]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(f"SELECT username FROM user WHERE username IN ({placeholders})", chunk)
+                taken.update(row[0].casefold() for row in cur.fetchall())
+        return taken
+    finally:
+        conn.close()
+
+def import_users(rows: List[Dict], progress: Optional[Callable[[int, int], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+    """
+    Bulk-insert users from read_users_csv(). Usernames already in the table are skipped;
+    the rest are hashed in a process pool and inserted IMPORT_BATCH at a time, one transaction
+    per batch (a batch that fails is retried row by row). `progress(done, total)` is called
+    after each batch. Returns
+    {"inserted": n, "skipped": [usernames], "errors": [messages]}.
+    """
+    result = {"inserted": 0, "skipped": [], "errors": []}
+    try:
+        taken = existing_usernames([r["username"] for r in rows])
+    except Error as e:
+        result["errors"].append(f"Duplicate check failed: {e}")
+        return result
+    result["skipped"] = sorted(r["username"] for r in rows if r["username"].casefold() in taken)
+    rows = [r for r in rows if r["username"].casefold() not in taken]
+    if progress:
+        progress(0, len(rows))
+
+    conn = get_connection()
+    if not conn:
+        result["errors"].append("Could not connect to the database")
+        return result
+    insert = "INSERT INTO user (name, role, username, password) VALUES (%s, %s, %s, %s)"
+    try:
+        with ProcessPoolExecutor() as pool, conn.cursor() as cur:
+            for i in range(0, len(rows), IMPORT_BATCH):
+                if should_stop and should_stop():
+                    break
+                batch = rows[i:i + IMPORT_BATCH]
+                hashed = hash_passwords([r["password"] for r in batch], pool)
+                values = [(r["name"], r["role"], r["username"], h) for r, h in zip(batch, hashed)]
+                try:
+                    cur.executemany(insert, values)
+                    conn.commit()
+                    result["inserted"] += len(batch)
+                except Error:
+                    conn.rollback()
+                    # Retry the batch row by row so only the offending rows are left out
+                    for value in values:
+                        try:
+                            cur.execute(insert, value)
+                            conn.commit()
+                            result["inserted"] += 1
+                        except Error as e:
+                            conn.rollback()
+                            result["errors"].append(f"User '{value[2]}' not imported: {e}")
+                if progress:
+                    progress(i + len(batch), len(rows))
+    finally:
+        conn.close()
+    return result
+
 def verify_user(username: str, password: str) -> Optional[Dict]:
     """Verify user credentials. Returns user dict (without password) if valid."""
     conn = get_connection()
@@ -110,11 +232,46 @@ def get_users() -> List[Dict]:
     finally:
         conn.close()
 
+# -----------------------------
+# Camera Management
+# -----------------------------
+def update_camera_status(camera_id: int, status: str) -> bool:
+    """Set a camera's status (online / stalled / offline)."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE camera SET status=%s WHERE camera_id=%s", (status, camera_id))
+            conn.commit()
+        return True
+    except Error as e:
+        print(f"[ERROR] Failed to update camera status: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_camera_status_counts() -> Dict[str, int]:
+    """Number of cameras per status."""
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, COUNT(*) FROM camera GROUP BY status")
+            return {status: count for status, count in cur.fetchall()}
+    except Error as e:
+        print(f"[ERROR] Failed to count cameras: {e}")
+        return {}
+    finally:
+        conn.close()
+
 # -----------------------------
 # Detection Management
 # -----------------------------
 def insert_detection(camera_id: int, confidence_score: float,
-                     ai_result: str, image_path: str, timestamp: str) -> int:
+                     ai_result: str, image_path: str, timestamp: str,
+                     model_version: Optional[str] = None) -> int:
     """
     Save a detection event.
     Returns the auto-generated detection_id (INT).
@@ -126,18 +283,77 @@ def insert_detection(camera_id: int, confidence_score: float,
         with conn.cursor() as cur:
             cur.execute(
                 """INSERT INTO detection
-                (camera_id, confidence_score, ai_result, image_path, `timestamp`)
-                VALUES (%s, %s, %s, %s, %s)""",
-                (camera_id, confidence_score, ai_result, image_path, timestamp)
+                (camera_id, confidence_score, ai_result, image_path, `timestamp`, model_version)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                (camera_id, confidence_score, ai_result, image_path, timestamp, model_version)
             )
+            detection_id = cur.lastrowid
+            try:
+                record_rollups(cur, camera_id, ai_result, confidence_score, timestamp)
+            except Error as e:
+                # Never lose the detection over its counters; `python rollups.py --backfill` repairs them
+                print(f"[WARN] Failed to update detection rollups: {e}")
             conn.commit()
-            return cur.lastrowid
+            return detection_id
     except Error as e:
         print(f"[ERROR] Failed to insert detection: {e}")
         return 0
     finally:
         conn.close()
 
+def update_detection_clip(detection_id: int, clip_path: str) -> bool:
+    """Link a recorded event clip to a detection row."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE detection SET clip_path=%s WHERE detection_id=%s",
+                (clip_path, detection_id)
+            )
+            conn.commit()
+        return True
+    except Error as e:
+        print(f"[ERROR] Failed to link clip: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_detection_clip(detection_id: int) -> Optional[str]:
+    """Return the clip path recorded for a detection, if any."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT clip_path FROM detection WHERE detection_id=%s", (detection_id,))
+            row = cur.fetchone()
+        return row[0] if row else None
+    except Error as e:
+        print(f"[ERROR] Failed to fetch clip: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_detection_image_paths(camera_id: int, pattern: str) -> List[str]:
+    """Image paths of a camera's detection rows whose path matches a LIKE pattern."""
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT image_path FROM detection WHERE camera_id=%s AND image_path LIKE %s",
+                (camera_id, pattern)
+            )
+            return [row[0] for row in cur.fetchall()]
+    except Error as e:
+        print(f"[ERROR] Failed to fetch detection image paths: {e}")
+        return []
+    finally:
+        conn.close()
+
 # -----------------------------
 # Feedback / Incident Management
 # -----------------------------
@@ -160,6 +376,73 @@ def insert_feedback(detection_id: int, user_id: int, category: str, notes: str)
     finally:
         conn.close()
 
+# -----------------------------
+# Detection Rollups
+# -----------------------------
+def record_rollups(cur, camera_id: int, ai_result: str, confidence_score: float, timestamp) -> None:
+    """Add one detection to its minute/hour/day rollup rows, inside the caller's transaction."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    rows = [(g, timestamp.strftime(fmt), camera_id, ai_result, 1, float(confidence_score or 0))
+            for g, fmt in ROLLUP_GRANULARITIES.items()]
+    cur.execute(
+        """INSERT INTO detection_rollup
+        (granularity, bucket_start, camera_id, ai_result, detections, confidence_sum)
+        VALUES (%s, %s, %s, %s, %s, %s), (%s, %s, %s, %s, %s, %s), (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE detections = detections + VALUES(detections),
+                                confidence_sum = confidence_sum + VALUES(confidence_sum)""",
+        [v for row in rows for v in row]
+    )
+
+def get_detection_totals(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         camera_id: Optional[int] = None) -> Dict[str, int]:
+    """Detections per ai_result from the daily rollups (whole days; all time when no range is given)."""
+    sql = "SELECT ai_result, SUM(detections) FROM detection_rollup WHERE granularity='day'"
+    params = []
+    if start is not None:
+        sql += " AND bucket_start >= %s"
+        params.append(start)
+    if end is not None:
+        sql += " AND bucket_start < %s"
+        params.append(end)
+    if camera_id is not None:
+        sql += " AND camera_id = %s"
+        params.append(camera_id)
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql + " GROUP BY ai_result", params)
+            return {ai_result: int(total) for ai_result, total in cur.fetchall()}
+    except Error as e:
+        print(f"[ERROR] Failed to read detection totals: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def get_detection_series(granularity: str, start: datetime, end: datetime,
+                         camera_id: Optional[int] = None) -> List[Tuple[datetime, str, int]]:
+    """(bucket_start, ai_result, detections) rows for a trend chart, oldest first."""
+    sql = ("SELECT bucket_start, ai_result, SUM(detections) FROM detection_rollup "
+           "WHERE granularity=%s AND bucket_start >= %s AND bucket_start < %s")
+    params = [granularity, start, end]
+    if camera_id is not None:
+        sql += " AND camera_id = %s"
+        params.append(camera_id)
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql + " GROUP BY bucket_start, ai_result ORDER BY bucket_start", params)
+            return [(bucket, ai_result, int(total)) for bucket, ai_result, total in cur.fetchall()]
+    except Error as e:
+        print(f"[ERROR] Failed to read detection series: {e}")
+        return []
+    finally:
+        conn.close()
+
 # -----------------------------
 # MAIN BLOCK FOR ONE-TIME HASHING
 # -----------------------------
@@ -0,0 +1,104 @@
+"""
+In-process publish/subscribe for live detection events.
+
+The detection engine publishes typed events from its worker threads. Dashboards subscribe with
+a delivery interval and receive the events accumulated since the last tick as one list, on the
+GUI thread, so a burst of detections costs one repaint instead of one per row. Subscribers
+without an interval are called synchronously on the publishing thread (for non-Qt consumers).
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from PySide6.QtCore import QObject, QTimer
+
+UI_CADENCE_MS = 250
+MAX_PENDING = 2000  # per batched subscriber; older events are dropped if the UI stalls
+
+
+@dataclass(frozen=True)
+class DetectionEvent:
+    detection_id: int  # 0 when the database insert failed
+    camera_id: int
+    ai_result: str
+    confidence: float
+    timestamp: str
+    image_path: str
+    replayed: bool = False  # re-sent by the event server after a reconnect; already alerted elsewhere
+
+
+class _BatchedSubscription(QObject):
+    """Queues events from any thread; a timer on the subscribing (GUI) thread hands them over in batches."""
+    def __init__(self, event_type, callback, interval_ms):
+        super().__init__()
+        self.event_type = event_type
+        self.callback = callback
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start(interval_ms)
+
+    def deliver(self, event):
+        with self._lock:
+            if len(self._pending) >= MAX_PENDING:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(event)
+
+    def _flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = list(self._pending), deque()
+        self.callback(batch)
+
+    def close(self):
+        self._timer.stop()
+
+
+class _DirectSubscription:
+    def __init__(self, event_type, callback):
+        self.event_type = event_type
+        self.callback = callback
+
+    def deliver(self, event):
+        self.callback(event)
+
+    def close(self):
+        pass
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = []
+
+    def subscribe(self, event_type, callback, interval_ms=UI_CADENCE_MS):
+        """
+        Call `callback(list_of_events)` every `interval_ms` on this thread (a Qt thread), or
+        `callback(event)` immediately on the publisher's thread when interval_ms is None.
+        """
+        if interval_ms is None:
+            sub = _DirectSubscription(event_type, callback)
+        else:
+            sub = _BatchedSubscription(event_type, callback, interval_ms)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [sub]
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not sub]
+
+    def publish(self, event):
+        for sub in self._subscriptions:  # copy-on-write list: no lock needed to read it
+            if isinstance(event, sub.event_type):
+                try:
+                    sub.deliver(event)
+                except Exception as e:
+                    print(f"[ERROR] Event subscriber failed: {e}")
+
+
+bus = EventBus()
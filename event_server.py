@@ -0,0 +1,241 @@
+"""
+Detection event fan-out over TCP, so one inference node serves many guard stations.
+
+The detection process runs an EventBroadcastServer fed from the in-process event bus. Guard
+dashboards on other machines run an EventClient that republishes what it receives on their own
+local bus, so the dashboard code is the same whether the feed is local or remote.
+
+Wire format: one compact JSON object per line (UTF-8).
+  client -> server  {"since": <last seq seen>, "epoch": <server epoch seen>}
+  server -> client  {"t": "hello", "epoch": E, "seq": S}
+                    {"t": "d", "s": seq, "id": detection_id, "c": camera, "r": ai_result,
+                     "f": confidence, "ts": timestamp, "p": image_path}
+                    {"t": "hb"}  every HEARTBEAT_SECONDS when idle
+A new client (no epoch yet) starts at the current `seq` with no replay. On reconnect the server
+replays buffered events newer than `since` (all of them if the server restarted since, i.e. the
+epoch differs); events with s <= S are replays and are republished with replayed=True, so
+dashboards list them without ringing or counting them again. Clients that cannot keep up are
+dropped and replay on reconnect.
+
+The server is off unless AI_ID_EVENTS=1 and listens on 127.0.0.1. It has no authentication or
+encryption: only set AI_ID_EVENTS_HOST=0.0.0.0 (or a LAN address) on a trusted network.
+Set AI_ID_EVENTS_SERVER=host:port on a guard station to view a remote detector.
+"""
+import os, json, time, socket, threading, queue
+from collections import deque
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+from event_bus import bus, DetectionEvent
+
+ENABLED = os.environ.get("AI_ID_EVENTS", "0") == "1"
+EVENTS_HOST = os.environ.get("AI_ID_EVENTS_HOST", "127.0.0.1")
+EVENTS_PORT = int(os.environ.get("AI_ID_EVENTS_PORT", "9109"))
+REMOTE_SERVER = os.environ.get("AI_ID_EVENTS_SERVER", "")  # "host:port" on viewer-only guard stations
+REPLAY_SIZE = 500
+CLIENT_QUEUE = 1000  # lines buffered per client before it is considered too slow
+HEARTBEAT_SECONDS = 15
+RECONNECT_MAX = 30
+
+_server = None
+
+
+def encode(seq, e):
+    return (json.dumps({
+        "t": "d", "s": seq, "id": e.detection_id, "c": e.camera_id, "r": e.ai_result,
+        "f": round(e.confidence, 4), "ts": e.timestamp, "p": e.image_path,
+    }, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode(msg, replayed=False):
+    return DetectionEvent(msg["id"], msg["c"], msg["r"], msg["f"], msg["ts"], msg["p"], replayed)
+
+
+# -----------------------------
+# Server
+# -----------------------------
+class _ClientHandler(StreamRequestHandler):
+    def handle(self):
+        server = self.server.broadcast
+        try:
+            hello = json.loads(self.rfile.readline().decode("utf-8") or "{}")
+        except ValueError:
+            return
+        if hello.get("epoch") is None:
+            since = None  # first connection: live events only
+        elif hello["epoch"] == server.epoch:
+            since = hello.get("since", 0)
+        else:
+            since = 0  # server restarted: everything it still holds is new to the client
+
+        q = queue.Queue(maxsize=CLIENT_QUEUE)
+        replay, seq = server.attach(q, since)
+        try:
+            self.wfile.write(json.dumps({"t": "hello", "epoch": server.epoch, "seq": seq},
+                                        separators=(",", ":")).encode("utf-8") + b"\n")
+            for line in replay:
+                self.wfile.write(line)
+            while server.running:
+                try:
+                    line = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    line = b'{"t":"hb"}\n'
+                if line is None:
+                    break  # dropped for falling behind
+                self.wfile.write(line)
+        except OSError:
+            pass
+        finally:
+            server.detach(q)
+
+
+class EventBroadcastServer:
+    def __init__(self, host=EVENTS_HOST, port=EVENTS_PORT, replay_size=REPLAY_SIZE):
+        self.host = host
+        self.port = port
+        self.epoch = int(time.time())
+        self.seq = 0
+        self.running = False
+        self._lock = threading.Lock()
+        self._replay = deque(maxlen=replay_size)  # (seq, line)
+        self._clients = set()
+        self._tcp = None
+        self._subscription = None
+
+    def start(self):
+        ThreadingTCPServer.allow_reuse_address = True
+        self._tcp = ThreadingTCPServer((self.host, self.port), _ClientHandler)
+        self._tcp.daemon_threads = True
+        self._tcp.broadcast = self
+        self.running = True
+        self._subscription = bus.subscribe(DetectionEvent, self.publish, interval_ms=None)
+        threading.Thread(target=self._tcp.serve_forever, name="event-server", daemon=True).start()
+        print(f"[INFO] Detection events on tcp://{self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        self.running = False
+        bus.unsubscribe(self._subscription)
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def publish(self, event):
+        """Encode once, remember for replay and queue to every client. Never blocks the publisher."""
+        with self._lock:
+            self.seq += 1
+            line = encode(self.seq, event)
+            self._replay.append((self.seq, line))
+            clients = list(self._clients)
+        for q in clients:
+            try:
+                q.put_nowait(line)
+            except queue.Full:
+                self.detach(q)
+                try:
+                    q.get_nowait()
+                    q.put_nowait(None)  # tell the handler to hang up; the client replays on reconnect
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def attach(self, q, since):
+        """Register a client queue; returns (buffered lines newer than `since`, current seq). since=None replays nothing."""
+        with self._lock:
+            self._clients.add(q)
+            if since is None:
+                return [], self.seq
+            return [line for seq, line in self._replay if seq > since], self.seq
+
+    def detach(self, q):
+        with self._lock:
+            self._clients.discard(q)
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+
+def start_server(host=EVENTS_HOST, port=EVENTS_PORT):
+    """Start the broadcast server once per process if AI_ID_EVENTS=1. Returns None if off or the port is unavailable."""
+    global _server
+    if not ENABLED:
+        return None
+    if _server is None:
+        try:
+            _server = EventBroadcastServer(host, port).start()
+        except OSError as e:
+            print(f"[WARN] Event server not started on {host}:{port}: {e}")
+            return None
+    return _server
+
+
+# -----------------------------
+# Client
+# -----------------------------
+class EventClient:
+    """Connects to a detector's event server and republishes its events on the local bus."""
+    def __init__(self, host, port=EVENTS_PORT):
+        self.host = host
+        self.port = port
+        self.running = False
+        self.connected = False
+        self.epoch = None
+        self.last_seq = 0
+        self.replay_until = 0  # events up to this seq on the current connection are replays
+        self.received = 0
+
+    @classmethod
+    def from_address(cls, address):
+        host, _, port = address.rpartition(":")
+        return cls(host or address, int(port) if host else EVENTS_PORT)
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._loop, name="event-client", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        delay = 1.0
+        while self.running:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                    sock.settimeout(HEARTBEAT_SECONDS * 2)  # a silent server is a dead server
+                    sock.sendall(json.dumps({"since": self.last_seq, "epoch": self.epoch}).encode("utf-8") + b"\n")
+                    self.connected, delay = True, 1.0
+                    for line in sock.makefile("rb"):
+                        if not self.running:
+                            return
+                        self._handle(json.loads(line))
+            except (OSError, ValueError) as e:
+                if self.connected:
+                    print(f"[WARN] Lost event server {self.host}:{self.port}: {e}")
+            self.connected = False
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    def _handle(self, msg):
+        kind = msg.get("t")
+        if kind == "hello":
+            if self.epoch is None:
+                self.last_seq = msg["seq"]  # first connection starts live
+            elif msg["epoch"] != self.epoch:
+                self.last_seq = 0  # server restarted; it replays what it has
+            self.epoch = msg["epoch"]
+            self.replay_until = msg["seq"]
+        elif kind == "d":
+            if msg["s"] <= self.last_seq:
+                return  # already seen (overlapping replay)
+            self.last_seq = msg["s"]
+            self.received += 1
+            bus.publish(decode(msg, replayed=msg["s"] <= self.replay_until))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Print detection events from a detector's event server.")
+    parser.add_argument("address", help="host:port")
+    args = parser.parse_args()
+    bus.subscribe(DetectionEvent, print, interval_ms=None)
+    EventClient.from_address(args.address).start()
+    while True:
+        time.sleep(1)
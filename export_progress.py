@@ -0,0 +1,48 @@
+from PySide6.QtWidgets import QProgressDialog, QMessageBox
+from PySide6.QtCore import Qt, QTimer
+
+POLL_MS = 200
+
+
+class ExportProgressDialog(QProgressDialog):
+    """Non-modal progress for a running ExportJob (or any job with the same attributes), with Cancel."""
+    UNIT = "rows"
+
+    def __init__(self, job, title="Exporting", parent=None, label="Preparing export…"):
+        super().__init__(label, "Cancel", 0, 0, parent)
+        self.job = job
+        self.setWindowTitle(title)
+        self.setWindowModality(Qt.NonModal)
+        self.setMinimumDuration(0)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.canceled.connect(job.cancel)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._poll)
+        self._timer.start(POLL_MS)
+        self.show()
+
+    def _poll(self):
+        job = self.job
+        if job.total:
+            self.setMaximum(1000)
+            self.setValue(int((job.progress() or 0) * 1000))
+            self.setLabelText(f"{job.rows_written:,} of {job.total:,} {self.UNIT}")
+        elif job.rows_written:
+            self.setLabelText(f"{job.rows_written:,} {self.UNIT}")
+        if not job.done.is_set():
+            return
+
+        self._timer.stop()
+        self.close()
+        self.finished_message(job)
+
+    def finished_message(self, job):
+        parent = self.parentWidget()
+        if job.error:
+            QMessageBox.critical(parent, "Export Failed", job.error)
+        elif not job.cancelled:
+            QMessageBox.information(
+                parent, "Exported",
+                f"{job.rows_written:,} rows saved to {job.path} in {job.elapsed:.1f}s"
+            )
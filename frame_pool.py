@@ -0,0 +1,64 @@
+import threading
+import numpy as np
+
+
+class FrameSlot:
+    """A preallocated frame buffer owned by a FramePool, shared by reference count."""
+    def __init__(self, pool, index, shape, dtype):
+        self.pool = pool
+        self.index = index
+        self.array = np.empty(shape, dtype=dtype)
+        self.full = None  # full-resolution source frame the slot was resized from (reused by capture)
+        self.captured_at = 0.0  # perf_counter() when the frame was read
+        self.refcount = 0
+
+    def retain(self):
+        self.pool._retain(self)
+        return self
+
+    def release(self):
+        self.pool._release(self)
+
+
+class FramePool:
+    """
+    Fixed ring of reusable frame buffers.
+    Producers acquire a free slot and write into `slot.array` in place (e.g. cv2.resize(..., dst=)),
+    consumers retain/release it. A slot goes back to the ring when its refcount drops to zero,
+    so steady-state capture never allocates.
+    """
+    def __init__(self, shape, slots=4, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self._lock = threading.Lock()
+        self._slots = [FrameSlot(self, i, self.shape, dtype) for i in range(slots)]
+        self._next = 0
+        self.dropped = 0
+
+    def acquire(self):
+        """Return a free slot with refcount 1, or None if every slot is still in use."""
+        with self._lock:
+            n = len(self._slots)
+            for i in range(n):
+                slot = self._slots[(self._next + i) % n]
+                if slot.refcount == 0:
+                    slot.refcount = 1
+                    self._next = (slot.index + 1) % n
+                    return slot
+            self.dropped += 1
+            return None
+
+    def in_use(self):
+        with self._lock:
+            return sum(1 for s in self._slots if s.refcount > 0)
+
+    def _retain(self, slot):
+        with self._lock:
+            if slot.refcount <= 0:
+                raise RuntimeError(f"retain() on released frame slot {slot.index}")
+            slot.refcount += 1
+
+    def _release(self, slot):
+        with self._lock:
+            if slot.refcount <= 0:
+                raise RuntimeError(f"release() on released frame slot {slot.index}")
+            slot.refcount -= 1
@@ -1,7 +1,10 @@
 import os
-import time
 from functools import partial
-from database import get_connection, insert_feedback
+import cv2
+from database import get_connection, insert_feedback, get_detection_clip, get_detection_totals
+from retention import read_snapshot
+from log_export import ExportJob, GUARD_LOG_QUERY, GUARD_LOG_COUNT
+from export_progress import ExportProgressDialog
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
@@ -9,10 +12,24 @@ from PySide6.QtWidgets import (
     QSpacerItem, QComboBox, QFileDialog, QMessageBox, QHeaderView,
     QDialog, QScrollArea
 )
-from PySide6.QtGui import QFont, QPixmap
+from PySide6.QtGui import QFont, QPixmap, QImage
 from PySide6.QtCore import Qt, QTimer
 
 from cctv_feed import CCTVFeed
+from event_bus import bus, DetectionEvent
+from alerts import AlertCoalescer
+from event_server import EventClient, REMOTE_SERVER
+
+RECONCILE_MS = 60_000  # the event bus delivers new rows; polling only repairs anything it missed
+
+
+def load_snapshot_pixmap(path):
+    """Snapshot from disk or, once retention has packed it, from its day archive."""
+    pixmap = QPixmap()
+    data = read_snapshot(path) if path else None
+    if data:
+        pixmap.loadFromData(data)
+    return pixmap
 
 
 class ImagePreviewDialog(QDialog):
@@ -44,8 +61,9 @@ class ImagePreviewDialog(QDialog):
         scroll.setWidget(self.image_holder)
         container_layout.addWidget(scroll, stretch=1)
 
-        pixmap = QPixmap(image_path) if image_path and os.path.exists(image_path) else QPixmap(400, 400)
+        pixmap = load_snapshot_pixmap(image_path)
         if pixmap.isNull():
+            pixmap = QPixmap(400, 400)
             pixmap.fill(Qt.gray)
 
         screen = parent.screen() if parent else self.screen()
@@ -61,6 +79,53 @@ class ImagePreviewDialog(QDialog):
         layout.addWidget(container)
 
 
+class ClipPlayerDialog(QDialog):
+    """Plays a recorded event clip frame by frame."""
+    def __init__(self, clip_path: str, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Event Clip - {os.path.basename(clip_path)}")
+        self.resize(720, 460)
+        layout = QVBoxLayout(self)
+
+        self.video_label = QLabel(alignment=Qt.AlignCenter)
+        self.video_label.setStyleSheet("background:black;")
+        self.video_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.video_label, stretch=1)
+
+        btn_row = QHBoxLayout()
+        replay_btn = QPushButton("⟲ Replay"); replay_btn.clicked.connect(self.restart)
+        close_btn = QPushButton("Close"); close_btn.clicked.connect(self.accept)
+        btn_row.addWidget(replay_btn); btn_row.addWidget(close_btn)
+        layout.addLayout(btn_row)
+
+        self.cap = cv2.VideoCapture(clip_path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 10
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.next_frame)
+        self.timer.start(int(1000 / fps))
+
+    def restart(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.timer.start()
+
+    def next_frame(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.timer.stop()
+            return
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb.shape
+        qt_image = QImage(rgb.data, w, h, ch * w, QImage.Format.Format_RGB888)
+        self.video_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
+            self.video_label.width(), self.video_label.height(), Qt.KeepAspectRatio, Qt.SmoothTransformation
+        ))
+
+    def done(self, result):
+        self.timer.stop()
+        self.cap.release()
+        super().done(result)
+
+
 class IncidentDialog(QDialog):
     """Dialog for logging incidents."""
     def __init__(self, detection_id, camera_id, confidence, timestamp, parent=None):
@@ -76,6 +141,13 @@ class IncidentDialog(QDialog):
         info_label.setWordWrap(True)
         layout.addWidget(info_label)
 
+        # Event clip is written a few seconds after the detection, so look it up on open
+        self.clip_path = get_detection_clip(int(detection_id))
+        if self.clip_path and os.path.exists(self.clip_path):
+            clip_btn = QPushButton("▶ View Event Clip")
+            clip_btn.clicked.connect(lambda: ClipPlayerDialog(self.clip_path, self).exec())
+            layout.addWidget(clip_btn)
+
         type_row = QHBoxLayout()
         type_row.addWidget(QLabel("Person Type:"))
         self.type_combo = QComboBox()
@@ -111,19 +183,26 @@ class GuardDashboardWindow(QWidget):
         self.detection_notes = {}
         self.incidents = set()
         self.known_detections = set()
+        self._totals = {}
 
         self.cctv_feed = None
         self.cctv_label = None
+        # Viewer-only station: events come from a remote detector instead of a local feed
+        self.event_client = EventClient.from_address(REMOTE_SERVER).start() if REMOTE_SERVER else None
         self.stats_label = None
         self.alerts_dropdown = None
-        self._alerts_list = []
+        self.alerts = AlertCoalescer()
 
         self.setup_ui()
 
-        # Auto-refresh timer for logs table
+        # Live rows, stats and alerts arrive from the detection engine in batches at UI cadence
+        self.detection_subscription = bus.subscribe(DetectionEvent, self.on_detection_events)
+
+        # Slow reconciliation against the database (other processes, dropped events)
         self.auto_refresh_timer = QTimer()
         self.auto_refresh_timer.timeout.connect(self.auto_refresh_logs)
-        self.auto_refresh_timer.start(5000)  # refresh every 5 seconds
+        self.auto_refresh_timer.start(RECONCILE_MS)
+        self.refresh_stats()
 
     # ---------- UI Setup ----------
     def setup_ui(self):
@@ -191,9 +270,13 @@ class GuardDashboardWindow(QWidget):
             self.cctv_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         layout.addWidget(self.cctv_label, stretch=1)
 
-        if not self.cctv_feed:
+        if self.event_client:
+            self.cctv_label.setAlignment(Qt.AlignCenter)
+            self.cctv_label.setStyleSheet("background:black;color:white;font-size:16px;")
+            self.cctv_label.setText(f"Receiving alerts from detector at {REMOTE_SERVER}")
+        elif not self.cctv_feed:
             try:
-                self.cctv_feed = CCTVFeed(self.cctv_label, alert_callback=self.add_alert)
+                self.cctv_feed = CCTVFeed(self.cctv_label)
                 self.cctv_feed.start_feed()
             except Exception as e:
                 QMessageBox.warning(self, "CCTV Error", f"CCTV feed failed: {e}")
@@ -214,6 +297,7 @@ class GuardDashboardWindow(QWidget):
         self.logs_table.verticalHeader().setDefaultSectionSize(100)
         layout.addWidget(self.logs_table)
 
+        self.known_detections = set()  # fresh table: list every row again
         self.populate_logs_table()
 
     # ---------- Populate Logs ----------
@@ -229,57 +313,84 @@ class GuardDashboardWindow(QWidget):
         rows = cur.fetchall()
         cur.close(); cnx.close()
 
-        total = with_id = no_id = 0
-        existing_ids = set(self.known_detections)
-
         for d in rows:
-            det_id = d["detection_id"]
-            if det_id in existing_ids:
-                continue  # skip already added
-            self.known_detections.add(det_id)
-
-            total += 1
-            if d["ai_result"] == "person_with_id":
-                with_id += 1
-            else:
-                no_id += 1
-
-            row_index = self.logs_table.rowCount()
-            self.logs_table.insertRow(row_index)
-
-            thumb = QLabel(alignment=Qt.AlignCenter)
-            pixmap = QPixmap(d["image_path"]) if d["image_path"] and os.path.exists(d["image_path"]) else QPixmap(100, 100)
-            if pixmap.isNull():
-                pixmap.fill(Qt.gray)
-            thumb.setPixmap(pixmap.scaled(100, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            thumb.mousePressEvent = partial(self._on_thumb_click, d["image_path"])
-            self.logs_table.setCellWidget(row_index, 0, thumb)
-
-            self.logs_table.setItem(row_index, 1, self.center_item(str(d["detection_id"])))
-            self.logs_table.setItem(row_index, 2, self.center_item(str(d["camera_id"])))
-            self.logs_table.setItem(row_index, 3, self.center_item(f"{d['confidence_score']:.2f}"))
-            self.logs_table.setItem(row_index, 4, self.center_item(str(d["timestamp"])))
-            self.logs_table.setItem(row_index, 5, self.center_item(d["ai_result"]))
-
-            btn = QPushButton("⚠ Incident")
-            btn.setStyleSheet("background:#E63946;color:white;border-radius:6px;")
-            btn.clicked.connect(partial(
-                self._on_incident,
-                row_index,
-                d["detection_id"],
-                d["camera_id"],
-                d["confidence_score"],
-                d["timestamp"],
-                d["image_path"]
-            ))
-            self.logs_table.setCellWidget(row_index, 6, btn)
-
-        # Update stats (cumulative)
-        total_all = len(self.known_detections)
-        with_id_all = sum(1 for d_id in self.known_detections if self.get_ai_result(d_id) == "person_with_id")
-        no_id_all = total_all - with_id_all
+            if d["detection_id"] not in self.known_detections:
+                self.append_log_row(d)
+
+        self.refresh_stats()
+
+    def append_log_row(self, d):
+        self.known_detections.add(d["detection_id"])
+        row_index = self.logs_table.rowCount()
+        self.logs_table.insertRow(row_index)
+
+        thumb = QLabel(alignment=Qt.AlignCenter)
+        pixmap = load_snapshot_pixmap(d["image_path"])
+        if pixmap.isNull():
+            pixmap = QPixmap(100, 100)
+            pixmap.fill(Qt.gray)
+        thumb.setPixmap(pixmap.scaled(100, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        thumb.mousePressEvent = partial(self._on_thumb_click, d["image_path"])
+        self.logs_table.setCellWidget(row_index, 0, thumb)
+
+        self.logs_table.setItem(row_index, 1, self.center_item(str(d["detection_id"])))
+        self.logs_table.setItem(row_index, 2, self.center_item(str(d["camera_id"])))
+        self.logs_table.setItem(row_index, 3, self.center_item(f"{d['confidence_score']:.2f}"))
+        self.logs_table.setItem(row_index, 4, self.center_item(str(d["timestamp"])))
+        self.logs_table.setItem(row_index, 5, self.center_item(d["ai_result"]))
+
+        btn = QPushButton("⚠ Incident")
+        btn.setStyleSheet("background:#E63946;color:white;border-radius:6px;")
+        btn.clicked.connect(partial(
+            self._on_incident,
+            row_index,
+            d["detection_id"],
+            d["camera_id"],
+            d["confidence_score"],
+            d["timestamp"],
+            d["image_path"]
+        ))
+        self.logs_table.setCellWidget(row_index, 6, btn)
+
+    def refresh_stats(self):
+        # Cumulative, from the daily rollups rather than a query per detection
+        self._totals = get_detection_totals()
+        self.update_stats_label()
+
+    def update_stats_label(self):
+        with_id_all = self._totals.get("person_with_id", 0)
+        no_id_all = self._totals.get("person_without_id", 0)
+        total_all = sum(self._totals.values())
         self.stats_label.setText(f"👤 Total: {total_all} | ✅ With ID: {with_id_all} | ❌ No ID: {no_id_all}")
 
+    # ---------- Live events ----------
+    def on_detection_events(self, events):
+        """One batch of DetectionEvents per UI tick: rows, stats and bell are updated without DB reads."""
+        logs_visible = hasattr(self, "logs_table") and self.logs_table.isVisible()
+        if logs_visible:
+            self.logs_table.setUpdatesEnabled(False)
+        new_alerts = 0
+        for e in events:
+            # Replays after a reconnect are listed, but neither ring the bell nor add to the
+            # totals, which the next refresh_stats() reads from the database anyway
+            if not e.replayed:
+                new_alerts += self.alerts.add(e.camera_id, e.ai_result, detection_id=e.detection_id)
+            if not e.detection_id:
+                continue  # not stored; nothing to list or count
+            if not e.replayed:
+                self._totals[e.ai_result] = self._totals.get(e.ai_result, 0) + 1
+            if logs_visible and e.detection_id not in self.known_detections:
+                self.append_log_row({
+                    "detection_id": e.detection_id, "camera_id": e.camera_id,
+                    "confidence_score": e.confidence, "timestamp": e.timestamp,
+                    "ai_result": e.ai_result, "image_path": e.image_path,
+                })
+        if logs_visible:
+            self.logs_table.setUpdatesEnabled(True)
+        self.new_alerts_count += new_alerts  # repeats merged into an existing alert do not ring again
+        self.update_bell()
+        self.update_stats_label()
+
     # ---------- Helper to get AI result by detection_id ----------
     def get_ai_result(self, detection_id):
         cnx = get_connection()
@@ -324,10 +435,10 @@ class GuardDashboardWindow(QWidget):
             btn.setStyleSheet("background:#4CAF50;color:white;border-radius:6px;")
 
     # ---------- Alerts ----------
-    def add_alert(self, message):
-        self.new_alerts_count += 1
-        self.update_bell()
-        self._alerts_list.append((time.time(), message))
+    def add_alert(self, camera_id, ai_result):
+        if self.alerts.add(camera_id, ai_result):
+            self.new_alerts_count += 1
+            self.update_bell()
 
     def toggle_alerts_dropdown(self):
         if not self.alerts_dropdown:
@@ -348,8 +459,8 @@ class GuardDashboardWindow(QWidget):
             while layout.count():
                 item = layout.takeAt(0)
                 if item.widget(): item.widget().deleteLater()
-            for _, msg in sorted(self._alerts_list, key=lambda x: x[0], reverse=True)[:10]:
-                lbl = QLabel(msg); lbl.setWordWrap(True)
+            for entry in self.alerts.recent(10):
+                lbl = QLabel(entry.text()); lbl.setWordWrap(True)
                 lbl.setStyleSheet("color:white;padding:4px;")
                 layout.addWidget(lbl)
             layout.addStretch()
@@ -365,32 +476,31 @@ class GuardDashboardWindow(QWidget):
     def update_bell(self):
         self.bell_icon.setText(f"🔔 {self.new_alerts_count}")
 
+    def closeEvent(self, event):
+        bus.unsubscribe(self.detection_subscription)
+        if self.event_client:
+            self.event_client.stop()
+        super().closeEvent(event)
+
     # ---------- Auto-refresh ----------
     def auto_refresh_logs(self):
         if hasattr(self, "logs_table") and self.logs_table.isVisible():
             self.populate_logs_table()
+        else:
+            self.refresh_stats()
 
     # ---------- Export ----------
     def export_logs(self):
         if not hasattr(self, "logs_table") or self.logs_table.rowCount() == 0:
             QMessageBox.warning(self, "Error", "No logs to export.")
             return
-        path, _ = QFileDialog.getSaveFileName(self, "Save Logs", "logs.csv", "CSV Files (*.csv)")
+        path, _ = QFileDialog.getSaveFileName(self, "Save Logs", "logs.csv",
+                                              "CSV Files (*.csv);;Compressed CSV (*.csv.gz)")
         if not path:
             return
-        import csv
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["detection_id","camera_id","confidence","timestamp","note","incident","image_path"])
-            for r in range(self.logs_table.rowCount()):
-                det = self.logs_table.item(r, 1).text()
-                cam = self.logs_table.item(r, 2).text()
-                conf = self.logs_table.item(r, 3).text()
-                ts  = self.logs_table.item(r, 4).text()
-                note = self.detection_notes.get(int(det), "")
-                inc  = "yes" if int(det) in self.incidents else "no"
-                w.writerow([det, cam, conf, ts, note, inc, ""])
-        QMessageBox.information(self, "Exported", f"Logs saved to {path}")
+        # Streamed from the database (notes and incidents come from the feedback table), not the widget
+        job = ExportJob(path, GUARD_LOG_QUERY, count_query=GUARD_LOG_COUNT).start()
+        self.export_progress = ExportProgressDialog(job, "Exporting logs", self)
 
     # ---------- Utilities ----------
     def center_item(self, text):
@@ -0,0 +1,221 @@
+"""
+Append-only binary log of every inference result, per camera and per hour.
+
+The current hour is a flat file of fixed-size records (RECORD_DTYPE) that can be np.memmap'ed
+while it is still being written. When the hour rolls over, the segment is rewritten in the
+background as a compressed columnar .npz (one array per field) and the raw file is removed.
+Raw segments of earlier hours left by a previous run (restart, crash) are compressed when the
+writer starts.
+Frames without boxes are logged as a single record with cls == NO_BOX so replay keeps frame timing.
+
+    python inference_log.py output/inference_logs/cam1 --threshold 0.5
+"""
+import os, glob, json, threading, time
+from datetime import datetime
+import numpy as np
+from labels import strict_label_mapping
+
+LOG_FOLDER = "inference_logs"
+FLUSH_ROWS = 4096
+FLUSH_SECONDS = 2.0
+NO_BOX = 0xFFFF
+
+RECORD_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("frame", "<u4"),
+    ("x1", "<f4"), ("y1", "<f4"), ("x2", "<f4"), ("y2", "<f4"),
+    ("cls", "<u2"),
+    ("conf", "<f4"),
+])
+
+
+def _hour_key(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y%m%d_%H")
+
+
+class InferenceLogWriter:
+    """Buffers per-frame boxes in a preallocated record array and appends them to the hourly segment."""
+    def __init__(self, root, camera_id, names):
+        self.dir = os.path.join(root, f"cam{camera_id}")
+        os.makedirs(self.dir, exist_ok=True)
+        self.names = {int(k): str(v).lower().strip() for k, v in dict(names).items()}
+        self.class_ids = {v: k for k, v in self.names.items()}
+        with open(os.path.join(self.dir, "classes.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f)
+
+        self._lock = threading.Lock()
+        self._buf = np.zeros(FLUSH_ROWS, dtype=RECORD_DTYPE)
+        self._rows = 0
+        self._frame = 0
+        self._hour = None
+        self._file = None
+        self._last_flush = time.time()
+        self._compress_leftovers()
+
+    def append(self, detections, ts=None):
+        """Log one frame; `detections` is the extract_detections() list (may be empty)."""
+        ts = ts or time.time()
+        with self._lock:
+            hour = _hour_key(ts)
+            if hour != self._hour:
+                self._rotate(hour)
+            self._frame += 1
+            if not detections:
+                self._add(ts, (0.0, 0.0, 0.0, 0.0), NO_BOX, 0.0)
+            for xyxy, raw_label, _, confidence in detections:
+                self._add(ts, xyxy, self.class_ids.get(raw_label, NO_BOX), confidence)
+            if ts - self._last_flush >= FLUSH_SECONDS:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._hour = None  # a later append reopens the segment
+
+    def _compress_leftovers(self):
+        current = os.path.join(self.dir, f"{_hour_key(time.time())}.bin")
+        leftovers = [p for p in glob.glob(os.path.join(self.dir, "*.bin")) if p != current]
+        if leftovers:
+            threading.Thread(target=lambda: [compress_segment(p) for p in sorted(leftovers)],
+                             name=f"inference-log-compress-{os.path.basename(self.dir)}", daemon=True).start()
+
+    def _add(self, ts, xyxy, cls, conf):
+        if self._rows == len(self._buf):
+            self._flush()
+        rec = self._buf[self._rows]
+        rec["ts"] = ts
+        rec["frame"] = self._frame
+        rec["x1"], rec["y1"], rec["x2"], rec["y2"] = xyxy
+        rec["cls"] = cls
+        rec["conf"] = conf
+        self._rows += 1
+
+    def _flush(self):
+        if self._rows and self._file:
+            self._file.write(self._buf[:self._rows].tobytes())
+            self._file.flush()
+        self._rows = 0
+        self._last_flush = time.time()
+
+    def _rotate(self, hour):
+        self._flush()
+        if self._file:
+            closed = self._file.name
+            self._file.close()
+            threading.Thread(target=compress_segment, args=(closed,), daemon=True).start()
+        self._hour = hour
+        path = os.path.join(self.dir, f"{hour}.bin")
+        if os.path.exists(path):
+            # A crash can leave half a record at the end; appending after it would misalign the rest
+            size = os.path.getsize(path)
+            if size % RECORD_DTYPE.itemsize:
+                os.truncate(path, size - size % RECORD_DTYPE.itemsize)
+        self._file = open(path, "ab")
+
+
+def compress_segment(path):
+    """Rewrite a closed raw segment as a compressed columnar .npz and delete the raw file."""
+    try:
+        records = np.fromfile(path, dtype=RECORD_DTYPE)
+        target = path[:-4] + ".npz"
+        tmp = target + ".tmp.npz"
+        np.savez_compressed(tmp, **{name: records[name] for name in RECORD_DTYPE.names})
+        os.replace(tmp, target)
+        os.remove(path)
+    except Exception as e:
+        print(f"[ERROR] Failed to compress inference log {path}: {e}")
+
+
+# -----------------------------
+# Reader / Replay
+# -----------------------------
+def list_segments(camera_dir, start=None, end=None):
+    """Segments for one camera in time order, optionally limited to hours overlapping [start, end]."""
+    paths = {}
+    for p in glob.glob(os.path.join(camera_dir, "*.bin")) + glob.glob(os.path.join(camera_dir, "*.npz")):
+        name = os.path.basename(p)
+        if ".tmp" in name:
+            continue
+        key = name[:11]
+        # A compressed segment wins over a raw file left behind by an interrupted compression
+        if key not in paths or p.endswith(".npz"):
+            paths[key] = p
+    lo = _hour_key(start) if start else None
+    hi = _hour_key(end) if end else None
+    return [paths[k] for k in sorted(paths) if (lo is None or k >= lo) and (hi is None or k <= hi)]
+
+
+def read_segment(path):
+    """Return the segment's columns as a dict of arrays (memory-mapped for raw segments)."""
+    if path.endswith(".bin"):
+        if os.path.getsize(path) == 0:
+            return {name: np.empty(0, dtype=RECORD_DTYPE[name]) for name in RECORD_DTYPE.names}
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r")
+        return {name: records[name] for name in RECORD_DTYPE.names}
+    with np.load(path) as data:
+        return {name: data[name] for name in RECORD_DTYPE.names}
+
+
+def load_classes(camera_dir):
+    with open(os.path.join(camera_dir, "classes.json"), encoding="utf-8") as f:
+        return {int(k): v for k, v in json.load(f).items()}
+
+
+def iter_frames(camera_dir, start=None, end=None):
+    """
+    Yield (ts, detections) per logged frame, with detections in the same
+    (xyxy, raw_label, mapped_label, confidence) form produced by extract_detections().
+    """
+    names = load_classes(camera_dir)
+    for path in list_segments(camera_dir, start, end):
+        cols = read_segment(path)
+        if len(cols["ts"]) == 0:
+            continue
+        # Records of one frame are contiguous; split on frame-number changes
+        bounds = (np.flatnonzero(np.diff(cols["frame"])) + 1).tolist()
+        ts, cls = cols["ts"].tolist(), cols["cls"].tolist()
+        conf = cols["conf"].tolist()
+        boxes = np.stack([cols["x1"], cols["y1"], cols["x2"], cols["y2"]], axis=1).tolist()
+        for lo, hi in zip([0] + bounds, bounds + [len(ts)]):
+            t = ts[lo]
+            if (start and t < start) or (end and t > end):
+                continue
+            detections = []
+            for i in range(lo, hi):
+                if cls[i] == NO_BOX:
+                    continue
+                raw_label = names.get(cls[i], "")
+                detections.append((boxes[i], raw_label, strict_label_mapping(raw_label), conf[i]))
+            yield t, detections
+
+
+def replay(camera_dir, on_frame, start=None, end=None, threshold=0.0):
+    """Feed logged frames through `on_frame(ts, detections)`, dropping boxes below `threshold`."""
+    frames = 0
+    for ts, detections in iter_frames(camera_dir, start, end):
+        on_frame(ts, [d for d in detections if d[3] >= threshold])
+        frames += 1
+    return frames
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay an inference log and count detections.")
+    parser.add_argument("camera_dir", help="e.g. output/inference_logs/cam1")
+    parser.add_argument("--threshold", type=float, default=0.0, help="minimum confidence to count")
+    args = parser.parse_args()
+
+    counts = {}
+    def count(ts, detections):
+        for _, _, mapped_label, _ in detections:
+            counts[mapped_label] = counts.get(mapped_label, 0) + 1
+
+    t0 = time.perf_counter()
+    n = replay(args.camera_dir, count, threshold=args.threshold)
+    elapsed = time.perf_counter() - t0
+    print(f"Replayed {n} frames in {elapsed:.2f}s ({n / elapsed if elapsed else 0:.0f} frames/s)")
+    for label, c in sorted(counts.items()):
+        print(f"  {label}: {c}")
@@ -0,0 +1,21 @@
+LABEL_MAP = {
+    "id": "person_with_id",
+    "with_id": "person_with_id",
+    "withid": "person_with_id",
+    "wearing_id": "person_with_id",
+    "person_with_id": "person_with_id",
+    "no_id": "person_without_id",
+    "noid": "person_without_id",
+    "without_id": "person_without_id",
+    "person_without_id": "person_without_id",
+}
+
+def strict_label_mapping(raw_label):
+    mapped = LABEL_MAP.get(raw_label, None)
+    if mapped == "person_with_id":
+        return "person_with_id"
+    elif mapped == "person_without_id":
+        return "person_without_id"
+    else:
+        # Default to "person_without_id" for safety
+        return "person_without_id"
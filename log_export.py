@@ -0,0 +1,226 @@
+"""
+Streaming export engine for detection logs.
+
+Rows are read through an unbuffered MySQL cursor in chunks of CHUNK_ROWS and written to CSV as
+they arrive (gzip when the path ends in .gz), so memory stays flat however large the range is.
+An ExportJob runs on its own thread; the UI polls `rows_written` / `total` and may cancel().
+The file is written under a temporary name and only appears at `path` once complete.
+
+ParquetExportJob writes detection joined with feedback as typed, zstd-compressed Parquet with
+one row group per (day, camera), for analysts loading months at a time with pandas / pyarrow:
+
+    python log_export.py --start 2025-01-01 --end 2025-04-01 --out q1.parquet
+"""
+import os, csv, gzip, threading, time
+from database import get_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for Parquet exports
+    pa = pq = None
+
+CHUNK_ROWS = 5000
+MAX_ROW_GROUP = 250_000  # rows buffered before a (day, camera) group is split
+PARQUET_COMPRESSION = "zstd"
+
+GUARD_LOG_QUERY = """
+    SELECT d.detection_id, d.camera_id, d.confidence_score AS confidence, d.ai_result,
+           d.`timestamp`, GROUP_CONCAT(f.notes SEPARATOR ' | ') AS note,
+           IF(COUNT(f.detection_id) > 0, 'yes', 'no') AS incident, d.image_path
+    FROM detection d
+    LEFT JOIN feedback f ON f.detection_id = d.detection_id
+    GROUP BY d.detection_id
+    ORDER BY d.detection_id
+"""
+GUARD_LOG_COUNT = "SELECT COUNT(*) FROM detection"
+
+
+def detection_range_query(start, end):
+    """(query, params, count_query) for every detection with start <= timestamp < end."""
+    where = "WHERE `timestamp` >= %s AND `timestamp` < %s"
+    return (f"SELECT * FROM detection {where}", (start, end), f"SELECT COUNT(*) FROM detection {where}")
+
+
+def analytics_range_query(start, end):
+    """(query, params, count_query) for detections joined with feedback, ordered by day and camera."""
+    where = "WHERE d.`timestamp` >= %s AND d.`timestamp` < %s"
+    query = f"""
+        SELECT d.detection_id, d.camera_id, d.`timestamp`, d.ai_result, d.confidence_score,
+               d.image_path, f.user_id AS feedback_user_id, f.category, f.notes
+        FROM detection d
+        LEFT JOIN feedback f ON f.detection_id = d.detection_id
+        {where}
+        ORDER BY DATE(d.`timestamp`), d.camera_id, d.`timestamp`
+    """
+    count_query = f"SELECT COUNT(*) FROM detection d LEFT JOIN feedback f ON f.detection_id = d.detection_id {where}"
+    return query, (start, end), count_query
+
+
+class ExportJob:
+    def __init__(self, path, query, params=(), count_query=None, chunk=CHUNK_ROWS):
+        self.path = path
+        self.query = query
+        self.params = params
+        self.count_query = count_query
+        self.chunk = chunk
+        self.rows_written = 0
+        self.total = None
+        self.error = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self.elapsed = 0.0
+
+    def start(self):
+        threading.Thread(target=self.run, name="log-export", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def progress(self):
+        """Fraction done, or None while the total is unknown."""
+        if not self.total:
+            return None
+        return min(1.0, self.rows_written / self.total)
+
+    def _open(self, path):
+        if self.path.endswith(".gz"):
+            return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+        return open(path, "w", newline="", encoding="utf-8")
+
+    def _write(self, cur, path):
+        with self._open(path) as f:
+            writer = csv.writer(f)
+            writer.writerow([d[0] for d in cur.description])
+            while not self.cancelled:
+                rows = cur.fetchmany(self.chunk)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                self.rows_written += len(rows)
+
+    def run(self):
+        """Run the export on the calling thread (start() runs it on a background one)."""
+        started = time.perf_counter()
+        tmp = self.path + ".part"
+        conn = get_connection()
+        try:
+            if not conn:
+                raise ConnectionError("Could not connect to the database")
+            if self.count_query:
+                with conn.cursor() as cur:
+                    cur.execute(self.count_query, self.params)
+                    self.total = cur.fetchone()[0]
+
+            # buffered=False streams rows off the socket instead of materialising the result set
+            cur = conn.cursor(buffered=False)
+            try:
+                cur.execute(self.query, self.params)
+                self._write(cur, tmp)
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass  # unread rows after a cancel; the connection is closed below anyway
+
+            if self.cancelled:
+                os.remove(tmp)
+            else:
+                os.replace(tmp, self.path)
+        except Exception as e:
+            self.error = str(e)
+            print(f"[ERROR] Export to {self.path} failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            if conn:
+                conn.close()
+            self.elapsed = time.perf_counter() - started
+            self.done.set()
+
+
+class ParquetExportJob(ExportJob):
+    """
+    ExportJob writing Parquet. Expects rows shaped like analytics_range_query() and ordered by
+    day then camera; each (day, camera) run becomes its own row group so readers can skip by filter.
+    """
+    def __init__(self, path, query, params=(), count_query=None, chunk=CHUNK_ROWS,
+                 compression=PARQUET_COMPRESSION, max_row_group=MAX_ROW_GROUP):
+        super().__init__(path, query, params, count_query, chunk)
+        self.compression = compression
+        self.max_row_group = max_row_group
+
+    @staticmethod
+    def schema():
+        category = pa.dictionary(pa.int32(), pa.string())
+        return pa.schema([
+            ("detection_id", pa.int64()),
+            ("camera_id", pa.int32()),
+            ("timestamp", pa.timestamp("s")),
+            ("ai_result", category),
+            ("confidence", pa.float32()),
+            ("image_path", pa.string()),
+            ("feedback_user_id", pa.int32()),
+            ("category", category),
+            ("notes", pa.string()),
+        ])
+
+    def _write(self, cur, path):
+        if pa is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        schema = self.schema()
+        group, key = [], None
+        with pq.ParquetWriter(path, schema, compression=self.compression) as writer:
+            while not self.cancelled:
+                rows = cur.fetchmany(self.chunk)
+                if not rows:
+                    break
+                for row in rows:
+                    row_key = (row[2].date(), row[1])
+                    if group and (row_key != key or len(group) >= self.max_row_group):
+                        self._write_group(writer, schema, group)
+                        group = []
+                    key = row_key
+                    group.append(row)
+                self.rows_written += len(rows)
+            if group and not self.cancelled:
+                self._write_group(writer, schema, group)
+
+    @staticmethod
+    def _write_group(writer, schema, rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for field, values in zip(schema, columns):
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            elif pa.types.is_floating(field.type):
+                # DECIMAL columns arrive as Decimal
+                arrays.append(pa.array([None if v is None else float(v) for v in values], field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(rows))
+
+
+def job_for_path(path, start, end):
+    """The export job matching the file extension (.parquet, .csv or .csv.gz) for [start, end)."""
+    if path.endswith(".parquet"):
+        return ParquetExportJob(path, *analytics_range_query(start, end))
+    return ExportJob(path, *detection_range_query(start, end))
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+    parser = argparse.ArgumentParser(description="Export detection logs for a date range.")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--out", required=True, help=".csv, .csv.gz or .parquet")
+    args = parser.parse_args()
+    job = job_for_path(args.out, datetime.strptime(args.start, "%Y-%m-%d"),
+                       datetime.strptime(args.end, "%Y-%m-%d")).start()
+    while not job.done.wait(1):
+        print(f"  {job.rows_written:,} / {job.total or '?'} rows", end="\r")
+    if job.error:
+        raise SystemExit(f"Export failed: {job.error}")
+    print(f"Exported {job.rows_written:,} rows to {args.out} in {job.elapsed:.1f}s")
@@ -0,0 +1,219 @@
+"""
+Lightweight per-stage latency histograms and counters for the detection pipeline.
+
+Hot-path usage:
+
+    t0 = metrics.clock()
+    ... work ...
+    metrics.observe("predict", camera_id, t0)
+
+When disabled (AI_ID_METRICS=0) clock() returns 0 and observe()/inc() return immediately.
+Exposed on http://127.0.0.1:<AI_ID_METRICS_PORT>/metrics (Prometheus text format)
+and /metrics.json (used by the admin dashboard). POST /profile with a JSON body {"seconds": N}
+starts a sampling profile of this process (see profiler.py); a page in a browser cannot send
+that without a CORS preflight, which this server never answers.
+"""
+import os, json, time, threading
+import urllib.request
+from urllib.parse import urlsplit
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("AI_ID_METRICS", "1") != "0"
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = int(os.environ.get("AI_ID_METRICS_PORT", "9108"))
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+_lock = threading.Lock()
+_histograms = {}  # (stage, camera) -> Histogram
+_counters = {}  # (name, camera) -> int
+_collectors = []  # callables returning [(name, camera, value), ...]
+_server = None
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile (approximate, like Prometheus)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else float("inf")
+        return float("inf")
+
+
+def clock():
+    return time.perf_counter() if ENABLED else 0.0
+
+
+def observe(stage, camera, start):
+    """Record the time since `start` (from clock()) for a pipeline stage."""
+    if not ENABLED:
+        return
+    ms = (time.perf_counter() - start) * 1000.0
+    key = (stage, camera)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = Histogram()
+        h.add(ms)
+
+
+def inc(name, camera, n=1):
+    if not ENABLED:
+        return
+    key = (name, camera)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def register_collector(fn):
+    """Add a callable evaluated at scrape time that returns [(gauge_name, camera, value), ...]."""
+    with _lock:
+        _collectors.append(fn)
+
+
+def unregister_collector(fn):
+    with _lock:
+        if fn in _collectors:
+            _collectors.remove(fn)
+
+
+def snapshot():
+    """Plain-dict view of all metrics, for the dashboard and JSON endpoint."""
+    with _lock:
+        stages = [{
+            "stage": stage, "camera": camera, "count": h.count,
+            "mean_ms": h.total_ms / h.count if h.count else 0.0,
+            "p50_ms": h.quantile(0.5), "p95_ms": h.quantile(0.95), "p99_ms": h.quantile(0.99),
+        } for (stage, camera), h in sorted(_histograms.items(), key=lambda kv: (str(kv[0][1]), kv[0][0]))]
+        counters = [{"name": n, "camera": c, "value": v} for (n, c), v in sorted(_counters.items(), key=str)]
+        collectors = list(_collectors)
+    gauges = []
+    for fn in collectors:
+        try:
+            gauges.extend({"name": n, "camera": c, "value": v} for n, c, v in fn())
+        except Exception as e:
+            print(f"[WARN] Metrics collector failed: {e}")
+    return {"enabled": ENABLED, "stages": stages, "counters": counters, "gauges": gauges}
+
+
+def render_prometheus():
+    lines = ["# TYPE ai_id_stage_latency_ms histogram"]
+    with _lock:
+        for (stage, camera), h in sorted(_histograms.items(), key=lambda kv: (str(kv[0][1]), kv[0][0])):
+            labels = f'stage="{stage}",camera="{camera}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS + ("+Inf",), h.buckets):
+                cumulative += n
+                lines.append(f'ai_id_stage_latency_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"ai_id_stage_latency_ms_sum{{{labels}}} {h.total_ms:.3f}")
+            lines.append(f"ai_id_stage_latency_ms_count{{{labels}}} {h.count}")
+        counters = sorted(_counters.items(), key=str)
+    for (name, camera), value in counters:
+        lines.append(f'ai_id_{name}_total{{camera="{camera}"}} {value}')
+    for g in snapshot()["gauges"]:
+        lines.append(f'ai_id_{g["name"]}{{camera="{g["camera"]}"}} {g["value"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/metrics":
+            body, ctype = render_prometheus().encode(), "text/plain; version=0.0.4"
+        elif url.path == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode(), "application/json"
+        elif url.path == "/profile":
+            self.send_error(405, "Use POST")
+            return
+        else:
+            self.send_error(404)
+            return
+        self._reply(body, ctype)
+
+    def do_POST(self):
+        # Starting a profile is a side effect: POST only, and only with a JSON body
+        if urlsplit(self.path).path != "/profile":
+            self.send_error(404)
+            return
+        if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+            self.send_error(415, "Expected application/json")
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self.send_error(400, "Body is not JSON")
+            return
+        self._reply(json.dumps(_start_profile(request)).encode(), "application/json")
+
+    def _reply(self, body, ctype):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scrapes out of the console
+
+
+def _start_profile(request):
+    from profiler import start_profile
+    try:
+        seconds = float(request.get("seconds", 30))
+    except (AttributeError, TypeError, ValueError):
+        return {"started": False, "error": "seconds must be a number"}
+    prof, error = start_profile(seconds)
+    if error:
+        return {"started": False, "error": error}
+    return {"started": True, "seconds": prof.duration,
+            "folded": prof.folded_path, "summary": prof.summary_path}
+
+
+def start_http_server(host=HTTP_HOST, port=HTTP_PORT):
+    """Serve metrics on a daemon thread. Safe to call more than once."""
+    global _server
+    if not ENABLED or _server is not None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[WARN] Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[INFO] Metrics on http://{host}:{port}/metrics")
+    return _server
+
+
+def fetch(host=HTTP_HOST, port=HTTP_PORT, timeout=0.3):
+    """Read /metrics.json from a (possibly different) detector process; None if unreachable."""
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def request_profile(seconds, host=HTTP_HOST, port=HTTP_PORT, timeout=2.0):
+    """Ask the detector process to start a profile; returns its JSON reply or None if unreachable."""
+    req = urllib.request.Request(f"http://{host}:{port}/profile", data=json.dumps({"seconds": seconds}).encode(),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,410 @@
+"""
+Schema creation and migrations for the ai_id_detector database.
+
+Each migration runs once, in order, and is recorded in `schema_migrations`. Migrations check
+information_schema before changing anything, so they are safe on databases that were created
+by hand before this module existed.
+
+    python migrations.py             # apply pending migrations
+    python migrations.py --status    # list applied / pending
+    python migrations.py --check     # EXPLAIN the dashboard queries and report index use
+    python migrations.py --partition # range-partition detection by month (optional, one-off)
+
+Partitioned `detection` lets retention drop whole months instead of deleting rows. MySQL needs
+the partition key in the primary key, so the key becomes (detection_id, timestamp), and
+partitioned tables cannot take part in foreign keys, which is why the schema declares none.
+"""
+from datetime import date, datetime
+from database import get_connection, Error
+import storage
+
+PARTITION_MONTHS_AHEAD = 2
+
+INITIAL_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS user (
+        user_id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        role VARCHAR(20) NOT NULL,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS camera (
+        camera_id INT AUTO_INCREMENT PRIMARY KEY,
+        location VARCHAR(100),
+        status VARCHAR(20) DEFAULT 'offline'
+    )""",
+    """CREATE TABLE IF NOT EXISTS detection (
+        detection_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        camera_id INT NOT NULL,
+        confidence_score FLOAT,
+        ai_result VARCHAR(32) NOT NULL,
+        image_path VARCHAR(512),
+        `timestamp` DATETIME NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS feedback (
+        feedback_id INT AUTO_INCREMENT PRIMARY KEY,
+        detection_id BIGINT NOT NULL,
+        user_id INT,
+        category VARCHAR(50),
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+# (table, index name, columns). Every dashboard / export / retention query is served by one of these.
+INDEXES = [
+    ("detection", "idx_detection_camera_time", "camera_id, `timestamp`"),
+    ("detection", "idx_detection_result_time", "ai_result, `timestamp`"),
+    ("detection", "idx_detection_time", "`timestamp`"),
+    ("feedback", "idx_feedback_detection", "detection_id"),
+    ("camera", "idx_camera_status", "status"),
+]
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _column_exists(cur, table, column):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND COLUMN_NAME=%s",
+        (table, column)
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _index_exists(cur, table, index):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s AND INDEX_NAME=%s",
+        (table, index)
+    )
+    return cur.fetchone()[0] > 0
+
+
+def add_column(cur, table, column, definition):
+    if not _column_exists(cur, table, column):
+        cur.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+
+
+def add_index(cur, table, index, columns):
+    if not _index_exists(cur, table, index):
+        cur.execute(f"ALTER TABLE `{table}` ADD INDEX `{index}` ({columns})")
+
+
+# -----------------------------
+# Migrations
+# -----------------------------
+def _initial_schema(cur):
+    for statement in INITIAL_SCHEMA:
+        cur.execute(statement)
+
+
+def _detection_clip_path(cur):
+    add_column(cur, "detection", "clip_path", "VARCHAR(512) NULL")
+
+
+def _query_indexes(cur):
+    for table, index, columns in INDEXES:
+        add_index(cur, table, index, columns)
+
+
+def _detection_rollups(cur):
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS detection_rollup (
+            granularity ENUM('minute', 'hour', 'day') NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            camera_id INT NOT NULL,
+            ai_result VARCHAR(32) NOT NULL,
+            detections INT NOT NULL DEFAULT 0,
+            confidence_sum DOUBLE NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_start, camera_id, ai_result)
+        )"""
+    )
+
+
+def _camera_leases(cur):
+    add_column(cur, "camera", "stream_url", "VARCHAR(512) NULL")
+    add_column(cur, "camera", "lease_owner", "VARCHAR(64) NULL")
+    add_column(cur, "camera", "lease_expires", "DATETIME NULL")
+    add_index(cur, "camera", "idx_camera_lease", "lease_owner, lease_expires")
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS detector_node (
+            node_id VARCHAR(64) PRIMARY KEY,
+            capacity INT NOT NULL,
+            last_seen DATETIME NOT NULL
+        )"""
+    )
+
+
+def _detection_model_version(cur):
+    add_column(cur, "detection", "model_version", "VARCHAR(64) NULL")
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "detection.clip_path", _detection_clip_path),
+    (3, "query indexes", _query_indexes),
+    (4, "detection rollups", _detection_rollups),
+    (5, "camera leases", _camera_leases),
+    (6, "detection.model_version", _detection_model_version),
+]
+
+
+def applied_versions(cur):
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )"""
+    )
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate():
+    """Apply pending migrations in order. Returns the versions applied (stops at the first failure)."""
+    if storage.is_sqlite():
+        get_connection()  # the SQLite backend creates the full current schema on first connect
+        return []
+    conn = get_connection()
+    if not conn:
+        return []
+    done = []
+    try:
+        with conn.cursor() as cur:
+            applied = applied_versions(cur)
+            for version, name, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"[INFO] Applying migration {version}: {name}")
+                apply(cur)  # DDL commits implicitly in MySQL; each step is idempotent instead
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+                done.append(version)
+    except Error as e:
+        print(f"[ERROR] Migration failed: {e}")
+    finally:
+        conn.close()
+    return done
+
+
+def status():
+    if storage.is_sqlite():
+        return [(version, name, True) for version, name, _ in MIGRATIONS]
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cur:
+            applied = applied_versions(cur)
+        return [(version, name, version in applied) for version, name, _ in MIGRATIONS]
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Monthly partitioning
+# -----------------------------
+def _month_start(d, offset=0):
+    index = d.year * 12 + d.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def _partition_clause(month):
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN (TO_DAYS('{_month_start(month, 1)}'))"
+
+
+def _partitions(cur):
+    if storage.is_sqlite():
+        return []  # no partitioning on SQLite; retention prunes row by row
+    cur.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='detection' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def is_partitioned(cur):
+    return bool(_partitions(cur))
+
+
+def partition_detection_by_month(months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    One-off: rebuild `detection` as RANGE(TO_DAYS(timestamp)) with one partition per month from
+    the oldest row to `months_ahead` months from now, plus a catch-all. Copies the table; run off-hours.
+    """
+    if storage.is_sqlite():
+        print("[INFO] Partitioning needs MySQL; the SQLite backend prunes detection row by row")
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            if is_partitioned(cur):
+                print("[INFO] detection is already partitioned")
+                return True
+            cur.execute("SELECT MIN(`timestamp`) FROM detection")
+            oldest = cur.fetchone()[0] or datetime.now()
+            month, last = _month_start(oldest), _month_start(date.today(), months_ahead)
+            clauses = []
+            while month <= last:
+                clauses.append(_partition_clause(month))
+                month = _month_start(month, 1)
+            clauses.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+            cur.execute(
+                "ALTER TABLE detection MODIFY `timestamp` DATETIME NOT NULL, "
+                "DROP PRIMARY KEY, ADD PRIMARY KEY (detection_id, `timestamp`)"
+            )
+            cur.execute(
+                "ALTER TABLE detection PARTITION BY RANGE (TO_DAYS(`timestamp`)) ("
+                + ", ".join(clauses) + ")"
+            )
+        print(f"[INFO] detection partitioned into {len(clauses)} partitions")
+        return True
+    except Error as e:
+        print(f"[ERROR] Failed to partition detection: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def ensure_future_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Split pmax so the next `months_ahead` months each have their own partition. No-op if unpartitioned."""
+    conn = get_connection()
+    if not conn:
+        return
+    try:
+        with conn.cursor() as cur:
+            names = [n for n in _partitions(cur) if n != "pmax"]
+            if not names:
+                return
+            month = _month_start(datetime.strptime(names[-1], "p%Y%m"), 1)
+            last = _month_start(date.today(), months_ahead)
+            clauses = []
+            while month <= last:
+                clauses.append(_partition_clause(month))
+                month = _month_start(month, 1)
+            if clauses:
+                clauses.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+                cur.execute("ALTER TABLE detection REORGANIZE PARTITION pmax INTO (" + ", ".join(clauses) + ")")
+    except Error as e:
+        print(f"[ERROR] Failed to add detection partitions: {e}")
+    finally:
+        conn.close()
+
+
+def drop_expired_partitions(cutoff):
+    """
+    Drop monthly partitions that end on or before `cutoff` and hold no detection with feedback.
+    Returns the number of detection rows removed. No-op if detection is not partitioned.
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+    removed = 0
+    try:
+        with conn.cursor() as cur:
+            for name in _partitions(cur):
+                if name == "pmax":
+                    continue
+                month = datetime.strptime(name, "p%Y%m")
+                if datetime.combine(_month_start(month, 1), datetime.min.time()) > cutoff:
+                    break
+                cur.execute(
+                    f"SELECT COUNT(*), SUM(EXISTS (SELECT 1 FROM feedback f WHERE f.detection_id = d.detection_id)) "
+                    f"FROM detection PARTITION ({name}) d"
+                )
+                rows, with_feedback = cur.fetchone()
+                if with_feedback:
+                    continue  # rows-with-feedback are kept; prune_detections handles the rest
+                cur.execute(f"ALTER TABLE detection DROP PARTITION {name}")
+                removed += rows or 0
+                print(f"[INFO] Dropped detection partition {name} ({rows} rows)")
+    except Error as e:
+        print(f"[ERROR] Failed to drop detection partitions: {e}")
+    finally:
+        conn.close()
+    return removed
+
+
+# -----------------------------
+# Index check
+# -----------------------------
+# (description, query, params, index the plan should use)
+DASHBOARD_QUERIES = [
+    ("export range", "SELECT * FROM detection WHERE `timestamp` >= %s AND `timestamp` < %s",
+     ("2025-01-01", "2025-01-02"), "idx_detection_time"),
+    ("camera timeline", "SELECT * FROM detection WHERE camera_id=%s AND `timestamp` >= %s ORDER BY `timestamp` DESC LIMIT 50",
+     (1, "2025-01-01"), "idx_detection_camera_time"),
+    ("retention prune", "SELECT detection_id FROM detection WHERE ai_result=%s AND `timestamp` < %s ORDER BY detection_id LIMIT 500",
+     ("person_with_id", "2025-01-01"), "idx_detection_result_time"),
+    ("guard log page", "SELECT detection_id FROM detection ORDER BY detection_id DESC LIMIT 100",
+     (), "PRIMARY"),
+    ("feedback join", "SELECT * FROM feedback WHERE detection_id=%s",
+     (1,), "idx_feedback_detection"),
+    ("camera status counts", "SELECT status, COUNT(*) FROM camera GROUP BY status",
+     (), "idx_camera_status"),
+    ("camera leases held", "SELECT camera_id FROM camera WHERE lease_owner=%s",
+     ("node",), "idx_camera_lease"),
+]
+
+
+def check_indexes(queries=DASHBOARD_QUERIES):
+    """
+    EXPLAIN each dashboard query and report the chosen index. Returns [(description, ok, key, type)].
+    On near-empty tables the optimizer may prefer a scan anyway; check against production-sized data.
+    """
+    if storage.is_sqlite():
+        print("[INFO] Index check reads MySQL EXPLAIN output; skipped on SQLite")
+        return []
+    conn = get_connection()
+    if not conn:
+        return []
+    results = []
+    try:
+        with conn.cursor(dictionary=True) as cur:
+            for description, query, params, expected in queries:
+                cur.execute("EXPLAIN " + query, params)
+                plan = cur.fetchall()
+                first = plan[0]
+                key, access = first.get("key"), first.get("type")
+                ok = key == expected and access != "ALL"
+                results.append((description, ok, key, access))
+    except Error as e:
+        print(f"[ERROR] Index check failed: {e}")
+    finally:
+        conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create / migrate the database schema.")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    parser.add_argument("--check", action="store_true", help="EXPLAIN dashboard queries and report index use")
+    parser.add_argument("--partition", action="store_true", help="range-partition detection by month")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, applied in status():
+            print(f"  {version:3d}  {'applied' if applied else 'pending':8s}  {name}")
+    elif args.check:
+        failed = 0
+        for description, ok, key, access in check_indexes():
+            failed += not ok
+            print(f"  {'OK ' if ok else 'BAD'}  {description:22s} key={key} type={access}")
+        raise SystemExit(1 if failed else 0)
+    elif args.partition:
+        partition_detection_by_month()
+    else:
+        applied = migrate()
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
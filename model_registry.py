@@ -0,0 +1,195 @@
+"""
+Detection model registry with background loading and hot-swap.
+
+model/registry.json names the active weights file and the ones it replaced:
+    {"active": "model/bestt_v2.pt", "history": ["model/bestt.pt"]}
+Every detector process watches the file. When `active` changes, the new weights are loaded and
+warmed up on a background thread while the feeds keep running on the old model, then the switch
+is a single reference assignment. Each frame takes the current model once, so no frame is split
+across versions. If loading or warm-up fails the old model stays active. The replaced model is
+kept loaded, so rolling back to it is instant.
+
+    python model_registry.py --activate model/bestt_v2.pt
+    python model_registry.py --rollback
+    python model_registry.py --status
+"""
+import os, json, time, hashlib, threading
+import numpy as np
+from ultralytics import YOLO
+
+REGISTRY_PATH = os.path.join("model", "registry.json")
+DEFAULT_MODEL = os.path.join("model", "bestt.pt")
+WATCH_INTERVAL = 5  # seconds between registry.json checks
+HISTORY_SIZE = 10
+WARMUP_SHAPE = (384, 640, 3)  # cctv_feed.FRAME_SIZE as an array shape
+WARMUP_IMGSZ = (384, 640)  # live inference size and cascade verify size
+
+
+def model_version(path):
+    """`<file stem>-<first 8 hex of sha256>`, so a retrained file under the same name is a new version."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{digest.hexdigest()[:8]}"
+
+
+def _file_key(path):
+    path = os.path.normpath(path)
+    return path, os.path.getmtime(path) if os.path.exists(path) else None
+
+
+class ModelHandle:
+    """One loaded model version. The YOLO predictor keeps per-call state, so cameras sharing it take turns."""
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+        self.version = model_version(path)
+        self.model = YOLO(path)
+        self.names = self.model.names
+        self.lock = threading.Lock()
+
+    def predict(self, source, imgsz):
+        with self.lock:
+            return self.model.predict(source=source, imgsz=imgsz, show=False, save=False, verbose=False)
+
+    def warm_up(self):
+        frame = np.zeros(WARMUP_SHAPE, dtype=np.uint8)
+        for imgsz in WARMUP_IMGSZ:
+            self.predict(frame, imgsz)
+
+
+# -----------------------------
+# registry.json
+# -----------------------------
+def read_registry(path=REGISTRY_PATH):
+    data = {"active": DEFAULT_MODEL, "history": []}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Model registry unreadable, using {data['active']}: {e}")
+    return data
+
+
+def write_registry(data, path=REGISTRY_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def activate(model_path, path=REGISTRY_PATH):
+    """Make `model_path` the active model for every watching process."""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(model_path)
+    data = read_registry(path)
+    if os.path.normpath(data["active"]) != os.path.normpath(model_path):
+        history = [p for p in data["history"] if os.path.normpath(p) != os.path.normpath(data["active"])]
+        data["history"] = ([data["active"]] + history)[:HISTORY_SIZE]
+        data["active"] = model_path
+        write_registry(data, path)
+    return data
+
+
+def rollback(path=REGISTRY_PATH):
+    """Re-activate the model that was active before the current one."""
+    data = read_registry(path)
+    if not data["history"]:
+        raise ValueError("no previous model to roll back to")
+    data["active"] = data["history"].pop(0)
+    write_registry(data, path)
+    return data
+
+
+# -----------------------------
+# In-process registry
+# -----------------------------
+class ModelRegistry:
+    def __init__(self, registry_path=REGISTRY_PATH):
+        self.registry_path = registry_path
+        self.running = False
+        self._previous = None
+        self._failed = None  # (path, mtime) that failed to load; retried only once the file changes
+        active = read_registry(registry_path)["active"]
+        try:
+            self._active = ModelHandle(active)
+        except Exception as e:
+            if os.path.normpath(active) == os.path.normpath(DEFAULT_MODEL):
+                raise
+            print(f"[ERROR] Cannot load active model {active}, falling back to {DEFAULT_MODEL}: {e}")
+            self._failed = _file_key(active)
+            self._active = ModelHandle(DEFAULT_MODEL)
+
+    def current(self):
+        """The active model. Take it once per frame and use that handle for the whole frame."""
+        return self._active
+
+    @property
+    def previous(self):
+        return self._previous
+
+    def switch_to(self, path):
+        """Load, check and warm `path`, then make it active. Returns False (old model kept) on failure."""
+        path = os.path.normpath(path)
+        if self._previous is not None and self._previous.path == path:
+            self._swap(self._previous, "rolled back")
+            return True
+        started = time.perf_counter()
+        try:
+            handle = ModelHandle(path)
+            if dict(handle.names) != dict(self._active.names):
+                raise ValueError(f"class list changed ({dict(handle.names)}); restart to switch")
+            loaded = time.perf_counter()
+            handle.warm_up()
+        except Exception as e:
+            print(f"[ERROR] Model {path} not activated, staying on {self._active.version}: {e}")
+            self._failed = _file_key(path)
+            return False
+        print(f"[INFO] Model {handle.version} loaded in {loaded - started:.1f}s, "
+              f"warmed up in {time.perf_counter() - loaded:.1f}s")
+        self._swap(handle, "switched")
+        return True
+
+    def _swap(self, handle, verb):
+        # In-flight frames keep the handle they started with; the next frame picks up the new one
+        self._previous, self._active = self._active, handle
+        self._failed = None
+        print(f"[INFO] Detection model {verb} to {handle.version} (previous {self._previous.version})")
+
+    def start(self, interval=WATCH_INTERVAL):
+        """Watch registry.json on a background thread (once per process)."""
+        if not self.running:
+            self.running = True
+            threading.Thread(target=self._watch, args=(interval,), name="model-registry", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _watch(self, interval):
+        while self.running:
+            wanted = os.path.normpath(read_registry(self.registry_path)["active"])
+            if wanted != self._active.path and _file_key(wanted) != self._failed:
+                self.switch_to(wanted)
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Switch the detection model used by running detectors.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--activate", metavar="WEIGHTS", help="path of the .pt file to make active")
+    group.add_argument("--rollback", action="store_true", help="go back to the previously active model")
+    group.add_argument("--status", action="store_true")
+    args = parser.parse_args()
+    if args.activate:
+        data = activate(args.activate)
+    elif args.rollback:
+        data = rollback()
+    else:
+        data = read_registry()
+    version = model_version(data["active"]) if os.path.exists(data["active"]) else "missing"
+    print(f"active:  {data['active']} ({version})")
+    for p in data["history"]:
+        print(f"history: {p}")
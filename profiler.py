@@ -0,0 +1,112 @@
+"""
+Time-boxed sampling profiler for the running process (all threads).
+
+Samples sys._current_frames() from a daemon thread and writes, into output/profiles:
+  profile_<stamp>.folded   collapsed stacks ("thread;outer;...;inner count"), for flamegraph.pl / speedscope
+  profile_<stamp>_top.txt  top-N functions by self and inclusive samples
+
+The sampling interval stretches as needed so sampler time stays under OVERHEAD_CAP of wall time.
+"""
+import os, sys, time, threading
+from collections import Counter
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_FOLDER = os.path.join(BASE_DIR, "output", "profiles")
+DEFAULT_INTERVAL = 0.01  # 100 Hz
+OVERHEAD_CAP = 0.02  # max fraction of wall time spent sampling
+MAX_DURATION = 300
+TOP_N = 25
+
+_active_lock = threading.Lock()
+_active = None
+
+
+class SamplingProfiler:
+    def __init__(self, duration, interval=DEFAULT_INTERVAL, overhead_cap=OVERHEAD_CAP,
+                 top_n=TOP_N, output_folder=PROFILE_FOLDER):
+        self.duration = min(max(1.0, float(duration)), MAX_DURATION)
+        self.interval = interval
+        self.overhead_cap = overhead_cap
+        self.top_n = top_n
+        self.output_folder = output_folder
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.folded_path = os.path.join(output_folder, f"profile_{stamp}.folded")
+        self.summary_path = os.path.join(output_folder, f"profile_{stamp}_top.txt")
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.done = threading.Event()
+
+    def start(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        threading.Thread(target=self._run, name="profiler", daemon=True).start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + self.duration
+        try:
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+                cost = time.perf_counter() - t0
+                self.samples += 1
+                self.sampling_seconds += cost
+                # Sleep long enough that cost / (cost + sleep) stays under the cap
+                time.sleep(max(self.interval, cost / self.overhead_cap - cost))
+            self.wall_seconds = time.perf_counter() - started
+            self._write()
+        except Exception as e:
+            print(f"[ERROR] Profiler failed: {e}")
+        finally:
+            self.done.set()
+
+    def _write(self):
+        with open(self.folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread name
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for fn in set(frames):
+                inclusive[fn] += count
+        total = sum(self.stacks.values()) or 1
+
+        lines = [
+            f"Sampling profile: {self.samples} samples over {self.wall_seconds:.1f}s, "
+            f"sampler overhead {self.sampling_seconds / self.wall_seconds:.2%} (cap {self.overhead_cap:.0%})",
+            "",
+            f"Top {self.top_n} by self samples:",
+        ]
+        lines += [f"{c:8d} {c / total:6.1%}  {fn}" for fn, c in self_counts.most_common(self.top_n)]
+        lines += ["", f"Top {self.top_n} by inclusive samples:"]
+        lines += [f"{c:8d} {c / total:6.1%}  {fn}" for fn, c in inclusive.most_common(self.top_n)]
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"[INFO] Profile written to {self.folded_path}")
+
+
+def start_profile(duration):
+    """Start a profile unless one is already running. Returns (profiler, error)."""
+    global _active
+    with _active_lock:
+        if _active is not None and not _active.done.is_set():
+            return None, "A profile is already running"
+        _active = SamplingProfiler(duration).start()
+        return _active, None
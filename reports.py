@@ -0,0 +1,305 @@
+"""
+Pre-built daily / weekly / monthly report artifacts.
+
+As each period closes, the scheduler writes into output/reports/<kind>/:
+  <key>.csv.gz     the same rows as the admin CSV export for that period
+  <key>.parquet    detection joined with feedback (only when pyarrow is installed)
+  <key>.json       summary: totals per ai_result and per camera, incidents
+and records them in output/reports/index.json. Weeks run Monday to Sunday.
+
+Feedback written after a report was built (tracked by a feedback_id watermark) marks the
+day, week and month of the affected detections stale, and only those are rebuilt (including
+built periods that have since aged out of LOOKBACK).
+The admin export copies the pre-built file when the requested range is a closed period.
+
+    python reports.py --once
+"""
+import os, json, gzip, shutil, time, threading
+from datetime import date, datetime, timedelta
+from database import get_connection
+from log_export import ExportJob, ParquetExportJob, detection_range_query, analytics_range_query, pa
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_FOLDER = os.path.join(BASE_DIR, "output", "reports")
+RUN_INTERVAL = 30 * 60  # seconds between passes
+LOOKBACK = {"daily": 35, "weekly": 10, "monthly": 13}  # closed periods kept pre-built
+KINDS = ("daily", "weekly", "monthly")
+
+_service = None
+
+
+# -----------------------------
+# Periods
+# -----------------------------
+def _month_start(d, offset=0):
+    index = d.year * 12 + d.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def period_of(kind, day):
+    """(key, start date, end date exclusive) of the `kind` period containing `day`."""
+    if kind == "daily":
+        return day.isoformat(), day, day + timedelta(days=1)
+    if kind == "weekly":
+        start = day - timedelta(days=day.weekday())
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}", start, start + timedelta(days=7)
+    start = _month_start(day)
+    return f"{start:%Y-%m}", start, _month_start(day, 1)
+
+
+def closed_periods(kind, today=None, count=None):
+    """The most recent `count` periods of `kind` that ended before today, newest first."""
+    today = today or date.today()
+    count = count or LOOKBACK[kind]
+    periods = []
+    _, current_start, _ = period_of(kind, today)
+    day = current_start - timedelta(days=1)
+    while len(periods) < count:
+        period = period_of(kind, day)
+        periods.append(period)
+        day = period[1] - timedelta(days=1)
+    return periods
+
+
+# -----------------------------
+# Index
+# -----------------------------
+class ReportIndex:
+    """index.json: {"feedback_watermark": int, "reports": {"daily:2025-01-05": {...}}}."""
+    def __init__(self, folder=REPORT_FOLDER):
+        self.path = os.path.join(folder, "index.json")
+        self.reports = {}
+        self.feedback_watermark = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.reports = data.get("reports", {})
+            self.feedback_watermark = data.get("feedback_watermark", 0)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"feedback_watermark": self.feedback_watermark, "reports": self.reports}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def get(self, kind, key):
+        return self.reports.get(f"{kind}:{key}")
+
+    def find(self, start, end):
+        """The report entry covering exactly [start, end) (dates or datetimes), or None."""
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        for kind in KINDS:
+            key, p_start, p_end = period_of(kind, start)
+            if (p_start, p_end) == (start, end):
+                return self.get(kind, key)
+        return None
+
+
+# -----------------------------
+# Building
+# -----------------------------
+def period_summary(start, end):
+    """Totals for [start, end) from the daily rollups, plus feedback-linked incidents."""
+    summary = {"start": start.isoformat(), "end": end.isoformat(), "totals": {}, "by_camera": {}, "incidents": 0}
+    conn = get_connection()
+    if not conn:
+        return summary
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT camera_id, ai_result, SUM(detections) FROM detection_rollup "
+                "WHERE granularity='day' AND bucket_start >= %s AND bucket_start < %s "
+                "GROUP BY camera_id, ai_result",
+                (start, end)
+            )
+            for camera_id, ai_result, total in cur.fetchall():
+                total = int(total)
+                summary["totals"][ai_result] = summary["totals"].get(ai_result, 0) + total
+                summary["by_camera"].setdefault(str(camera_id), {})[ai_result] = total
+            cur.execute(
+                "SELECT COUNT(DISTINCT d.detection_id) FROM detection d "
+                "JOIN feedback f ON f.detection_id = d.detection_id "
+                "WHERE d.`timestamp` >= %s AND d.`timestamp` < %s",
+                (start, end)
+            )
+            summary["incidents"] = cur.fetchone()[0]
+    except Exception as e:
+        print(f"[ERROR] Failed to summarise {start}..{end}: {e}")
+    finally:
+        conn.close()
+    return summary
+
+
+def build_report(kind, key, start, end, folder=REPORT_FOLDER):
+    """Write the period's artifacts and return its index entry (None if an export failed)."""
+    out = os.path.join(folder, kind)
+    os.makedirs(out, exist_ok=True)
+    started = time.perf_counter()
+    files = {}
+    jobs = [(".csv.gz", ExportJob, detection_range_query)]
+    if pa is not None:
+        jobs.append((".parquet", ParquetExportJob, analytics_range_query))
+    for ext, job_cls, query_fn in jobs:
+        path = os.path.join(out, key + ext)
+        job = job_cls(path, *query_fn(start, end))
+        job.run()
+        if job.error:
+            return None
+        files[ext] = path
+
+    summary = period_summary(start, end)
+    summary_path = os.path.join(out, key + ".json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=1)
+    files[".json"] = summary_path
+    print(f"[INFO] Built {kind} report {key} in {time.perf_counter() - started:.1f}s")
+    return {
+        "kind": kind, "key": key, "start": start.isoformat(), "end": end.isoformat(),
+        "files": files, "summary": summary, "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def copy_report(entry, dest):
+    """Copy a pre-built report to `dest` (.csv, .csv.gz or .parquet). Returns False if not available."""
+    files = entry.get("files", {})
+    for ext in (".parquet", ".csv.gz"):
+        if dest.endswith(ext) and os.path.exists(files.get(ext, "")):
+            shutil.copyfile(files[ext], dest)
+            return True
+    if dest.endswith(".csv") and os.path.exists(files.get(".csv.gz", "")):
+        with gzip.open(files[".csv.gz"], "rb") as src, open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return True
+    return False
+
+
+def find_report(start, end, folder=REPORT_FOLDER):
+    """Index entry for a closed period exactly matching [start, end), or None."""
+    try:
+        return ReportIndex(folder).find(start, end)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Report index unreadable: {e}")
+        return None
+
+
+# -----------------------------
+# Scheduler
+# -----------------------------
+class ReportScheduler:
+    def __init__(self, folder=REPORT_FOLDER, interval=RUN_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._loop, name="reports", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[ERROR] Report pass failed: {e}")
+            deadline = time.monotonic() + self.interval
+            while self.running and time.monotonic() < deadline:
+                time.sleep(1)
+
+    def stale_days(self, index):
+        """
+        Days holding detections that received feedback since the watermark, and the newest
+        feedback_id seen (None if there is none). The caller advances the watermark.
+        """
+        conn = get_connection()
+        if not conn:
+            return set(), None
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT MAX(f.feedback_id) FROM feedback f WHERE f.feedback_id > %s",
+                    (index.feedback_watermark,)
+                )
+                newest = cur.fetchone()[0]
+                if newest is None:
+                    return set(), None
+                cur.execute(
+                    "SELECT DISTINCT DATE(d.`timestamp`) FROM feedback f "
+                    "JOIN detection d ON d.detection_id = f.detection_id "
+                    "WHERE f.feedback_id > %s AND f.feedback_id <= %s",
+                    (index.feedback_watermark, newest)
+                )
+                # MySQL returns dates; SQLite returns DATE() as text
+                days = {d if isinstance(d, date) else date.fromisoformat(d) for d, in cur.fetchall()}
+            return days, newest
+        finally:
+            conn.close()
+
+    def run_once(self, today=None):
+        """Build missing closed periods and rebuild stale ones. Returns the keys built."""
+        index = ReportIndex(self.folder)
+        stale = {}
+        days, newest = self.stale_days(index)
+        for day in days:
+            for kind in KINDS:
+                key, start, end = period_of(kind, day)
+                if index.get(kind, key):
+                    stale[(kind, key)] = (start, end)
+
+        built = []
+        finished = True
+        for kind in KINDS:
+            periods = list(reversed(closed_periods(kind, today)))
+            # Stale entries older than LOOKBACK are still in the index (and served by the export)
+            recent = {key for key, _, _ in periods}
+            older = sorted((start, key, end) for (k, key), (start, end) in stale.items()
+                           if k == kind and key not in recent)
+            periods[:0] = [(key, start, end) for start, key, end in older]
+            for key, start, end in periods:
+                if index.get(kind, key) and (kind, key) not in stale:
+                    continue
+                if not self.running:
+                    finished = False
+                    break
+                entry = build_report(kind, key, start, end, self.folder)
+                if entry:
+                    index.reports[f"{kind}:{key}"] = entry
+                    built.append(f"{kind}:{key}")
+                else:
+                    index.reports.pop(f"{kind}:{key}", None)  # retried as missing next pass
+                index.save()
+        # Only past the feedback once every stale period is rebuilt; a stopped pass sees it again
+        if finished and newest is not None:
+            index.feedback_watermark = newest
+        index.save()
+        return built
+
+
+def start_service(folder=REPORT_FOLDER):
+    """Start the background report scheduler once per process."""
+    global _service
+    if _service is None:
+        _service = ReportScheduler(folder).start()
+    return _service
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pre-build periodic report files.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args()
+    scheduler = ReportScheduler()
+    if args.once:
+        scheduler.running = True
+        built = scheduler.run_once()
+        print(f"Built {len(built)} report(s): {', '.join(built) or '-'}")
+    else:
+        scheduler.start()
+        while True:
+            time.sleep(60)
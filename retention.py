@@ -0,0 +1,327 @@
+"""
+Snapshot retention, compaction and tiered archiving.
+
+Tiers per output folder:
+  hot      loose files, as written by the feed
+  archive  after `archive_after_days`, files are packed into output/archive/<folder>/<YYYY-MM-DD>.zip
+  deleted  after `delete_after_days`, archives (and any loose stragglers) are removed, and
+           detection rows for that label are pruned in small primary-key chunks
+
+A folder over its `max_bytes` budget loses its oldest archives first, then its oldest loose files.
+Detection rows that have feedback are kept, and so are their snapshots and clips: those files are
+never archived or deleted, and a day archive about to be deleted gives them back as loose files
+first. Archived snapshots stay readable through read_snapshot().
+When `detection` is partitioned by month (migrations.py --partition), months older than every
+label's delete_after_days are dropped whole instead of row by row.
+
+    python retention.py --once
+"""
+import os, re, time, threading, zipfile
+from datetime import datetime, timedelta
+from database import get_connection
+import migrations
+import snapshot_index
+
+GB = 1024 ** 3
+RETENTION_POLICIES = {
+    "person_without_id": {"label": "person_without_id", "archive_after_days": 30, "delete_after_days": 180, "max_bytes": 20 * GB},
+    "person_with_id": {"label": "person_with_id", "archive_after_days": 7, "delete_after_days": 30, "max_bytes": 5 * GB},
+    "admin_snapshots": {"archive_after_days": None, "delete_after_days": 30, "max_bytes": 5 * GB},
+    "guard_snapshots": {"archive_after_days": None, "delete_after_days": 14, "max_bytes": 5 * GB},
+    "clips": {"archive_after_days": None, "delete_after_days": 90, "max_bytes": 20 * GB},
+}
+ARCHIVE_FOLDER = "archive"
+RUN_INTERVAL = 15 * 60  # seconds between passes
+FILES_PER_STEP = 200  # files handled before yielding
+DB_CHUNK = 500  # detection rows deleted per statement
+STEP_PAUSE = 0.2  # seconds to sleep between steps / chunks
+
+_DATE_IN_NAME = re.compile(r"_(\d{8})_\d{6}\.\w+$")
+_service = None
+
+
+def _file_day(name, mtime):
+    m = _DATE_IN_NAME.search(name)
+    if m:
+        return datetime.strptime(m.group(1), "%Y%m%d").strftime("%Y-%m-%d")
+    return datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")
+
+
+def read_snapshot(path):
+    """Bytes of a snapshot, whether still on disk or already packed into its day archive."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    folder_dir, name = os.path.split(path)
+    output, folder = os.path.split(folder_dir)
+    m = _DATE_IN_NAME.search(name)
+    if not m:
+        return None
+    day = datetime.strptime(m.group(1), "%Y%m%d").strftime("%Y-%m-%d")
+    archive = os.path.join(output, ARCHIVE_FOLDER, folder, f"{day}.zip")
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            return zf.read(name)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+class RetentionService:
+    def __init__(self, output_folder, policies=RETENTION_POLICIES, interval=RUN_INTERVAL):
+        self.output_folder = output_folder
+        self.policies = policies
+        self.interval = interval
+        self.running = False
+        self.last_report = {}
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._loop, name="retention", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[ERROR] Retention pass failed: {e}")
+            deadline = time.monotonic() + self.interval
+            while self.running and time.monotonic() < deadline:
+                time.sleep(1)
+
+    def run_once(self):
+        """One incremental pass over every folder. Returns {folder: stats}."""
+        report = {}
+        now = time.time()
+        protected = evidence_names()
+        if protected is None:
+            print("[WARN] Retention: feedback evidence unknown (database unreachable), "
+                  "archiving and deleting no files this pass")
+        for folder, policy in self.policies.items():
+            stats = {"archived_files": 0, "deleted_files": 0, "bytes_reclaimed": 0, "db_rows_pruned": 0}
+            if protected is not None:
+                self._archive_aged(folder, policy, now, stats, protected)
+                self._delete_expired(folder, policy, now, stats, protected)
+                self._enforce_budget(folder, policy, stats, protected)
+            if policy.get("label") and policy.get("delete_after_days"):
+                stats["db_rows_pruned"] = prune_detections(policy["label"], policy["delete_after_days"])
+            report[folder] = stats
+        report["partitions"] = self._drop_partitions(now)
+        self.last_report = report
+        reclaimed = sum(s["bytes_reclaimed"] for s in report.values())
+        rows = sum(s["db_rows_pruned"] for s in report.values())
+        print(f"[INFO] Retention: reclaimed {reclaimed / 1e6:.1f} MB, pruned {rows} detection rows")
+        return report
+
+    def _drop_partitions(self, now):
+        days = [p["delete_after_days"] for p in self.policies.values() if p.get("label") and p.get("delete_after_days")]
+        stats = {"bytes_reclaimed": 0, "db_rows_pruned": 0}
+        if days:
+            migrations.ensure_future_partitions()
+            cutoff = datetime.fromtimestamp(now) - timedelta(days=max(days))
+            stats["db_rows_pruned"] = migrations.drop_expired_partitions(cutoff)
+        return stats
+
+    # ---------- Filesystem ----------
+    def _loose_files(self, folder):
+        path = os.path.join(self.output_folder, folder)
+        if not os.path.isdir(path):
+            return []
+        with os.scandir(path) as it:
+            return [(e.path, e.name, e.stat()) for e in it if e.is_file()]
+
+    def _archives(self, folder):
+        path = os.path.join(self.output_folder, ARCHIVE_FOLDER, folder)
+        if not os.path.isdir(path):
+            return []
+        with os.scandir(path) as it:
+            return sorted((e.path for e in it if e.name.endswith(".zip")))
+
+    def _archive_aged(self, folder, policy, now, stats, protected):
+        days = policy.get("archive_after_days")
+        if not days:
+            return
+        cutoff = now - days * 86400
+        by_day = {}
+        for path, name, st in self._loose_files(folder):
+            if st.st_mtime < cutoff and name not in protected:
+                by_day.setdefault(_file_day(name, st.st_mtime), []).append((path, name, st.st_size))
+
+        archive_dir = os.path.join(self.output_folder, ARCHIVE_FOLDER, folder)
+        os.makedirs(archive_dir, exist_ok=True)
+        for day, files in sorted(by_day.items()):
+            archive = os.path.join(archive_dir, f"{day}.zip")
+            for i in range(0, len(files), FILES_PER_STEP):
+                chunk = files[i:i + FILES_PER_STEP]
+                before = os.path.getsize(archive) if os.path.exists(archive) else 0
+                with zipfile.ZipFile(archive, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+                    existing = set(zf.namelist())
+                    for path, name, _ in chunk:
+                        if name not in existing:
+                            zf.write(path, arcname=name)
+                for path, _, _ in chunk:
+                    os.remove(path)
+                growth = os.path.getsize(archive) - before
+                stats["archived_files"] += len(chunk)
+                stats["bytes_reclaimed"] += sum(size for _, _, size in chunk) - growth
+                if not self.running:
+                    return
+                time.sleep(STEP_PAUSE)
+
+    def _delete_expired(self, folder, policy, now, stats, protected):
+        days = policy.get("delete_after_days")
+        if not days:
+            return
+        cutoff = now - days * 86400
+        cutoff_day = datetime.fromtimestamp(cutoff).strftime("%Y-%m-%d")
+        for archive in self._archives(folder):
+            if os.path.basename(archive)[:-4] < cutoff_day:
+                stats["bytes_reclaimed"] += self._remove(archive, folder, protected)
+                stats["deleted_files"] += 1
+        for n, (path, name, st) in enumerate(self._loose_files(folder), 1):
+            if st.st_mtime < cutoff and name not in protected:
+                stats["bytes_reclaimed"] += self._remove(path, folder, protected)
+                stats["deleted_files"] += 1
+            if n % FILES_PER_STEP == 0:
+                time.sleep(STEP_PAUSE)
+
+    def _enforce_budget(self, folder, policy, stats, protected):
+        budget = policy.get("max_bytes")
+        if not budget:
+            return
+        archives = [(p, os.path.getsize(p)) for p in self._archives(folder)]
+        loose = sorted(((p, n, st.st_size, st.st_mtime) for p, n, st in self._loose_files(folder)), key=lambda f: f[3])
+        total = sum(s for _, s in archives) + sum(s for _, _, s, _ in loose)
+        # Oldest first: archives hold older days than anything still loose. Evidence is never evicted.
+        for path, size in archives + [(p, s) for p, n, s, _ in loose if n not in protected]:
+            if total <= budget:
+                break
+            total -= size
+            stats["bytes_reclaimed"] += self._remove(path, folder, protected)
+            stats["deleted_files"] += 1
+
+    def _remove(self, path, folder, protected):
+        restored = self._restore_evidence(path, folder, protected) if path.endswith(".zip") else []
+        if restored is None:
+            return 0
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError as e:
+            print(f"[WARN] Retention could not remove {path}: {e}")
+            return 0
+        # Keep the snapshot index in step: a day archive covers every snapshot of that day
+        if path.endswith(".zip"):
+            day = datetime.strptime(os.path.basename(path)[:-4], "%Y-%m-%d")
+            snapshot_index.remove_range(folder, day.timestamp(), (day + timedelta(days=1)).timestamp())
+            for restored_path in restored:
+                camera_id, confidence, created = snapshot_index.parse_name(os.path.basename(restored_path))
+                label = folder if folder.startswith("person_") else None
+                snapshot_index.add(restored_path, folder, camera_id, label, confidence,
+                                   created or os.path.getmtime(restored_path))
+        else:
+            snapshot_index.remove([path])
+        return size
+
+    def _restore_evidence(self, archive, folder, protected):
+        """Unpack the archive's feedback-linked snapshots back to their original paths; None on failure."""
+        target = os.path.join(self.output_folder, folder)
+        restored = []
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                for name in zf.namelist():
+                    if name in protected:
+                        path = os.path.join(target, name)
+                        if not os.path.exists(path):
+                            with open(path, "wb") as f:
+                                f.write(zf.read(name))
+                        restored.append(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"[WARN] Retention kept {archive}, could not restore its evidence: {e}")
+            return None
+        return restored
+
+
+# -----------------------------
+# Database pruning
+# -----------------------------
+def evidence_names():
+    """File names of the snapshots and clips of detections that have feedback; None if unknown."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT d.image_path, d.clip_path FROM detection d
+                   WHERE EXISTS (SELECT 1 FROM feedback f WHERE f.detection_id = d.detection_id)"""
+            )
+            return {os.path.basename(p) for row in cur.fetchall() for p in row if p}
+    except Exception as e:
+        print(f"[ERROR] Failed to read feedback evidence: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def prune_detections(ai_result, older_than_days, chunk=DB_CHUNK):
+    """
+    Delete old detection rows for one label in primary-key chunks, each its own short
+    transaction, so the detection table is never locked for long. Rows with feedback are kept.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        conn = get_connection()
+        if not conn:
+            return total
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """SELECT d.detection_id FROM detection d
+                       WHERE d.ai_result=%s AND d.`timestamp` < %s
+                         AND NOT EXISTS (SELECT 1 FROM feedback f WHERE f.detection_id = d.detection_id)
+                       ORDER BY d.detection_id LIMIT %s""",
+                    (ai_result, cutoff, chunk)
+                )
+                ids = [row[0] for row in cur.fetchall()]
+                if not ids:
+                    return total
+                placeholders = ",".join(["%s"] * len(ids))
+                cur.execute(f"DELETE FROM detection WHERE detection_id IN ({placeholders})", ids)
+                conn.commit()
+                total += len(ids)
+        except Exception as e:
+            print(f"[ERROR] Failed to prune detections: {e}")
+            return total
+        finally:
+            conn.close()
+        time.sleep(STEP_PAUSE)
+
+
+def start_service(output_folder):
+    """Start the background retention service once per process."""
+    global _service
+    if _service is None:
+        _service = RetentionService(output_folder).start()
+    return _service
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Apply snapshot retention policies.")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "output"))
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args()
+    service = RetentionService(args.output)
+    if args.once:
+        service.running = True
+        for folder, stats in service.run_once().items():
+            print(f"  {folder}: {stats}")
+    else:
+        service.start()
+        while True:
+            time.sleep(60)
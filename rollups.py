@@ -0,0 +1,96 @@
+"""
+Backfill and repair of the detection_rollup table.
+
+insert_detection() keeps the minute / hour / day rollups current as rows are written; this
+rebuilds them from `detection` for history that predates the table (or after a failed update).
+Each day is rebuilt in its own short transaction and replaces, not adds to, the stored counts,
+so running it twice is harmless. Rollups are not reduced when retention prunes old detections.
+
+    python rollups.py --backfill                      # everything in detection
+    python rollups.py --backfill --start 2025-01-01   # from a date up to now
+"""
+import time
+from datetime import datetime, timedelta
+from database import get_connection, Error, ROLLUP_GRANULARITIES
+import storage
+
+STEP_PAUSE = 0.1  # seconds between days, to stay out of the way of live inserts
+
+
+def backfill_day(day):
+    """Recompute every rollup bucket of one calendar day from the detection rows."""
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM detection_rollup WHERE bucket_start >= %s AND bucket_start < %s",
+                (start, end)
+            )
+            for granularity, fmt in ROLLUP_GRANULARITIES.items():
+                if storage.is_sqlite():
+                    bucket = f"strftime('{fmt.replace('%', '%%')}', `timestamp`)"
+                else:
+                    mysql_fmt = fmt.replace("%M", "%i").replace("%", "%%")  # DATE_FORMAT minutes are %i
+                    bucket = f"DATE_FORMAT(`timestamp`, '{mysql_fmt}')"
+                cur.execute(
+                    f"""INSERT INTO detection_rollup
+                    (granularity, bucket_start, camera_id, ai_result, detections, confidence_sum)
+                    SELECT %s, {bucket} AS bucket, camera_id, ai_result,
+                           COUNT(*), COALESCE(SUM(confidence_score), 0)
+                    FROM detection
+                    WHERE `timestamp` >= %s AND `timestamp` < %s
+                    GROUP BY bucket, camera_id, ai_result""",
+                    (granularity, start, end)
+                )
+            conn.commit()
+        return True
+    except Error as e:
+        print(f"[ERROR] Failed to backfill rollups for {day}: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def backfill(start=None, end=None):
+    """Rebuild rollups for every day in [start, end); defaults to the whole detection table up to today."""
+    if start is None:
+        conn = get_connection()
+        if not conn:
+            return 0
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT MIN(`timestamp`) FROM detection")
+                start = cur.fetchone()[0]
+        finally:
+            conn.close()
+        if start is None:
+            return 0
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)  # SQLite: MIN() has no declared type, so no converter runs
+    end = end or datetime.now() + timedelta(days=1)
+    day = start.date() if isinstance(start, datetime) else start
+    last = end.date() if isinstance(end, datetime) else end
+    days = 0
+    while day < last:
+        if backfill_day(day):
+            days += 1
+        day += timedelta(days=1)
+        time.sleep(STEP_PAUSE)
+    return days
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintain detection rollups.")
+    parser.add_argument("--backfill", action="store_true", help="rebuild rollups from detection rows")
+    parser.add_argument("--start", help="YYYY-MM-DD (default: oldest detection)")
+    parser.add_argument("--end", help="YYYY-MM-DD, exclusive (default: through today)")
+    args = parser.parse_args()
+    if args.backfill:
+        start = datetime.strptime(args.start, "%Y-%m-%d") if args.start else None
+        end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+        print(f"Rebuilt rollups for {backfill(start, end)} day(s)")
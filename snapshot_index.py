@@ -0,0 +1,189 @@
+"""
+Sidecar SQLite index of snapshot files, kept current as the feed writes them.
+
+The admin snapshot browser pages through this index with keyset pagination
+(ORDER BY created_at DESC, id DESC), so a page costs the same at 1M snapshots as at 100.
+
+    python snapshot_index.py --rebuild   # index files written before the index existed
+"""
+import os, re, sqlite3, threading
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FOLDER = os.path.join(BASE_DIR, "output")
+INDEX_PATH = os.path.join(OUTPUT_FOLDER, "snapshot_index.db")
+SNAPSHOT_FOLDERS = ("admin_snapshots", "guard_snapshots", "person_with_id", "person_without_id")
+PAGE_SIZE = 60
+
+_NAME = re.compile(
+    r"cam(?P<camera>\d+)_(?:(?:admin|guard)_)?det(?P<det>\d+)_conf(?P<conf>[\d.]+)_(?P<ts>\d{8}_\d{6})\.\w+$"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    camera_id INTEGER,
+    label TEXT,
+    confidence REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_folder_time ON snapshot (folder, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_snapshot_folder_camera_time ON snapshot (folder, camera_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_snapshot_folder_label_time ON snapshot (folder, label, created_at, id);
+"""
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _connection():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        _conn = sqlite3.connect(INDEX_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(SCHEMA)
+    return _conn
+
+
+def add(path, folder, camera_id=None, label=None, confidence=None, created_at=None):
+    """Record a snapshot that was just written."""
+    created_at = created_at or os.path.getmtime(path)
+    try:
+        with _lock:
+            conn = _connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot (path, folder, camera_id, label, confidence, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, folder, camera_id, label, confidence, created_at)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Failed to index snapshot: {e}")
+
+
+def remove(paths):
+    paths = list(paths)
+    if not paths:
+        return
+    with _lock:
+        conn = _connection()
+        conn.executemany("DELETE FROM snapshot WHERE path=?", ((p,) for p in paths))
+        conn.commit()
+
+
+def remove_range(folder, start_ts, end_ts):
+    """Drop index rows for a folder whose files were written in [start_ts, end_ts)."""
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM snapshot WHERE folder=? AND created_at >= ? AND created_at < ?",
+                     (folder, start_ts, end_ts))
+        conn.commit()
+
+
+def query_page(folder, camera_id=None, label=None, start=None, end=None, after=None, limit=PAGE_SIZE):
+    """
+    One page of snapshots, newest first. `after` is the (created_at, id) key of the last row of
+    the previous page. Returns a list of dicts; the last row's key is the cursor for the next page.
+    """
+    sql = ["SELECT id, path, folder, camera_id, label, confidence, created_at FROM snapshot WHERE folder=?"]
+    params = [folder]
+    if camera_id is not None:
+        sql.append("AND camera_id=?")
+        params.append(camera_id)
+    if label:
+        sql.append("AND label=?")
+        params.append(label)
+    if start is not None:
+        sql.append("AND created_at >= ?")
+        params.append(start)
+    if end is not None:
+        sql.append("AND created_at < ?")
+        params.append(end)
+    if after is not None:
+        sql.append("AND (created_at, id) < (?, ?)")
+        params.extend(after)
+    sql.append("ORDER BY created_at DESC, id DESC LIMIT ?")
+    params.append(limit)
+
+    with _lock:
+        cur = _connection().execute(" ".join(sql), params)
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def cameras(folder):
+    with _lock:
+        cur = _connection().execute(
+            "SELECT DISTINCT camera_id FROM snapshot WHERE folder=? AND camera_id IS NOT NULL ORDER BY camera_id",
+            (folder,)
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def parse_name(name):
+    """(camera_id, confidence, created_at) from a snapshot filename, or Nones if it does not match."""
+    m = _NAME.search(name)
+    if not m:
+        return None, None, None
+    created = datetime.strptime(m.group("ts"), "%Y%m%d_%H%M%S").timestamp()
+    return int(m.group("camera")), float(m.group("conf")), created
+
+
+def rebuild(output_folder=OUTPUT_FOLDER, batch=1000, progress=None, cancelled=None):
+    """
+    Index every snapshot already on disk (skips ones already indexed). Returns files added.
+    `progress(scanned, added)` is called after each batch; `cancelled()` returning True stops early.
+    """
+    added = scanned = 0
+    for folder in SNAPSHOT_FOLDERS:
+        path = os.path.join(output_folder, folder)
+        if not os.path.isdir(path):
+            continue
+        label = folder if folder.startswith("person_") else None
+        rows = []
+        with os.scandir(path) as it:
+            for e in it:
+                if not e.is_file() or not e.name.lower().endswith((".jpg", ".jpeg", ".png")):
+                    continue
+                camera_id, confidence, created = parse_name(e.name)
+                rows.append((e.path, folder, camera_id, label, confidence, created or e.stat().st_mtime))
+                if len(rows) >= batch:
+                    added += _insert_many(rows)
+                    scanned += len(rows)
+                    rows = []
+                    if progress:
+                        progress(scanned, added)
+                    if cancelled and cancelled():
+                        return added
+        added += _insert_many(rows)
+        scanned += len(rows)
+        if progress:
+            progress(scanned, added)
+    return added
+
+
+def _insert_many(rows):
+    if not rows:
+        return 0
+    with _lock:
+        conn = _connection()
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO snapshot (path, folder, camera_id, label, confidence, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        return conn.total_changes - before
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintain the snapshot index.")
+    parser.add_argument("--rebuild", action="store_true", help="index snapshots already on disk")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Indexed {rebuild()} snapshots into {INDEX_PATH}")
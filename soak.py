@@ -0,0 +1,225 @@
+"""
+Multi-camera load generator / soak test for the full capture -> inference -> persist -> alert path.
+
+    python soak.py --videos lobby.mp4 gate.mp4 --cameras 6 --duration 600 --db stand-in
+
+Each simulated camera is a real CCTVFeed whose capture is a recorded file served at its native
+frame rate (looping, and skipping frames when the reader falls behind, like a live stream).
+Runs offscreen on CPU and reports sustained FPS per camera, event latency percentiles, DB insert
+rate, disk growth, RSS and dropped frames.
+"""
+import argparse, json, os, sys, tempfile, time
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+from PySide6.QtWidgets import QApplication, QLabel
+from PySide6.QtCore import QTimer
+
+import metrics
+import database
+import snapshot_index
+import cctv_feed
+from cctv_feed import CCTVFeed
+
+SAMPLE_INTERVAL_MS = 1000
+
+
+class RealtimeFileCapture:
+    """cv2.VideoCapture stand-in that plays a file in real time, looping at the end."""
+    def __init__(self, path, on_skip=None):
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.interval = 1.0 / fps
+        self.next_at = time.perf_counter()
+        self.skipped = 0
+        self.on_skip = on_skip
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        else:
+            # A live source does not wait for a slow reader: drop what we fell behind on
+            behind = int((now - self.next_at) / self.interval)
+            for _ in range(behind):
+                if not self.cap.grab():
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.skipped += behind
+            if behind and self.on_skip:
+                self.on_skip(behind)
+            self.next_at += behind * self.interval
+        self.next_at += self.interval
+
+        ret, frame = self.cap.read(image)
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SimulatedFeed(CCTVFeed):
+    """CCTVFeed reading from a RealtimeFileCapture and recording alert latency."""
+    def __init__(self, label, camera_id, video):
+        self.latencies = []
+        self.alerts = 0
+        self.skipped = 0  # summed over every capture, since a reconnect opens a new one
+        super().__init__(label, alert_callback=self._on_alert, camera_id=camera_id, source=video)
+
+    def open_capture(self):
+        return RealtimeFileCapture(self.source, on_skip=self._on_skip)
+
+    def _on_skip(self, frames):
+        self.skipped += frames
+
+    def _emit_alert(self, mapped_label, captured_at):
+        self.latencies.append(time.perf_counter() - captured_at)
+        super()._emit_alert(mapped_label, captured_at)
+
+    def _on_alert(self, message, ai_result):
+        self.alerts += 1
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def use_output_folder(path):
+    """Point snapshots, clips and inference logs at `path` for this run."""
+    cctv_feed.OUTPUT_FOLDER = path
+    snapshot_index.INDEX_PATH = os.path.join(path, "snapshot_index.db")
+    for sub in ("person_with_id", "person_without_id", "admin_snapshots", "guard_snapshots", "clips"):
+        os.makedirs(os.path.join(path, sub), exist_ok=True)
+
+
+def run(videos, cameras, duration, output):
+    app = QApplication.instance() or QApplication(sys.argv)
+    metrics.ENABLED = True
+    use_output_folder(output)
+
+    feeds = []
+    for i in range(cameras):
+        label = QLabel()
+        label.resize(640, 384)
+        feed = SimulatedFeed(label, camera_id=i + 1, video=videos[i % len(videos)])
+        feed.start_feed()
+        feeds.append(feed)
+
+    disk_start, rss_start = dir_bytes(output), rss_bytes()
+    rss_peak = [rss_start]
+    sampler = QTimer()
+    sampler.timeout.connect(lambda: rss_peak.__setitem__(0, max(rss_peak[0], rss_bytes())))
+    sampler.start(SAMPLE_INTERVAL_MS)
+
+    started = time.perf_counter()
+    QTimer.singleShot(int(duration * 1000), app.quit)
+    app.exec()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    for feed in feeds:
+        feed.stop_feed()
+
+    snap = metrics.snapshot()
+    counters = {(c["name"], c["camera"]): c["value"] for c in snap["counters"]}
+    inserts = sum(s["count"] for s in snap["stages"] if s["stage"] == "db_insert")
+
+    per_camera = []
+    all_latencies = []
+    for feed in feeds:
+        cam = feed.camera_id
+        all_latencies.extend(feed.latencies)
+        per_camera.append({
+            "camera_id": cam,
+            "fps": counters.get(("frames_inferred", cam), 0) / elapsed,
+            "frames_read": counters.get(("frames_read", cam), 0),
+            "frames_inferred": counters.get(("frames_inferred", cam), 0),
+            "frames_dropped": counters.get(("frames_dropped", cam), 0) + feed.skipped,
+            "detections": counters.get(("detections", cam), 0),
+            "alerts_delivered": feed.alerts,
+        })
+
+    return {
+        "cameras": cameras,
+        "duration_s": elapsed,
+        "per_camera": per_camera,
+        "event_latency_ms": {
+            "p50": percentile(all_latencies, 0.50) * 1000,
+            "p95": percentile(all_latencies, 0.95) * 1000,
+            "p99": percentile(all_latencies, 0.99) * 1000,
+            "count": len(all_latencies),
+        },
+        "db_inserts_per_s": inserts / elapsed,
+        "disk_growth_bytes": dir_bytes(output) - disk_start,
+        "rss_bytes": {"start": rss_start, "peak": rss_peak[0], "end": rss_bytes()},
+    }
+
+
+def print_report(report):
+    print(f"\n=== {report['cameras']} cameras for {report['duration_s']:.0f}s ===")
+    print(f"{'camera':>6s} {'fps':>7s} {'read':>8s} {'inferred':>9s} {'dropped':>8s} {'dets':>7s} {'alerts':>7s}")
+    for c in report["per_camera"]:
+        print(f"{c['camera_id']:>6d} {c['fps']:7.2f} {c['frames_read']:8d} {c['frames_inferred']:9d} "
+              f"{c['frames_dropped']:8d} {c['detections']:7d} {c['alerts_delivered']:7d}")
+    lat = report["event_latency_ms"]
+    print(f"event latency ms: p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f}  (n={lat['count']})")
+    print(f"db inserts/s: {report['db_inserts_per_s']:.2f}")
+    print(f"disk growth: {report['disk_growth_bytes'] / 1e6:.1f} MB")
+    rss = report["rss_bytes"]
+    print(f"rss MB: start {rss['start'] / 1e6:.0f}  peak {rss['peak'] / 1e6:.0f}  end {rss['end'] / 1e6:.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate N cameras from recorded video and soak the pipeline.")
+    parser.add_argument("--videos", nargs="+", required=True, help="recorded clips, assigned round-robin")
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=300, help="seconds")
+    parser.add_argument("--db", choices=["mysql", "stand-in"], default="stand-in",
+                        help="use the configured MySQL or a local SQLite stand-in")
+    parser.add_argument("--output", help="snapshot/clip folder (default: a temp dir)")
+    parser.add_argument("--report", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.db == "stand-in":
+        from benchmark import make_stand_in
+        database.get_connection = make_stand_in()
+    output = args.output or tempfile.mkdtemp(prefix="aiid_soak_")
+
+    report = run(args.videos, args.cameras, args.duration, output)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Storage backends behind database.get_connection().
+
+    AI_ID_DB_BACKEND=mysql    (default) MySQL server; schema managed by migrations.py
+    AI_ID_DB_BACKEND=sqlite   one SQLite file in WAL mode at AI_ID_SQLITE_PATH; no server and no
+                              network round trips, for small sites, edge guard posts and tests
+
+Both hand out connections with the mysql.connector surface the rest of the code uses:
+cursor() / cursor(dictionary=True), %s parameters, lastrowid, rowcount, fetchone / fetchmany /
+fetchall, commit / rollback / close. The SQLite connection rewrites the MySQL constructs the
+application's queries use (ON DUPLICATE KEY UPDATE ... VALUES(), INSERT IGNORE, NOW() +/- INTERVAL
+n SECOND, IF(), GROUP_CONCAT ... SEPARATOR, single-table UPDATE ... ORDER BY ... LIMIT).
+MySQL-only maintenance (monthly partitioning, EXPLAIN index checks) is skipped on SQLite.
+`Error` catches errors from either backend.
+"""
+import os, re, sqlite3, threading
+from datetime import date, datetime
+from functools import lru_cache
+try:
+    import mysql.connector
+except ImportError:  # SQLite-only installs
+    mysql = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_BACKEND = os.environ.get("AI_ID_DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.environ.get("AI_ID_SQLITE_PATH", os.path.join(BASE_DIR, "output", "ai_id_detector.db"))
+SQLITE_BUSY_SECONDS = 5.0  # how long a writer waits for another process's write lock
+MYSQL_CONFIG = {
+    "host": os.environ.get("AI_ID_MYSQL_HOST", "localhost"),
+    "user": os.environ.get("AI_ID_MYSQL_USER", "root"),
+    "password": os.environ.get("AI_ID_MYSQL_PASSWORD", "09096558231pogi"),  # Change if needed
+    "database": os.environ.get("AI_ID_MYSQL_DATABASE", "ai_id_detector"),
+}
+
+Error = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql else ())
+
+# Mirrors migrations.py (versions 1-6); DATETIME columns come back as datetime like MySQL's
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    username TEXT NOT NULL UNIQUE COLLATE NOCASE,  -- MySQL compares usernames case-insensitively
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS camera (
+    camera_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT,
+    status TEXT DEFAULT 'offline',
+    stream_url TEXT,
+    lease_owner TEXT,
+    lease_expires DATETIME
+);
+CREATE TABLE IF NOT EXISTS detection (
+    detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    camera_id INTEGER NOT NULL,
+    confidence_score REAL,
+    ai_result TEXT NOT NULL,
+    image_path TEXT,
+    `timestamp` DATETIME NOT NULL,
+    clip_path TEXT,
+    model_version TEXT
+);
+CREATE TABLE IF NOT EXISTS feedback (
+    feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    detection_id INTEGER NOT NULL,
+    user_id INTEGER,
+    category TEXT,
+    notes TEXT,
+    created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS detection_rollup (
+    granularity TEXT NOT NULL CHECK (granularity IN ('minute', 'hour', 'day')),
+    bucket_start DATETIME NOT NULL,
+    camera_id INTEGER NOT NULL,
+    ai_result TEXT NOT NULL,
+    detections INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, camera_id, ai_result)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS detector_node (
+    node_id TEXT PRIMARY KEY,
+    capacity INTEGER NOT NULL,
+    last_seen DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detection_camera_time ON detection (camera_id, `timestamp`);
+CREATE INDEX IF NOT EXISTS idx_detection_result_time ON detection (ai_result, `timestamp`);
+CREATE INDEX IF NOT EXISTS idx_detection_time ON detection (`timestamp`);
+CREATE INDEX IF NOT EXISTS idx_feedback_detection ON feedback (detection_id);
+CREATE INDEX IF NOT EXISTS idx_camera_status ON camera (status);
+CREATE INDEX IF NOT EXISTS idx_camera_lease ON camera (lease_owner, lease_expires);
+"""
+
+sqlite3.register_adapter(datetime, lambda d: d.strftime("%Y-%m-%d %H:%M:%S"))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+
+
+# -----------------------------
+# MySQL -> SQLite dialect
+# -----------------------------
+_UPSERT = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_FN = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_UPDATE_LIMIT = re.compile(
+    r"^\s*UPDATE\s+(\w+)\s+SET\s+(.*?)\s+WHERE\s+(.*?)\s+ORDER\s+BY\s+(.*?)\s+LIMIT\s+(\?|\d+)\s*$", re.I | re.S)
+_REWRITES = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bNOW\(\)\s*([+-])\s*INTERVAL\s+(\?|\d+)\s+SECOND\b", re.I),
+     r"datetime('now', 'localtime', '\1' || \2 || ' seconds')"),
+    (re.compile(r"\bNOW\(\)", re.I), "datetime('now', 'localtime')"),
+    (re.compile(r"\bIF\(", re.I), "IIF("),
+    (re.compile(r"\s+SEPARATOR\s+", re.I), ", "),
+]
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """Rewrite one MySQL statement for SQLite. Parameter order is preserved."""
+    sql = sql.replace("%s", "?").replace("%%", "%")
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+    upsert = _UPSERT.search(sql)
+    if upsert:
+        sql = sql[:upsert.start()] + "ON CONFLICT DO UPDATE SET" + _VALUES_FN.sub(r"excluded.\1", sql[upsert.end():])
+    # SQLite has no UPDATE ... LIMIT unless compiled in: limit through a rowid subquery instead
+    return _UPDATE_LIMIT.sub(r"UPDATE \1 SET \2 WHERE rowid IN (SELECT rowid FROM \1 WHERE \3 ORDER BY \4 LIMIT \5)", sql)
+
+
+class SQLiteCursor:
+    def __init__(self, conn, dictionary=False):
+        self._cur = conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_of_params):
+        self._cur.executemany(translate(sql), seq_of_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def __iter__(self):
+        return (self._row(r) for r in self._cur)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_SECONDS, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self._conn, dictionary)  # SQLite cursors always stream
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def is_connected(self):
+        return True
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, config=MYSQL_CONFIG):
+        self.config = dict(config)
+
+    def connect(self):
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python is not installed (set AI_ID_DB_BACKEND=sqlite)")
+        return mysql.connector.connect(**self.config)
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _create_schema(self):
+        with self._lock:
+            if self._ready:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_SECONDS)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")  # persistent: readers no longer block the writer
+                conn.executescript(SQLITE_SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._ready = True
+
+    def connect(self):
+        if not self._ready:
+            self._create_schema()
+        return SQLiteConnection(self.path)
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+_backend = None
+
+
+def backend():
+    """The configured backend (AI_ID_DB_BACKEND), created on first use."""
+    global _backend
+    if _backend is None:
+        if DB_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown AI_ID_DB_BACKEND '{DB_BACKEND}' (expected one of {', '.join(BACKENDS)})")
+        _backend = BACKENDS[DB_BACKEND]()
+    return _backend
+
+
+def use_backend(new_backend):
+    """Switch every later get_connection() to `new_backend`; returns the previous one."""
+    global _backend
+    previous, _backend = _backend, new_backend
+    return previous
+
+
+def connect():
+    return backend().connect()
+
+
+def is_sqlite():
+    return backend().name == "sqlite"
@@ -0,0 +1,128 @@
+import time, threading, statistics
+from collections import deque
+from database import update_camera_status
+
+STALL_SECONDS = 5.0  # no frame for this long -> stalled, reconnect
+MAX_CONSECUTIVE_ERRORS = 25  # failed reads in a row -> reconnect
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+STATUS_DEBOUNCE = 10.0  # a new status must hold this long before it is written to the camera table
+MAX_FRAME_AGE = 1.0  # frames older than this (seconds since capture) are never inferred
+ARRIVAL_WINDOW = 120  # frame arrivals kept for fps / jitter
+
+ONLINE, STALLED, OFFLINE = "online", "stalled", "offline"
+
+
+class StreamHealth:
+    """
+    Per-camera stream health: delivered FPS, inter-arrival jitter, decode errors, stall
+    detection and reconnect backoff. The camera's `status` column follows the observed state,
+    debounced so a flapping stream does not hammer the database.
+    """
+    def __init__(self, camera_id, write_status=True):
+        self.camera_id = camera_id
+        self.write_status = write_status
+        self._lock = threading.Lock()
+        self._arrivals = deque(maxlen=ARRIVAL_WINDOW)
+        self.last_frame_at = None
+        self.decode_errors = 0
+        self.consecutive_errors = 0
+        self.reconnects = 0
+        self.backoff = BACKOFF_INITIAL
+        self.state = OFFLINE
+        self._state_since = time.monotonic()
+        self._written_state = None
+
+    # ---------- Events from the capture thread ----------
+    def on_frame(self):
+        now = time.monotonic()
+        with self._lock:
+            self._arrivals.append(now)
+            self.last_frame_at = now
+            self.consecutive_errors = 0
+            self.backoff = BACKOFF_INITIAL
+        self._set_state(ONLINE)
+
+    def on_error(self):
+        with self._lock:
+            self.decode_errors += 1
+            self.consecutive_errors += 1
+
+    def on_connected(self):
+        with self._lock:
+            self.last_frame_at = time.monotonic()  # give the new stream a full stall window
+            self.consecutive_errors = 0
+
+    def on_disconnected(self, reason):
+        """Record a dropped stream and return how long to wait before reconnecting."""
+        with self._lock:
+            self.reconnects += 1
+            self._arrivals.clear()
+            delay = self.backoff
+            self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+        self._settle_down()
+        print(f"[WARN] Camera {self.camera_id}: {reason}, reconnecting in {delay:.0f}s")
+        return delay
+
+    def on_open_failed(self):
+        with self._lock:
+            delay = self.backoff
+            self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+        self._settle_down()
+        return delay
+
+    def _settle_down(self):
+        # A stream that was up is first "stalled"; still failing after the debounce window, it is "offline"
+        if self.state == ONLINE:
+            self._set_state(STALLED)
+        elif time.monotonic() - self._state_since >= STATUS_DEBOUNCE:
+            self._set_state(OFFLINE)
+
+    # ---------- Checks ----------
+    def needs_reconnect(self):
+        with self._lock:
+            if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                return "too many decode errors"
+            if self.last_frame_at is not None and time.monotonic() - self.last_frame_at > STALL_SECONDS:
+                return f"no frames for {STALL_SECONDS:.0f}s"
+        return None
+
+    def tick(self):
+        """Write the debounced status if it changed. Call periodically from the capture thread."""
+        if not self.write_status:
+            return
+        with self._lock:
+            state = self.state
+            stable = time.monotonic() - self._state_since >= STATUS_DEBOUNCE
+            if state == self._written_state:
+                return
+            # Going online the first time is written right away so the dashboard is not empty on start-up
+            if not stable and not (self._written_state is None and state == ONLINE):
+                return
+            self._written_state = state
+        update_camera_status(self.camera_id, state)
+
+    def _set_state(self, state):
+        with self._lock:
+            if state != self.state:
+                self.state = state
+                self._state_since = time.monotonic()
+
+    # ---------- Stats ----------
+    def stats(self):
+        with self._lock:
+            arrivals = list(self._arrivals)
+            stats = {
+                "state": self.state,
+                "decode_errors": self.decode_errors,
+                "reconnects": self.reconnects,
+                "fps": 0.0,
+                "jitter_ms": 0.0,
+                "max_gap_ms": 0.0,
+            }
+        if len(arrivals) >= 2:
+            gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+            stats["fps"] = (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+            stats["jitter_ms"] = statistics.pstdev(gaps) * 1000
+            stats["max_gap_ms"] = max(gaps) * 1000
+        return stats
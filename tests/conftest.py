@@ -0,0 +1,48 @@
+"""
+Shared fixtures: every test runs against a fresh SQLite database (storage.SQLiteBackend) in a
+temporary directory, so the suite needs no MySQL server.
+"""
+import os, sys
+from datetime import datetime
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+import database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Route database.get_connection() to an empty SQLite file for the duration of the test."""
+    previous = storage.use_backend(storage.SQLiteBackend(str(tmp_path / "ai_id_detector.db")))
+    yield database
+    storage.use_backend(previous)
+
+
+@pytest.fixture
+def no_pauses(monkeypatch):
+    """Drop the sleeps background jobs take between steps."""
+    import retention, rollups
+    monkeypatch.setattr(retention, "STEP_PAUSE", 0)
+    monkeypatch.setattr(rollups, "STEP_PAUSE", 0)
+
+
+def add_detection(ai_result="person_without_id", when=None, camera_id=1, confidence=0.9, image_path="x.jpg"):
+    """Insert one detection (rollups included) and return its id."""
+    when = when or datetime.now()
+    return database.insert_detection(camera_id, confidence, ai_result, image_path,
+                                     when.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def execute(sql, params=()):
+    """Run one statement on its own connection; returns fetchall() for SELECTs."""
+    conn = database.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall() if cur.description else None
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
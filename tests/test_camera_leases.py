@@ -0,0 +1,73 @@
+import pytest
+from camera_leases import LeaseManager
+from conftest import execute
+
+
+@pytest.fixture
+def cameras(db):
+    for n in range(6):
+        execute("INSERT INTO camera (location, stream_url) VALUES (%s, %s)", (f"cam {n}", f"rtsp://cam{n}"))
+    execute("INSERT INTO camera (location) VALUES ('no stream')")  # never leased
+
+
+def node(node_id, capacity=4):
+    running = {}
+    manager = LeaseManager(lambda camera_id, url: running.__setitem__(camera_id, url),
+                           lambda camera_id: running.pop(camera_id),
+                           node_id, capacity, lease_seconds=40, heartbeat_seconds=10)
+    return manager, running
+
+
+def owners():
+    return dict(execute("SELECT camera_id, lease_owner FROM camera WHERE stream_url IS NOT NULL"))
+
+
+def test_single_node_claims_up_to_capacity(cameras):
+    a, running = node("a", capacity=4)
+    a.tick()
+    assert len(running) == 4 and running == a.held
+    assert sorted(c for c, owner in owners().items() if owner == "a") == sorted(running)
+
+
+def test_joining_node_gets_a_fair_share(cameras):
+    a, running_a = node("a")
+    b, running_b = node("b")
+    a.tick()
+    b.tick()  # b joins: live capacity doubles, but a still holds its cameras
+    a.tick()  # a releases down to its share
+    b.tick()  # b claims what a let go of
+    assert (len(running_a), len(running_b)) == (3, 3)
+    assert set(running_a).isdisjoint(running_b)
+
+
+def test_expired_leases_are_taken_over(cameras):
+    a, running_a = node("a")
+    b, running_b = node("b")
+    a.tick()
+    b.tick()
+    a.tick()
+    b.tick()
+    # a dies: its heartbeat goes stale and its leases run out
+    execute("UPDATE camera SET lease_expires = NOW() - INTERVAL 1 SECOND WHERE lease_owner='a'")
+    execute("UPDATE detector_node SET last_seen = NOW() - INTERVAL 60 SECOND WHERE node_id='a'")
+    b.tick()
+    assert len(running_b) == 4  # its full capacity; the rest waits for another node
+    assert {c for c, owner in owners().items() if owner == "b"} == set(running_b)
+
+
+def test_stop_hands_cameras_back(cameras):
+    a, running = node("a")
+    a.tick()
+    a.stop()
+    assert running == {}
+    assert set(owners().values()) == {None}
+    assert execute("SELECT COUNT(*) FROM detector_node") == [(0,)]
+
+
+def test_lost_lease_stops_the_feed(cameras):
+    a, running = node("a")
+    a.tick()
+    stolen = sorted(running)[0]
+    execute("UPDATE camera SET lease_owner='b' WHERE camera_id=%s", (stolen,))
+    a.tick()
+    assert stolen not in running
@@ -0,0 +1,70 @@
+import csv, gzip, os
+from datetime import datetime, timedelta
+import pytest
+import log_export
+from conftest import add_detection
+
+DAY = datetime(2025, 3, 11)
+
+
+@pytest.fixture
+def detections(db):
+    ids = [add_detection("person_without_id", DAY + timedelta(hours=n), camera_id=1 + n % 2) for n in range(5)]
+    add_detection("person_with_id", DAY - timedelta(days=1))  # outside the range
+    db.insert_feedback(ids[0], 1, "incident", "first")
+    db.insert_feedback(ids[0], 1, "incident", "second")
+    return ids
+
+
+def read_csv(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("name", ["range.csv", "range.csv.gz"])
+def test_range_export(detections, tmp_path, name):
+    path = str(tmp_path / name)
+    job = log_export.job_for_path(path, DAY, DAY + timedelta(days=1))
+    job.chunk = 2
+    job.run()
+
+    assert job.error is None
+    assert (job.total, job.rows_written, job.progress()) == (5, 5, 1.0)
+    assert [int(r["detection_id"]) for r in read_csv(path)] == detections
+    assert not os.path.exists(path + ".part")
+
+
+def test_guard_log_query(detections, tmp_path):
+    path = str(tmp_path / "guard.csv")
+    job = log_export.ExportJob(path, log_export.GUARD_LOG_QUERY, count_query=log_export.GUARD_LOG_COUNT)
+    job.run()
+
+    rows = read_csv(path)
+    assert job.error is None and len(rows) == job.total == 6
+    first = next(r for r in rows if int(r["detection_id"]) == detections[0])
+    assert (first["note"], first["incident"]) == ("first | second", "yes")
+    assert {r["incident"] for r in rows if r is not first} == {"no"}
+
+
+def test_cancel_leaves_no_file(detections, tmp_path):
+    path = str(tmp_path / "cancelled.csv")
+    job = log_export.job_for_path(path, DAY, DAY + timedelta(days=1))
+    job.cancel()
+    job.run()
+    assert job.error is None and job.rows_written == 0
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+
+
+def test_parquet_export_groups_by_day_and_camera(detections, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "range.parquet")
+    job = log_export.job_for_path(path, DAY, DAY + timedelta(days=1))
+    job.run()
+
+    assert job.error is None and job.rows_written == 6  # one row per feedback note
+    meta = pq.ParquetFile(path).metadata
+    assert meta.num_row_groups == 2  # cameras 1 and 2 on the one day
+    table = pq.read_table(path)
+    assert table.column("camera_id").to_pylist() == [1, 1, 1, 1, 2, 2]
+    assert sorted(n for n in table.column("notes").to_pylist() if n) == ["first", "second"]
@@ -0,0 +1,79 @@
+import csv, gzip, json
+from datetime import date, datetime, timedelta
+import pytest
+import reports
+from conftest import add_detection
+
+TODAY = date(2025, 3, 12)  # a Wednesday
+YESTERDAY = datetime(2025, 3, 11, 9, 30)
+
+
+@pytest.fixture
+def scheduler(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(reports, "LOOKBACK", {"daily": 2, "weekly": 1, "monthly": 1})
+    s = reports.ReportScheduler(str(tmp_path / "reports"))
+    s.running = True
+    return s
+
+
+def test_closed_periods():
+    assert reports.closed_periods("daily", TODAY, 2) == [
+        ("2025-03-11", date(2025, 3, 11), date(2025, 3, 12)),
+        ("2025-03-10", date(2025, 3, 10), date(2025, 3, 11)),
+    ]
+    assert reports.closed_periods("weekly", TODAY, 1) == [("2025-W10", date(2025, 3, 3), date(2025, 3, 10))]
+    assert reports.closed_periods("monthly", TODAY, 1) == [("2025-02", date(2025, 2, 1), date(2025, 3, 1))]
+
+
+def test_run_once_builds_closed_periods(scheduler):
+    add_detection("person_without_id", YESTERDAY)
+    add_detection("person_with_id", YESTERDAY + timedelta(minutes=5))
+
+    built = scheduler.run_once(today=TODAY)
+
+    assert built == ["daily:2025-03-10", "daily:2025-03-11", "weekly:2025-W10", "monthly:2025-02"]
+    entry = reports.find_report(date(2025, 3, 11), date(2025, 3, 12), scheduler.folder)
+    with gzip.open(entry["files"][".csv.gz"], "rt", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["ai_result"] for r in rows] == ["person_without_id", "person_with_id"]
+    with open(entry["files"][".json"], encoding="utf-8") as f:
+        assert json.load(f)["totals"] == {"person_without_id": 1, "person_with_id": 1}
+    assert scheduler.run_once(today=TODAY) == []  # nothing missing, nothing stale
+
+
+def test_feedback_marks_periods_stale(db, scheduler):
+    detection_id = add_detection("person_without_id", YESTERDAY)
+    scheduler.run_once(today=TODAY)
+    db.insert_feedback(detection_id, 1, "incident", "late note")
+
+    days, newest = scheduler.stale_days(reports.ReportIndex(scheduler.folder))
+    assert days == {date(2025, 3, 11)} and newest == 1
+    assert scheduler.run_once(today=TODAY) == ["daily:2025-03-11"]  # its week and month are out of LOOKBACK
+    assert reports.ReportIndex(scheduler.folder).feedback_watermark == 1
+    assert scheduler.run_once(today=TODAY) == []
+
+
+def test_stopped_pass_keeps_the_watermark(db, scheduler, monkeypatch):
+    detection_id = add_detection("person_without_id", YESTERDAY)
+    scheduler.run_once(today=TODAY)
+    db.insert_feedback(detection_id, 1, "incident", "late note")
+
+    scheduler.running = False  # stop requested before the stale rebuild
+    assert scheduler.run_once(today=TODAY) == []
+    assert reports.ReportIndex(scheduler.folder).feedback_watermark == 0
+
+    scheduler.running = True
+    assert scheduler.run_once(today=TODAY) == ["daily:2025-03-11"]
+
+
+def test_feedback_outside_lookback_still_rebuilds(db, scheduler):
+    detection_id = add_detection("person_without_id", datetime(2025, 3, 1, 10, 0))
+    scheduler.run_once(today=date(2025, 3, 3))  # builds 2025-03-01 and 2025-W09 while they are recent
+    scheduler.run_once(today=TODAY)
+    db.insert_feedback(detection_id, 1, "incident", "late note")
+
+    assert scheduler.run_once(today=TODAY) == ["daily:2025-03-01", "weekly:2025-W09"]
+    entry = reports.find_report(date(2025, 3, 1), date(2025, 3, 2), scheduler.folder)
+    with open(entry["files"][".json"], encoding="utf-8") as f:
+        assert json.load(f)["incidents"] == 1
+    assert reports.ReportIndex(scheduler.folder).feedback_watermark == 1
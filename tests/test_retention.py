@@ -0,0 +1,101 @@
+import os, zipfile
+from datetime import datetime, timedelta
+import pytest
+import retention
+import snapshot_index
+from conftest import add_detection, execute
+
+OLD = datetime.now() - timedelta(days=400)
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_index, "INDEX_PATH", str(tmp_path / "snapshot_index.db"))
+    monkeypatch.setattr(snapshot_index, "_conn", None)
+    out = tmp_path / "output"
+    (out / "person_with_id").mkdir(parents=True)
+    return out
+
+
+def snapshot(output, name, when=OLD):
+    path = output / "person_with_id" / name
+    path.write_bytes(b"\xff\xd8" + os.urandom(64))
+    os.utime(path, (when.timestamp(), when.timestamp()))
+    return str(path)
+
+
+def service(output):
+    policies = {"person_with_id": retention.RETENTION_POLICIES["person_with_id"]}
+    svc = retention.RetentionService(str(output), policies)
+    svc.running = True
+    return svc
+
+
+def test_prune_keeps_rows_with_feedback(db, no_pauses):
+    old_ids = [add_detection("person_with_id", OLD) for _ in range(5)]
+    recent = add_detection("person_with_id", datetime.now())
+    other_label = add_detection("person_without_id", OLD)
+    db.insert_feedback(old_ids[0], 1, "incident", "kept")
+
+    assert retention.prune_detections("person_with_id", 30, chunk=2) == 4
+    remaining = {i for i, in execute("SELECT detection_id FROM detection")}
+    assert remaining == {old_ids[0], recent, other_label}
+
+
+def test_files_of_feedback_detections_survive_expiry(db, no_pauses, output):
+    stamp = OLD.strftime("%Y%m%d_%H%M%S")
+    kept = snapshot(output, f"cam1_det1_conf0.90_{stamp}.jpg")
+    dropped = snapshot(output, f"cam1_det2_conf0.90_{stamp}.jpg")
+    incident = add_detection("person_with_id", OLD, image_path=kept)
+    add_detection("person_with_id", OLD, image_path=dropped)
+    db.insert_feedback(incident, 1, "incident", "evidence")
+
+    report = service(output).run_once()
+
+    assert os.path.exists(kept) and not os.path.exists(dropped)
+    assert report["person_with_id"]["db_rows_pruned"] == 1
+    assert os.listdir(output / "archive" / "person_with_id") == []
+
+
+def test_expired_archive_gives_back_evidence(db, no_pauses, output):
+    stamp = OLD.strftime("%Y%m%d_%H%M%S")
+    names = [f"cam1_det{n}_conf0.90_{stamp}.jpg" for n in (1, 2)]
+    archive_dir = output / "archive" / "person_with_id"
+    archive_dir.mkdir(parents=True)
+    with zipfile.ZipFile(archive_dir / f"{OLD:%Y-%m-%d}.zip", "w") as zf:
+        for name in names:
+            zf.writestr(name, b"jpeg bytes of " + name.encode())
+    paths = [str(output / "person_with_id" / name) for name in names]
+    incident = add_detection("person_with_id", OLD, image_path=paths[0])
+    db.insert_feedback(incident, 1, "incident", "evidence")
+
+    service(output).run_once()
+
+    assert not os.listdir(archive_dir)
+    assert retention.read_snapshot(paths[0]) == b"jpeg bytes of " + names[0].encode()
+    assert retention.read_snapshot(paths[1]) is None
+    assert [row["path"] for row in snapshot_index.query_page("person_with_id")] == [paths[0]]
+
+
+def test_budget_never_evicts_evidence(db, no_pauses, output):
+    now = datetime.now()
+    paths = [snapshot(output, f"cam1_det{n}_conf0.90_{now:%Y%m%d_%H%M%S}.jpg", now - timedelta(minutes=10 - n))
+             for n in range(3)]
+    incident = add_detection("person_with_id", now, image_path=paths[0])
+    db.insert_feedback(incident, 1, "incident", "oldest file, but evidence")
+    svc = service(output)
+    svc.policies = {"person_with_id": dict(svc.policies["person_with_id"], max_bytes=140)}  # three 66-byte files
+
+    svc.run_once()
+
+    assert [os.path.exists(p) for p in paths] == [True, False, True]
+
+
+def test_no_files_touched_when_evidence_is_unknown(no_pauses, output, monkeypatch):
+    monkeypatch.setattr(retention, "get_connection", lambda: None)
+    aged = snapshot(output, f"cam1_det1_conf0.90_{OLD:%Y%m%d_%H%M%S}.jpg", datetime.now() - timedelta(days=10))
+    expired = snapshot(output, f"cam1_det2_conf0.90_{OLD:%Y%m%d_%H%M%S}.jpg")
+    report = service(output).run_once()
+    assert os.path.exists(aged) and os.path.exists(expired)
+    assert report["person_with_id"]["archived_files"] == 0
+    assert not os.path.exists(output / "archive")
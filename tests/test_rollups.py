@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import rollups
+from conftest import add_detection, execute
+
+
+def rollup_rows():
+    return execute("SELECT granularity, bucket_start, camera_id, ai_result, detections "
+                   "FROM detection_rollup ORDER BY granularity, bucket_start, camera_id, ai_result")
+
+
+def test_insert_detection_maintains_rollups(db):
+    noon = datetime.now().replace(hour=12, minute=30, second=0, microsecond=0)
+    add_detection("person_without_id", noon)
+    add_detection("person_without_id", noon + timedelta(seconds=20))
+    add_detection("person_with_id", noon + timedelta(hours=1))
+
+    assert db.get_detection_totals() == {"person_without_id": 2, "person_with_id": 1}
+    day = noon.replace(hour=0, minute=0)
+    series = db.get_detection_series("hour", day, day + timedelta(days=1))
+    assert series == [
+        (noon.replace(minute=0), "person_without_id", 2),
+        (noon.replace(hour=13, minute=0), "person_with_id", 1),
+    ]
+    minutes = db.get_detection_series("minute", day, day + timedelta(days=1))
+    assert [count for _, _, count in minutes] == [2, 1]
+
+
+def test_backfill_without_start_rebuilds_from_oldest_detection(db, no_pauses):
+    now = datetime.now().replace(microsecond=0)
+    for days_ago in (3, 1, 0):
+        add_detection("person_without_id", now - timedelta(days=days_ago))
+    expected = rollup_rows()
+    execute("DELETE FROM detection_rollup")
+
+    # MIN(`timestamp`) comes back from SQLite as text; backfill() must still walk the days
+    assert rollups.backfill() == 4  # three days ago through today
+    assert rollup_rows() == expected
+
+
+def test_backfill_is_idempotent(db, no_pauses):
+    add_detection("person_with_id", datetime.now() - timedelta(days=1))
+    rollups.backfill()
+    first = rollup_rows()
+    rollups.backfill(start=datetime.now() - timedelta(days=2))
+    assert rollup_rows() == first
+
+
+def test_backfill_of_empty_table(db, no_pauses):
+    assert rollups.backfill() == 0
@@ -0,0 +1,71 @@
+from datetime import datetime
+import pytest
+import storage
+from conftest import execute
+
+
+@pytest.mark.parametrize("mysql, sqlite", [
+    ("SELECT * FROM user WHERE username=%s", "SELECT * FROM user WHERE username=?"),
+    ("SELECT 1 WHERE x LIKE '10%%'", "SELECT 1 WHERE x LIKE '10%'"),
+    ("INSERT IGNORE INTO t (a) VALUES (%s)", "INSERT OR IGNORE INTO t (a) VALUES (?)"),
+    ("SELECT NOW()", "SELECT datetime('now', 'localtime')"),
+    ("SELECT NOW() - INTERVAL %s SECOND", "SELECT datetime('now', 'localtime', '-' || ? || ' seconds')"),
+    ("SELECT IF(COUNT(*) > 0, 'yes', 'no')", "SELECT IIF(COUNT(*) > 0, 'yes', 'no')"),
+    ("SELECT GROUP_CONCAT(notes SEPARATOR ' | ')", "SELECT GROUP_CONCAT(notes, ' | ')"),
+    ("INSERT INTO t (a, b) VALUES (%s, %s) ON DUPLICATE KEY UPDATE b = b + VALUES(b)",
+     "INSERT INTO t (a, b) VALUES (?, ?) ON CONFLICT DO UPDATE SET b = b + excluded.b"),
+    ("UPDATE camera SET lease_owner=%s WHERE lease_owner IS NULL ORDER BY camera_id LIMIT %s",
+     "UPDATE camera SET lease_owner=? WHERE rowid IN "
+     "(SELECT rowid FROM camera WHERE lease_owner IS NULL ORDER BY camera_id LIMIT ?)"),
+])
+def test_translate(mysql, sqlite):
+    assert storage.translate(mysql) == sqlite
+
+
+def test_schema_is_created_on_first_connect(db):
+    tables = {name for name, in execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"user", "camera", "detection", "feedback", "detection_rollup", "detector_node"} <= tables
+    assert execute("PRAGMA journal_mode")[0][0] == "wal"
+
+
+def test_cursor_matches_mysql_connector_surface(db):
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO camera (location, status) VALUES (%s, %s)",
+                            [("gate", "online"), ("lobby", "offline"), ("hall", "online")])
+            assert cur.rowcount == 3
+            cur.execute("INSERT INTO camera (location) VALUES (%s)", ("yard",))
+            assert cur.lastrowid == 4
+        conn.commit()
+        with conn.cursor(dictionary=True) as cur:
+            cur.execute("SELECT camera_id, location FROM camera ORDER BY camera_id")
+            assert cur.fetchone() == {"camera_id": 1, "location": "gate"}
+            assert cur.fetchmany(2) == [{"camera_id": 2, "location": "lobby"}, {"camera_id": 3, "location": "hall"}]
+            assert list(cur) == [{"camera_id": 4, "location": "yard"}]
+        with conn.cursor(buffered=False) as cur:
+            cur.execute("SELECT COUNT(*) FROM camera WHERE status=%s", ("online",))
+            assert cur.fetchone() == (2,)
+    finally:
+        conn.close()
+
+
+def test_datetime_columns_round_trip(db):
+    when = datetime(2025, 3, 4, 5, 6, 7)
+    execute("INSERT INTO detection (camera_id, ai_result, `timestamp`) VALUES (%s, %s, %s)",
+            (1, "person_with_id", when))
+    assert execute("SELECT `timestamp` FROM detection") == [(when,)]
+
+
+def test_upsert_adds_to_existing_row(db):
+    sql = ("INSERT INTO detection_rollup (granularity, bucket_start, camera_id, ai_result, detections, confidence_sum) "
+           "VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE detections = detections + VALUES(detections)")
+    row = ("day", datetime(2025, 1, 1), 1, "person_with_id", 2, 1.5)
+    execute(sql, row)
+    execute(sql, row)
+    assert execute("SELECT detections FROM detection_rollup") == [(4,)]
+
+
+def test_errors_from_sqlite_are_storage_errors(db):
+    with pytest.raises(storage.Error):
+        execute("SELECT * FROM no_such_table")
@@ -0,0 +1,57 @@
+import pytest
+import database
+from conftest import execute
+
+
+@pytest.fixture
+def fast_hash(monkeypatch):
+    monkeypatch.setattr(database, "hash_passwords", lambda passwords, pool=None: [f"hashed:{p}" for p in passwords])
+
+
+def user(username, name="User", role="guard"):
+    return {"name": name, "role": role, "username": username, "password": "pw"}
+
+
+def usernames():
+    return sorted(u for u, in execute("SELECT username FROM user"))
+
+
+def test_read_users_csv_flags_bad_rows(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("name,role,username,password\n"
+                    "Alice,guard,alice,pw\n"
+                    "Alice Two,guard,ALICE,pw\n"
+                    f"Long,guard,{'x' * 51},pw\n"
+                    f"{'n' * 101},admin,named,pw\n"
+                    "Bob,Guard,bob,pw\n", encoding="utf-8")
+
+    rows, problems = database.read_users_csv(str(path))
+
+    assert [r["username"] for r in rows] == ["alice", "bob"]
+    assert problems == [
+        "Line 3: username 'ALICE' repeated in file",
+        "Line 4: username longer than 50 characters",
+        "Line 5: name longer than 100 characters",
+    ]
+
+
+def test_existing_usernames_match_case_insensitively(db, fast_hash, monkeypatch):
+    monkeypatch.setattr(database, "IMPORT_BATCH", 3)  # several lookup queries
+    database.import_users([user("Alice"), user("carol")])
+    assert database.existing_usernames(["alice", "b", "c", "d", "CAROL", "e", "f"]) == {"alice", "carol"}
+
+    result = database.import_users([user("ALICE"), user("dave")])
+    assert result == {"inserted": 1, "skipped": ["ALICE"], "errors": []}
+    assert usernames() == ["Alice", "carol", "dave"]
+
+
+def test_failed_batch_is_retried_row_by_row(db, fast_hash, monkeypatch):
+    monkeypatch.setattr(database, "IMPORT_BATCH", 4)
+    rows = [user(f"guard{n}") for n in range(6)]
+    rows.insert(2, user("GUARD1"))  # clashes with guard1 inside the same batch
+
+    result = database.import_users(rows)
+
+    assert result["inserted"] == 6
+    assert [e.split(":")[0] for e in result["errors"]] == ["User 'GUARD1' not imported"]
+    assert usernames() == [f"guard{n}" for n in range(6)]
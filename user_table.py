@@ -0,0 +1,136 @@
+"""
+Model/view pieces for the admin User Management table.
+
+UserTableModel holds the rows from the user table, UserFilterProxy filters them against a
+search index built once per reload (name, username and role, lower-cased), and
+UserActionDelegate paints the Edit / Delete buttons instead of creating two QPushButtons per
+row. A keystroke costs one substring pass over the index, or over the previous matches when
+the query only got longer, and no widgets are created or destroyed.
+"""
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QRect, QEvent, Signal
+from PySide6.QtGui import QColor, QPainter
+from PySide6.QtWidgets import QStyledItemDelegate
+
+COLUMNS = ["#", "Name", "Role", "Username", "Action"]
+FIELDS = ["user_id", "name", "role", "username"]
+ACTION_COLUMN = 4
+USER_ROLE = Qt.UserRole  # data role carrying the row's user dict
+
+BUTTONS = [  # (action, text, background, text colour)
+    ("edit", "✏️ Edit", QColor("skyblue"), QColor("black")),
+    ("delete", "🗑️ Delete", QColor("red"), QColor("white")),
+]
+BUTTON_WIDTH = 90
+BUTTON_SPACING = 8
+BUTTON_MARGIN = 5
+
+
+class UserTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.users = []
+
+    def set_users(self, users):
+        self.beginResetModel()
+        self.users = list(users)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.users)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        user = self.users[index.row()]
+        if role == USER_ROLE:
+            return user
+        if role == Qt.DisplayRole and index.column() < len(FIELDS):
+            return str(user[FIELDS[index.column()]])
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignLeft | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+
+class UserFilterProxy(QSortFilterProxyModel):
+    """Substring filter over name / username / role, backed by an index rebuilt on model reset."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._index = []  # per source row: "name\nusername\nrole", lower-cased
+        self._query = ""
+        self._matches = None  # source rows matching _query; None means all
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self._rebuild_index)
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        users = self.sourceModel().users
+        self._index = [f"{u['name']}\n{u['username']}\n{u['role']}".lower() for u in users]
+        query, self._query, self._matches = self._query, "", None
+        self.set_query(query)
+
+    def set_query(self, text):
+        query = text.strip().lower()
+        if query == self._query:
+            return
+        if not query:
+            matches = None
+        elif self._query and query.startswith(self._query) and self._matches is not None:
+            # The query only grew: the new matches are a subset of the old ones
+            matches = {row for row in self._matches if query in self._index[row]}
+        else:
+            matches = {row for row, text in enumerate(self._index) if query in text}
+        self._query, self._matches = query, matches
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self._matches is None or source_row in self._matches
+
+
+class UserActionDelegate(QStyledItemDelegate):
+    """Paints Edit / Delete in the action column and reports clicks with the row's user dict."""
+    editClicked = Signal(object)
+    deleteClicked = Signal(object)
+
+    def _button_rects(self, rect):
+        height = rect.height() - 2 * BUTTON_MARGIN
+        x = rect.left() + BUTTON_MARGIN
+        rects = []
+        for action, *_ in BUTTONS:
+            rects.append((action, QRect(x, rect.top() + BUTTON_MARGIN, BUTTON_WIDTH, height)))
+            x += BUTTON_WIDTH + BUTTON_SPACING
+        return rects
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for (action, rect), (_, text, background, foreground) in zip(self._button_rects(option.rect), BUTTONS):
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(background)
+            painter.drawRoundedRect(rect, 5, 5)
+            painter.setPen(foreground)
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            pos = event.position().toPoint()
+            for action, rect in self._button_rects(option.rect):
+                if rect.contains(pos):
+                    user = index.data(USER_ROLE)
+                    (self.editClicked if action == "edit" else self.deleteClicked).emit(user)
+                    return True
+        return super().editorEvent(event, model, option, index)